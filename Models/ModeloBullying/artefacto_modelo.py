@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from datetime import datetime
+import joblib
+
+# Versión del formato del artefacto: incrementarla si cambia la estructura de los archivos
+VERSION_FORMATO = 1
+
+MANIFIESTO = 'manifiesto.json'
+ARCHIVO_INFERENCIA = 'inferencia.joblib'
+ARCHIVO_ENTRENAMIENTO = 'entrenamiento.joblib'
+
+def _sha256(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def _versiones():
+    versiones = {'python': sys.version.split()[0], 'joblib': joblib.__version__}
+    try:
+        import numpy
+        import sklearn
+        versiones['numpy'] = numpy.__version__
+        versiones['sklearn'] = sklearn.__version__
+    except ImportError:
+        pass
+    return versiones
+
+def guardar_artefacto(directorio, tipo, parametros, inferencia=None, entrenamiento=None, nombres_caracteristicas=None):
+    """Guarda un modelo del detector como directorio versionado
+    
+    - manifiesto.json: tipo, parámetros y nombres de características (sin pickle).
+    - inferencia.joblib: solo lo necesario para predecir (ensemble + scaler), sin
+      comprimir para poder cargarlo con mmap.
+    - entrenamiento.joblib: modelos individuales y estadísticas, comprimido; la
+      cámara nunca lo carga.
+    
+    El manifiesto se escribe al final: un artefacto a medio guardar no se considera válido.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    archivos = {}
+    
+    for clave, nombre, datos, compresion in (
+        ('inferencia', ARCHIVO_INFERENCIA, inferencia, 0),
+        ('entrenamiento', ARCHIVO_ENTRENAMIENTO, entrenamiento, 3)
+    ):
+        if datos is None:
+            continue
+        ruta = os.path.join(directorio, nombre)
+        joblib.dump(datos, ruta + '.tmp', compress=compresion)
+        os.replace(ruta + '.tmp', ruta)
+        archivos[clave] = {'archivo': nombre, 'sha256': _sha256(ruta)}
+    
+    manifiesto = {
+        'formato': 'detector_peleas',
+        'version_formato': VERSION_FORMATO,
+        'tipo': tipo,
+        'creado': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'parametros': parametros,
+        'nombres_caracteristicas': nombres_caracteristicas,
+        'archivos': archivos,
+        'versiones': _versiones()
+    }
+    
+    ruta_manifiesto = os.path.join(directorio, MANIFIESTO)
+    with open(ruta_manifiesto + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False, default=float)
+    os.replace(ruta_manifiesto + '.tmp', ruta_manifiesto)
+    return ruta_manifiesto
+
+def es_artefacto(ruta):
+    return os.path.isfile(os.path.join(ruta, MANIFIESTO))
+
+class ArtefactoModelo:
+    """Modelo del detector cargado de forma perezosa
+    
+    Al abrirlo solo se lee el manifiesto. El estimador de inferencia se carga
+    la primera vez que se pide (con mmap para los arrays grandes) y las
+    estadísticas de entrenamiento solo si alguien las necesita.
+    """
+    
+    def __init__(self, directorio, manifiesto):
+        self.directorio = directorio
+        self.manifiesto = manifiesto
+        self.tipo = manifiesto['tipo']
+        self.parametros = manifiesto['parametros']
+        self.nombres_caracteristicas = manifiesto.get('nombres_caracteristicas')
+        self._inferencia = None
+        self._entrenamiento = None
+        self._legado = None
+    
+    @classmethod
+    def abrir(cls, directorio):
+        with open(os.path.join(directorio, MANIFIESTO), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        
+        if manifiesto.get('formato') != 'detector_peleas':
+            raise ValueError(f"{directorio} no es un artefacto del detector de peleas")
+        if manifiesto.get('version_formato', 0) > VERSION_FORMATO:
+            raise ValueError(f"Formato de artefacto {manifiesto['version_formato']} no soportado "
+                             f"(máximo {VERSION_FORMATO}); actualiza el código")
+        return cls(directorio, manifiesto)
+    
+    @classmethod
+    def desde_pickle(cls, ruta_pkt):
+        """Adapta un detector_peleas_modelo.pkt antiguo (carga completa con pickle)"""
+        with open(ruta_pkt, 'rb') as f:
+            datos = pickle.load(f)
+        
+        if 'parametros' in datos:
+            # Modelo simple
+            manifiesto = {'tipo': 'simple', 'parametros': datos['parametros']}
+            inferencia = None
+            entrenamiento = {k: v for k, v in datos.items() if k != 'parametros'}
+        else:
+            # Modelo avanzado
+            manifiesto = {
+                'tipo': 'avanzado',
+                'parametros': datos['parameters'],
+                'nombres_caracteristicas': datos.get('feature_names')
+            }
+            modelos = datos['models']
+            inferencia = {'ensemble': modelos['ensemble'], 'scaler': modelos['scaler']}
+            entrenamiento = {
+                'timestamp': datos.get('timestamp'),
+                'models': {k: v for k, v in modelos.items() if k not in ('ensemble', 'scaler')},
+                'statistics': datos.get('statistics')
+            }
+        
+        artefacto = cls(None, manifiesto)
+        artefacto._inferencia = inferencia
+        artefacto._entrenamiento = entrenamiento
+        artefacto._legado = ruta_pkt
+        return artefacto
+    
+    def _cargar(self, clave, mmap_mode=None, verificar=False):
+        info = self.manifiesto['archivos'].get(clave)
+        if info is None:
+            return None
+        
+        ruta = os.path.join(self.directorio, info['archivo'])
+        if verificar and _sha256(ruta) != info['sha256']:
+            raise ValueError(f"El archivo {ruta} no coincide con el manifiesto (modificado o corrupto)")
+        return joblib.load(ruta, mmap_mode=mmap_mode)
+    
+    def inferencia(self, verificar=True):
+        """Devuelve {'ensemble', 'scaler'} o None para modelos sin clasificador"""
+        if self._inferencia is None and self.directorio is not None:
+            self._inferencia = self._cargar('inferencia', mmap_mode='r', verificar=verificar)
+        return self._inferencia
+    
+    def entrenamiento(self):
+        """Modelos individuales y estadísticas del entrenamiento (solo para análisis)"""
+        if self._entrenamiento is None and self.directorio is not None:
+            self._entrenamiento = self._cargar('entrenamiento')
+        return self._entrenamiento
+    
+    def guardar(self, directorio):
+        """Guarda el modelo (p. ej. uno cargado desde un .pkt antiguo) en formato artefacto"""
+        return guardar_artefacto(directorio, self.tipo, self.parametros,
+                                 inferencia=self.inferencia(),
+                                 entrenamiento=self.entrenamiento(),
+                                 nombres_caracteristicas=self.nombres_caracteristicas)
+
+def cargar_modelo(ruta):
+    """Abre un artefacto (directorio) o, por compatibilidad, un .pkt antiguo"""
+    if es_artefacto(ruta):
+        return ArtefactoModelo.abrir(ruta)
+    
+    if os.path.isfile(ruta):
+        print(f"⚠️ {ruta} usa el formato pickle antiguo; conviértelo con: "
+              f"python artefacto_modelo.py {ruta}")
+        return ArtefactoModelo.desde_pickle(ruta)
+    
+    # Ruta por defecto del artefacto pero solo existe el .pkt antiguo
+    legado = os.path.splitext(ruta)[0] + '.pkt'
+    if os.path.isfile(legado):
+        return cargar_modelo(legado)
+    
+    raise FileNotFoundError(f"No se encontró el modelo en {ruta}")
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Convierte un detector_peleas_modelo.pkt al formato artefacto')
+    parser.add_argument('pkt', help='Archivo .pkt antiguo')
+    parser.add_argument('--salida', default=None, help='Directorio del artefacto (por defecto, mismo nombre sin .pkt)')
+    args = parser.parse_args()
+    
+    salida = args.salida or os.path.splitext(args.pkt)[0]
+    ArtefactoModelo.desde_pickle(args.pkt).guardar(salida)
+    print(f"✅ Artefacto guardado en: {salida}")
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+import detecciones
+from detector_personas import BACKENDS, crear_detector_personas, rutas_onnx
+from evidencia import SumideroEvidencia
+from extractor_caracteristicas import MotorCaracteristicas
+
+# Etapas medidas por frame, en el orden del pipeline
+ETAPAS_BENCHMARK = (
+    'decodificar', 'redimensionar', 'detectar', 'movimiento',
+    'interaccion', 'temporales_contexto', 'clasificar', 'escribir'
+)
+
+# Etapas del extractor que forman cada etapa del benchmark
+ETAPAS_MOTOR = {
+    'movimiento': ('gris_gabor', 'flujo_optico', 'diferencia', 'gradientes', 'textura', 'entropia_movimiento'),
+    'interaccion': ('interaccion',),
+    'temporales_contexto': ('temporales', 'contexto')
+}
+
+def generar_video_sintetico(ruta, ancho=640, alto=480, num_frames=300, personas=4, fps=20.0, semilla=0):
+    """Video determinista de rectángulos que se mueven sobre ruido
+    
+    Cada "persona" es un rectángulo de color que rebota en los bordes. Devuelve
+    la lista con las cajas reales (N, 4) de cada frame, que usa el detector
+    sintético en lugar de YOLO.
+    """
+    rng = np.random.default_rng(semilla)
+    fondo = rng.integers(0, 256, size=(alto, ancho, 3), dtype=np.uint8)
+    ruido = rng.integers(-12, 13, size=(8, alto, ancho, 3), dtype=np.int16)
+    
+    tamanos = np.column_stack([
+        rng.integers(ancho // 12, ancho // 6, personas),
+        rng.integers(alto // 4, alto // 2, personas)
+    ])
+    posiciones = rng.uniform(0, 1, (personas, 2)) * (np.array([ancho, alto]) - tamanos)
+    velocidades = rng.uniform(-8, 8, (personas, 2))
+    colores = rng.integers(0, 256, size=(personas, 3))
+    
+    writer = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*'mp4v'), fps, (ancho, alto))
+    cajas = []
+    for i in range(num_frames):
+        frame = np.clip(fondo + ruido[i % len(ruido)], 0, 255).astype(np.uint8)
+        
+        posiciones += velocidades
+        fuera = (posiciones < 0) | (posiciones > np.array([ancho, alto]) - tamanos)
+        velocidades[fuera] *= -1
+        posiciones = np.clip(posiciones, 0, np.array([ancho, alto]) - tamanos)
+        
+        cajas_frame = np.hstack([posiciones, posiciones + tamanos])
+        for (x1, y1, x2, y2), color in zip(cajas_frame.astype(int), colores):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), tuple(int(c) for c in color), -1)
+        
+        writer.write(frame)
+        cajas.append(cajas_frame.astype(np.float32))
+    writer.release()
+    return cajas
+
+class DetectorSintetico:
+    """Sustituto de YOLO: devuelve las cajas reales del video sintético"""
+    
+    nombre = 'sintetico'
+    
+    def __init__(self, cajas, escala=(1.0, 1.0)):
+        self.cajas = cajas
+        self.escala = np.array(escala * 2, dtype=np.float32)
+    
+    def detectar(self, frame, indice):
+        cajas = self.cajas[indice] * self.escala
+        return detecciones.construir_personas(cajas, np.full(len(cajas), 0.9))
+
+class DetectorYOLO:
+    """YOLO real (yolov8n.pt) con el backend elegido, como en ProbadorPeleas"""
+    
+    def __init__(self, pesos='yolov8n.pt', umbral_confianza=0.4, backend='ultralytics'):
+        self.detector = crear_detector_personas(backend, pesos)
+        self.umbral_confianza = umbral_confianza
+        self.nombre = 'yolo' if backend == 'ultralytics' else f'yolo_{backend}'
+    
+    def detectar(self, frame, indice):
+        return self.detector.detectar(frame, self.umbral_confianza)
+
+def crear_detector(cajas, escala, pesos='yolov8n.pt', forzar_sintetico=False, backend='ultralytics'):
+    """YOLO si están el backend y los pesos; si no, el detector sintético"""
+    disponibles = os.path.exists(pesos) or (backend != 'ultralytics' and os.path.exists(rutas_onnx(pesos)[0]))
+    if not forzar_sintetico and disponibles:
+        try:
+            return DetectorYOLO(pesos, backend=backend)
+        except ImportError as e:
+            print(f"⚠️ Backend {backend} no disponible ({e}), se usa el detector sintético")
+    return DetectorSintetico(cajas, escala)
+
+def crear_clasificador(ruta_modelo=None):
+    """Scaler + ensemble del artefacto; sin modelo, una regresión logística fija de 30 entradas"""
+    if ruta_modelo:
+        from artefacto_modelo import cargar_modelo
+        inferencia = cargar_modelo(ruta_modelo).inferencia()
+        return inferencia['scaler'], inferencia['ensemble'], ruta_modelo
+    
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 30))
+    y = (X[:, 0] + X[:, 3] > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    return scaler, LogisticRegression().fit(scaler.transform(X), y), 'sintetico'
+
+def percentil_ms(tiempos, q):
+    return 1000 * float(np.percentile(tiempos, q)) if len(tiempos) else 0.0
+
+def ejecutar_benchmark(video, frame_size=(640, 480), detector=None, clasificador=None, carpeta_evidencia=None):
+    """Pasa el video por todas las etapas y devuelve los tiempos por frame de cada una"""
+    scaler, modelo, _ = clasificador
+    motor = MotorCaracteristicas()
+    tiempos = {etapa: [] for etapa in ETAPAS_BENCHMARK}
+    sumidero = SumideroEvidencia(carpeta_evidencia, frame_size)
+    
+    cap = cv2.VideoCapture(video)
+    frame = None
+    frames = 0
+    inicio_total = time.perf_counter()
+    while True:
+        inicio = time.perf_counter()
+        ret, crudo = cap.read()
+        if not ret:
+            break
+        t = time.perf_counter()
+        tiempos['decodificar'].append(t - inicio)
+        
+        frame = cv2.resize(crudo, frame_size, dst=frame)
+        inicio, t = t, time.perf_counter()
+        tiempos['redimensionar'].append(t - inicio)
+        
+        personas = detector.detectar(frame, frames)
+        inicio, t = t, time.perf_counter()
+        tiempos['detectar'].append(t - inicio)
+        
+        # El extractor ya acumula el costo de cada una de sus etapas
+        antes = dict(motor.costos)
+        caracteristicas = motor.extraer(frame, personas)
+        for etapa, componentes in ETAPAS_MOTOR.items():
+            tiempos[etapa].append(sum(motor.costos[c] - antes[c] for c in componentes))
+        t = time.perf_counter()
+        
+        score = modelo.predict_proba(scaler.transform(caracteristicas.reshape(1, -1)))[0][1]
+        inicio, t = t, time.perf_counter()
+        tiempos['clasificar'].append(t - inicio)
+        
+        sumidero.agregar(frame, time.time(), score)
+        inicio, t = t, time.perf_counter()
+        tiempos['escribir'].append(t - inicio)
+        frames += 1
+    
+    cap.release()
+    futuro = sumidero.cerrar()
+    if futuro is not None:
+        futuro.result()
+    return tiempos, frames, time.perf_counter() - inicio_total
+
+def resumir(tiempos, frames, segundos):
+    """fps, p50 y p99 (ms) de cada etapa, fps del pipeline completo y RSS máximo"""
+    etapas = {}
+    for etapa, valores in tiempos.items():
+        media = float(np.mean(valores)) if valores else 0.0
+        etapas[etapa] = {
+            'fps': 1.0 / media if media > 0 else float('inf'),
+            'p50_ms': percentil_ms(valores, 50),
+            'p99_ms': percentil_ms(valores, 99)
+        }
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+    return {
+        'frames': frames,
+        'fps_total': frames / segundos if segundos > 0 else 0.0,
+        'rss_max_mb': rss_mb,
+        'etapas': etapas
+    }
+
+def comparar_con_base(resumen, base, tolerancia=0.15):
+    """Lista de regresiones respecto a la línea base (vacía si no hay)"""
+    regresiones = []
+    if resumen['fps_total'] < base['fps_total'] * (1 - tolerancia):
+        regresiones.append(f"fps_total: {resumen['fps_total']:.1f} < {base['fps_total']:.1f}")
+    for etapa, medidas in resumen['etapas'].items():
+        anterior = base['etapas'].get(etapa)
+        if anterior is None:
+            continue
+        # La cola (p99) es más ruidosa: el doble de tolerancia, y se ignoran
+        # diferencias por debajo de 0.5 ms
+        for clave, margen in (('p50_ms', tolerancia), ('p99_ms', 2 * tolerancia)):
+            if medidas[clave] > anterior[clave] * (1 + margen) + 0.5:
+                regresiones.append(f"{etapa}.{clave}: {medidas[clave]:.2f} > {anterior[clave]:.2f}")
+    if resumen['rss_max_mb'] > base['rss_max_mb'] * (1 + tolerancia):
+        regresiones.append(f"rss_max_mb: {resumen['rss_max_mb']:.0f} > {base['rss_max_mb']:.0f}")
+    return regresiones
+
+def mostrar_resumen(resumen, configuracion):
+    print(f"\n📊 BENCHMARK ({resumen['frames']} frames {configuracion['resolucion']}, "
+          f"{configuracion['personas']} personas, detector {configuracion['detector']}, "
+          f"clasificador {configuracion['clasificador']})")
+    print(f"  {'etapa':<22}{'fps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for etapa, medidas in resumen['etapas'].items():
+        print(f"  {etapa:<22}{medidas['fps']:>10.1f}{medidas['p50_ms']:>10.2f}{medidas['p99_ms']:>10.2f}")
+    print(f"🚀 Pipeline completo: {resumen['fps_total']:.1f} fps")
+    print(f"💾 RSS máximo: {resumen['rss_max_mb']:.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline de detección de peleas con video sintético')
+    parser.add_argument('--resolucion', default='640x480', help='Resolución del video sintético (ANCHOxALTO)')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--personas', type=int, default=4)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--video', default=None, help='Usar un video real en lugar del sintético (detector YOLO)')
+    parser.add_argument('--modelo', default=None, help='Artefacto del modelo para la etapa de clasificación')
+    parser.add_argument('--detector-sintetico', action='store_true',
+                        help='No usar YOLO aunque estén los pesos')
+    parser.add_argument('--backend', choices=BACKENDS, default='ultralytics',
+                        help='Backend del detector de personas')
+    parser.add_argument('--base', default=None, help='JSON con la línea base para detectar regresiones')
+    parser.add_argument('--guardar-base', action='store_true', help='Guardar el resultado como nueva línea base')
+    parser.add_argument('--tolerancia', type=float, default=0.15, help='Empeoramiento relativo permitido')
+    parser.add_argument('--salida', default=None, help='Guardar el resultado en JSON')
+    args = parser.parse_args()
+    
+    ancho, alto = (int(v) for v in args.resolucion.lower().split('x'))
+    frame_size = (640, 480)
+    
+    with tempfile.TemporaryDirectory(prefix='benchmark_peleas_') as temporal:
+        if args.video:
+            video = args.video
+            try:
+                detector = DetectorYOLO(backend=args.backend)
+            except ImportError:
+                parser.error(f'con --video hace falta YOLO (backend {args.backend})')
+        else:
+            video = os.path.join(temporal, 'sintetico.mp4')
+            print(f"🎬 Generando video sintético {ancho}x{alto}, {args.frames} frames, {args.personas} personas...")
+            cajas = generar_video_sintetico(video, ancho, alto, args.frames, args.personas, semilla=args.semilla)
+            escala = (frame_size[0] / ancho, frame_size[1] / alto)
+            detector = crear_detector(cajas, escala, forzar_sintetico=args.detector_sintetico,
+                                      backend=args.backend)
+        
+        clasificador = crear_clasificador(args.modelo)
+        carpeta_evidencia = os.path.join(temporal, 'evidencia')
+        os.makedirs(carpeta_evidencia)
+        
+        print(f"⏱️ Midiendo etapas...")
+        tiempos, frames, segundos = ejecutar_benchmark(video, frame_size, detector, clasificador, carpeta_evidencia)
+    
+    resumen = resumir(tiempos, frames, segundos)
+    configuracion = {
+        'resolucion': args.resolucion if not args.video else os.path.basename(args.video),
+        'frames': args.frames,
+        'personas': args.personas,
+        'semilla': args.semilla,
+        'detector': detector.nombre,
+        'clasificador': clasificador[2]
+    }
+    resumen['configuracion'] = configuracion
+    mostrar_resumen(resumen, configuracion)
+    
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resumen, f, indent=2)
+    
+    if args.base and args.guardar_base:
+        with open(args.base, 'w') as f:
+            json.dump(resumen, f, indent=2)
+        print(f"💾 Línea base guardada en {args.base}")
+    elif args.base:
+        with open(args.base) as f:
+            base = json.load(f)
+        if base.get('configuracion') != configuracion:
+            print(f"⚠️ La línea base se midió con otra configuración: {base.get('configuracion')}")
+        regresiones = comparar_con_base(resumen, base, args.tolerancia)
+        if regresiones:
+            print(f"❌ {len(regresiones)} regresiones respecto a {args.base}:")
+            for regresion in regresiones:
+                print(f"  - {regresion}")
+            sys.exit(1)
+        print(f"✅ Sin regresiones respecto a {args.base} (tolerancia {args.tolerancia:.0%})")
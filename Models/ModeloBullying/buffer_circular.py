@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+import threading
+from contextlib import contextmanager
+
+class BufferCircularFrames:
+    """Buffer circular de frames preasignado una sola vez
+    
+    Los frames se decodifican directamente dentro del buffer (cap.read sobre
+    el siguiente hueco). Cada frame tiene un índice absoluto creciente; un
+    índice sigue siendo válido mientras no se hayan capturado `capacidad`
+    frames más nuevos. El hueco del frame `total - capacidad` es el que la
+    captura está sobrescribiendo, así que nunca se considera disponible.
+    
+    Los otros hilos leen con leer() o copiar(): mientras tienen el lock la
+    captura no puede confirmar un frame y pasar al hueco siguiente, así que
+    la comprobación de disponible() y el uso del frame no se separan.
+    """
+    
+    def __init__(self, capacidad, frame_size, canales=3):
+        ancho, alto = frame_size
+        self.capacidad = capacidad
+        self.frame_size = frame_size
+        self.frames = np.zeros((capacidad, alto, ancho, canales), dtype=np.uint8)
+        self.timestamps = np.zeros(capacidad, dtype=np.float64)
+        self.total = 0  # Frames capturados desde el inicio (siguiente índice absoluto)
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return min(self.total, self.capacidad - 1)
+    
+    def capturar(self, cap, timestamp):
+        """Decodifica el siguiente frame de `cap` dentro del buffer
+        
+        Devuelve (índice, vista del frame) o (None, None) si la fuente no entregó frame.
+        """
+        slot = self.frames[self.total % self.capacidad]
+        ret, frame = cap.read(slot)
+        if not ret:
+            return None, None
+        
+        if not np.shares_memory(frame, slot):
+            # La fuente entrega otra resolución: redimensionar dentro del hueco
+            if frame.shape[1::-1] == self.frame_size:
+                np.copyto(slot, frame)
+            else:
+                cv2.resize(frame, self.frame_size, dst=slot)
+        
+        return self._confirmar(timestamp), slot
+    
+    def agregar(self, frame, timestamp):
+        """Copia un frame ya decodificado al buffer (fuentes que no admiten decodificar en sitio)"""
+        slot = self.frames[self.total % self.capacidad]
+        if frame.shape[1::-1] == self.frame_size:
+            np.copyto(slot, frame)
+        else:
+            cv2.resize(frame, self.frame_size, dst=slot)
+        return self._confirmar(timestamp), slot
+    
+    def _confirmar(self, timestamp):
+        with self.lock:
+            indice = self.total
+            self.timestamps[indice % self.capacidad] = timestamp
+            self.total += 1
+        return indice
+    
+    def disponible(self, indice):
+        """True si el frame `indice` todavía no fue sobrescrito ni se está sobrescribiendo"""
+        return self.total - self.capacidad < indice < self.total
+    
+    def frame(self, indice):
+        """Vista del frame con índice absoluto `indice` (sin protección: solo desde el hilo de captura)"""
+        return self.frames[indice % self.capacidad]
+    
+    @contextmanager
+    def leer(self, indice):
+        """Vista del frame `indice` (None si ya se sobrescribió) que no cambia hasta salir del bloque
+        
+        La captura queda en espera mientras dura el bloque: usarlo solo para
+        trabajo corto, como escribir el frame al clip.
+        """
+        with self.lock:
+            yield self.frames[indice % self.capacidad] if self.disponible(indice) else None
+    
+    def copiar(self, indice):
+        """Copia propia del frame `indice`, o None si ya se sobrescribió"""
+        with self.leer(indice) as frame:
+            return None if frame is None else frame.copy()
+    
+    def timestamp(self, indice):
+        return self.timestamps[indice % self.capacidad]
+    
+    def rango(self, inicio, fin):
+        """Índices disponibles en [inicio, fin), del más antiguo al más nuevo"""
+        return range(max(inicio, self.total - self.capacidad + 1, 0), min(fin, self.total))
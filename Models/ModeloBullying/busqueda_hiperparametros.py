@@ -0,0 +1,131 @@
+import os
+import time
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, ParameterGrid, StratifiedKFold
+from sklearn.experimental import enable_halving_search_cv  # Habilita las búsquedas por mitades (experimental)
+from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
+
+MODOS_BUSQUEDA = ('halving', 'aleatoria', 'grid')
+
+# En halving cada candidato cuesta en promedio ~1.5 rondas de validación cruzada
+# (todas las rondas juntas suman n + n/3 + n/9 + ... ajustes por pliegue)
+AJUSTES_POR_CANDIDATO_HALVING = 1.5
+
+def buscar_hiperparametros(modelo, parametros, X, y, modo='halving', cv=5, max_ajustes=None,
+                           max_segundos=None, paciencia=None, scoring='accuracy', n_jobs=-1,
+                           semilla=42):
+    """Búsqueda de hiperparámetros con presupuesto
+    
+    Modos:
+      - 'grid': GridSearchCV exhaustivo (el comportamiento anterior).
+      - 'halving': búsqueda por mitades sucesivas; los candidatos se
+        descartan con pocos datos y solo los mejores llegan a todo el
+        conjunto. Con `max_ajustes` se limita el número de candidatos.
+      - 'aleatoria': candidatos de la rejilla en orden aleatorio, por rondas
+        paralelas, hasta agotar `max_ajustes` y/o `max_segundos`, o tras
+        `paciencia` rondas sin mejorar.
+    
+    La puntuación de validación cruzada del mejor candidato sale de los
+    resultados de la propia búsqueda (cv_results_), sin volver a evaluarla.
+    
+    Devuelve un diccionario con el modelo ya ajustado sobre (X, y), sus
+    parámetros, cv_mean, cv_std, ajustes realizados, candidatos y segundos.
+    """
+    if modo not in MODOS_BUSQUEDA:
+        raise ValueError(f"Modo de búsqueda desconocido: {modo} (opciones: {', '.join(MODOS_BUSQUEDA)})")
+    
+    pliegues = StratifiedKFold(n_splits=cv, shuffle=True, random_state=semilla)
+    inicio = time.perf_counter()
+    
+    if modo == 'aleatoria':
+        resultado = _busqueda_aleatoria(modelo, parametros, X, y, pliegues, max_ajustes, max_segundos,
+                                        paciencia, scoring, n_jobs, semilla)
+    else:
+        if modo == 'grid':
+            busqueda = GridSearchCV(modelo, parametros, cv=pliegues, scoring=scoring, n_jobs=n_jobs)
+        else:
+            total_candidatos = len(ParameterGrid(parametros))
+            max_candidatos = total_candidatos
+            if max_ajustes is not None:
+                max_candidatos = max(2, int(max_ajustes / (cv * AJUSTES_POR_CANDIDATO_HALVING)))
+            
+            if max_candidatos >= total_candidatos:
+                busqueda = HalvingGridSearchCV(modelo, parametros, cv=pliegues, scoring=scoring,
+                                               n_jobs=n_jobs, random_state=semilla)
+            else:
+                busqueda = HalvingRandomSearchCV(modelo, parametros, n_candidates=max_candidatos,
+                                                 cv=pliegues, scoring=scoring, n_jobs=n_jobs,
+                                                 random_state=semilla)
+        busqueda.fit(X, y)
+        
+        mejor = busqueda.best_index_
+        resultado = {
+            'modelo': busqueda.best_estimator_,
+            'params': busqueda.best_params_,
+            'cv_mean': float(busqueda.cv_results_['mean_test_score'][mejor]),
+            'cv_std': float(busqueda.cv_results_['std_test_score'][mejor]),
+            # En halving cv_results_ tiene una fila por candidato y ronda
+            'candidatos': int(getattr(busqueda, 'n_candidates_', [len(busqueda.cv_results_['params'])])[0]),
+            'ajustes': len(busqueda.cv_results_['params']) * cv + 1
+        }
+    
+    resultado['modo'] = modo
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+def _busqueda_aleatoria(modelo, parametros, X, y, pliegues, max_ajustes, max_segundos,
+                        paciencia, scoring, n_jobs, semilla):
+    """Rondas de candidatos aleatorios hasta agotar el presupuesto"""
+    candidatos = list(ParameterGrid(parametros))
+    np.random.default_rng(semilla).shuffle(candidatos)
+    
+    cv = pliegues.get_n_splits()
+    if max_ajustes is not None:
+        candidatos = candidatos[:max(1, max_ajustes // cv)]
+    
+    # Cada ronda evalúa tantos candidatos como núcleos para aprovechar n_jobs
+    tam_ronda = n_jobs if n_jobs and n_jobs > 0 else (os.cpu_count() or 1)
+    inicio = time.perf_counter()
+    
+    medias, desviaciones, evaluados = [], [], []
+    mejor_media = -np.inf
+    rondas_sin_mejora = 0
+    
+    for i in range(0, len(candidatos), tam_ronda):
+        ronda = candidatos[i:i + tam_ronda]
+        busqueda = GridSearchCV(
+            clone(modelo), [{clave: [valor] for clave, valor in candidato.items()} for candidato in ronda],
+            cv=pliegues, scoring=scoring, n_jobs=n_jobs, refit=False
+        )
+        busqueda.fit(X, y)
+        
+        medias.extend(busqueda.cv_results_['mean_test_score'])
+        desviaciones.extend(busqueda.cv_results_['std_test_score'])
+        evaluados.extend(busqueda.cv_results_['params'])
+        
+        if max(busqueda.cv_results_['mean_test_score']) > mejor_media:
+            mejor_media = max(busqueda.cv_results_['mean_test_score'])
+            rondas_sin_mejora = 0
+        else:
+            rondas_sin_mejora += 1
+        
+        if max_segundos is not None and time.perf_counter() - inicio >= max_segundos:
+            print(f"  ⏰ Presupuesto de tiempo agotado tras {len(evaluados)}/{len(candidatos)} candidatos")
+            break
+        if paciencia is not None and rondas_sin_mejora >= paciencia:
+            print(f"  🛑 Sin mejora en {paciencia} rondas, se detiene tras {len(evaluados)} candidatos")
+            break
+    
+    # Un solo ajuste final del mejor candidato sobre todos los datos
+    mejor = int(np.argmax(medias))
+    mejor_modelo = clone(modelo).set_params(**evaluados[mejor]).fit(X, y)
+    
+    return {
+        'modelo': mejor_modelo,
+        'params': evaluados[mejor],
+        'cv_mean': float(medias[mejor]),
+        'cv_std': float(desviaciones[mejor]),
+        'candidatos': len(evaluados),
+        'ajustes': len(evaluados) * cv + 1
+    }
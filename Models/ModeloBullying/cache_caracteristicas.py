@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+class CacheCaracteristicas:
+    """Caché en disco de las características extraídas de cada video
+    
+    Cada entrada guarda la matriz de características y las etiquetas como .npy
+    (cargables con mmap) y se identifica por el hash del contenido del video más
+    los parámetros de extracción (muestreo, tamaño, versión del extractor...).
+    Si cualquiera de ellos cambia, la clave cambia y la entrada vieja se borra
+    al guardar la nueva.
+    """
+    
+    def __init__(self, directorio='cache_caracteristicas'):
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, 'indice_hashes.json')
+        os.makedirs(directorio, exist_ok=True)
+        self.indice_hashes = self._cargar_indice()
+    
+    def _cargar_indice(self):
+        """Carga el índice ruta -> (tamaño, mtime, hash) para no releer videos sin cambios"""
+        if not os.path.exists(self.ruta_indice):
+            return {}
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _guardar_indice(self):
+        temporal = self.ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.indice_hashes, f, indent=2)
+        os.replace(temporal, self.ruta_indice)
+    
+    def hash_contenido(self, ruta_video):
+        """SHA-256 del contenido del video (reutilizado mientras tamaño y mtime no cambien)"""
+        ruta_absoluta = os.path.abspath(ruta_video)
+        info = os.stat(ruta_absoluta)
+        firma = [info.st_size, info.st_mtime_ns]
+        
+        guardado = self.indice_hashes.get(ruta_absoluta)
+        if guardado and guardado['firma'] == firma:
+            return guardado['hash']
+        
+        sha = hashlib.sha256()
+        with open(ruta_absoluta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloque)
+        
+        digest = sha.hexdigest()
+        self.indice_hashes[ruta_absoluta] = {'firma': firma, 'hash': digest}
+        self._guardar_indice()
+        return digest
+    
+    def _prefijo(self, ruta_video):
+        """Prefijo común a todas las entradas de un mismo video"""
+        ruta_absoluta = os.path.abspath(ruta_video)
+        nombre = os.path.splitext(os.path.basename(ruta_absoluta))[0]
+        return f"{nombre}-{hashlib.sha1(ruta_absoluta.encode('utf-8')).hexdigest()[:8]}"
+    
+    def clave(self, ruta_video, parametros):
+        """Clave de la entrada: hash del video + parámetros de extracción"""
+        datos = {'video': self.hash_contenido(ruta_video), 'parametros': parametros}
+        serializado = json.dumps(datos, sort_keys=True, default=str)
+        return hashlib.sha256(serializado.encode('utf-8')).hexdigest()[:16]
+    
+    def _rutas(self, ruta_video, clave):
+        base = os.path.join(self.directorio, f"{self._prefijo(ruta_video)}.{clave}")
+        return base + '.X.npy', base + '.y.npy'
+    
+    def cargar(self, ruta_video, parametros):
+        """Devuelve (X, y) mapeados en memoria, o (None, None) si no hay entrada válida"""
+        ruta_X, ruta_y = self._rutas(ruta_video, self.clave(ruta_video, parametros))
+        
+        if not (os.path.exists(ruta_X) and os.path.exists(ruta_y)):
+            return None, None
+        
+        try:
+            return np.load(ruta_X, mmap_mode='r'), np.load(ruta_y, mmap_mode='r')
+        except (OSError, ValueError):
+            # Entrada corrupta (p. ej. escritura interrumpida): se regenerará
+            return None, None
+    
+    def guardar(self, ruta_video, parametros, X, y):
+        """Guarda (X, y) para el video y elimina las entradas obsoletas del mismo video"""
+        clave = self.clave(ruta_video, parametros)
+        ruta_X, ruta_y = self._rutas(ruta_video, clave)
+        
+        for ruta, datos in ((ruta_X, X), (ruta_y, y)):
+            temporal = ruta + '.tmp'
+            with open(temporal, 'wb') as f:
+                np.save(f, np.ascontiguousarray(datos))
+            os.replace(temporal, ruta)
+        
+        prefijo = self._prefijo(ruta_video) + '.'
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith(prefijo) and f".{clave}." not in nombre:
+                os.remove(os.path.join(self.directorio, nombre))
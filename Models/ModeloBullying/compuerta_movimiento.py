@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+class CompuertaMovimiento:
+    """Decide si un frame merece pasar por YOLO y el clasificador
+    
+    Compara una versión reducida en gris del frame (80x60 por defecto) con la
+    del último frame que sí se analizó; como la referencia solo avanza cuando
+    la compuerta se abre, también se detectan cambios lentos. Tras ver
+    movimiento la compuerta sigue abierta `frames_retencion` frames para no
+    cortar el inicio de un incidente, y cada `max_intervalo` frames se abre
+    igualmente para refrescar la lista de personas.
+    """
+    
+    def __init__(self, tamano=(80, 60), umbral_pixel=20, umbral_fraccion=0.002,
+                 frames_retencion=20, max_intervalo=60):
+        self.tamano = tamano
+        self.umbral_pixel = umbral_pixel          # Cambio mínimo de intensidad de un píxel
+        self.umbral_fraccion = umbral_fraccion    # Fracción mínima de píxeles que cambian
+        self.frames_retencion = frames_retencion
+        self.max_intervalo = max_intervalo
+        
+        ancho, alto = tamano
+        self.pequeno = np.empty((alto, ancho, 3), np.uint8)
+        self.gris = np.empty((alto, ancho), np.uint8)
+        self.referencia = np.empty((alto, ancho), np.uint8)
+        self.diff = np.empty((alto, ancho), np.uint8)
+        self.hay_referencia = False
+        
+        self.retencion_restante = 0
+        self.frames_cerrada = 0
+        self.ultima_fraccion = 0.0
+        
+        # Estadísticas
+        self.evaluados = 0
+        self.abiertos = 0
+    
+    def evaluar(self, frame):
+        """True si el frame debe analizarse; False si se puede reutilizar el último resultado"""
+        self.evaluados += 1
+        cv2.resize(frame, self.tamano, dst=self.pequeno, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.pequeno, cv2.COLOR_BGR2GRAY, dst=self.gris)
+        
+        if self.hay_referencia:
+            cv2.absdiff(self.gris, self.referencia, dst=self.diff)
+            cambiados = np.count_nonzero(self.diff > self.umbral_pixel)
+            self.ultima_fraccion = float(cambiados) / self.diff.size
+            hay_movimiento = self.ultima_fraccion >= self.umbral_fraccion
+        else:
+            hay_movimiento = True
+        
+        if hay_movimiento:
+            self.retencion_restante = self.frames_retencion
+        elif self.retencion_restante > 0:
+            self.retencion_restante -= 1
+        
+        abierta = hay_movimiento or self.retencion_restante > 0 or self.frames_cerrada >= self.max_intervalo
+        
+        if abierta:
+            self.abiertos += 1
+            self.frames_cerrada = 0
+            self.referencia, self.gris = self.gris, self.referencia
+            self.hay_referencia = True
+        else:
+            self.frames_cerrada += 1
+        
+        return abierta
+    
+    def tasa_apertura(self):
+        return self.abiertos / self.evaluados if self.evaluados else 0.0
+    
+    def reporte(self):
+        """Umbrales configurados y fracción de frames que pasaron la compuerta"""
+        return {
+            'umbral_pixel': self.umbral_pixel,
+            'umbral_fraccion': self.umbral_fraccion,
+            'frames_retencion': self.frames_retencion,
+            'max_intervalo': self.max_intervalo,
+            'evaluados': self.evaluados,
+            'abiertos': self.abiertos,
+            'tasa_apertura': self.tasa_apertura(),
+            'ultima_fraccion': self.ultima_fraccion
+        }
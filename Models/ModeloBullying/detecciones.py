@@ -0,0 +1,84 @@
+import numpy as np
+
+# Columnas del arreglo de personas (N, 6): caja xyxy, confianza y área
+X1, Y1, X2, Y2, CONF, AREA = range(6)
+NUM_COLUMNAS = 6
+
+# Columna extra que añade el rastreador: ID persistente de cada persona (N, 7)
+ID = 6
+
+def personas_vacias():
+    """Arreglo de personas sin detecciones"""
+    return np.zeros((0, NUM_COLUMNAS), dtype=np.float32)
+
+def construir_personas(xyxy, confianzas):
+    """Construye el arreglo (N, 6) float32 a partir de cajas xyxy y confianzas"""
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    personas = np.empty((len(xyxy), NUM_COLUMNAS), dtype=np.float32)
+    personas[:, X1:Y2 + 1] = xyxy
+    personas[:, CONF] = confianzas
+    personas[:, AREA] = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    return personas
+
+def personas_desde_resultado(result, umbral_confianza):
+    """Convierte un resultado de YOLO en el arreglo de personas sin recorrer caja por caja"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return personas_vacias()
+    
+    xyxy = boxes.xyxy.cpu().numpy()
+    conf = boxes.conf.cpu().numpy()
+    mascara = conf > umbral_confianza
+    return construir_personas(xyxy[mascara], conf[mascara])
+
+def con_ids(personas, ids):
+    """Añade la columna de IDs de seguimiento al arreglo de personas"""
+    return np.column_stack([personas[:, :NUM_COLUMNAS], np.asarray(ids, dtype=np.float32)])
+
+def tiene_ids(personas):
+    return personas.shape[1] > ID
+
+def centros(personas):
+    """Centros (N, 2) de las cajas"""
+    return (personas[:, X1:Y1 + 1] + personas[:, X2:Y2 + 1]) * 0.5
+
+def distancias_pares(puntos):
+    """Matriz (N, N) de distancias euclidianas entre puntos"""
+    diff = puntos[:, None, :] - puntos[None, :, :]
+    return np.sqrt(np.sum(diff * diff, axis=-1))
+
+def iou_entre(a, b):
+    """Matriz (N, M) de IoU entre las cajas de `a` y las de `b`"""
+    x1 = np.maximum(a[:, None, X1], b[None, :, X1])
+    y1 = np.maximum(a[:, None, Y1], b[None, :, Y1])
+    x2 = np.minimum(a[:, None, X2], b[None, :, X2])
+    y2 = np.minimum(a[:, None, Y2], b[None, :, Y2])
+    
+    interseccion = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = a[:, None, AREA] + b[None, :, AREA] - interseccion
+    return np.where(interseccion > 0, interseccion / np.maximum(union, 1e-7), 0.0)
+
+def iou_pares(personas):
+    """Matriz (N, N) de IoU entre todas las cajas"""
+    return iou_entre(personas, personas)
+
+def triangulo_superior(matriz):
+    """Valores de cada par (i < j) de una matriz simétrica"""
+    i, j = np.triu_indices(len(matriz), k=1)
+    return matriz[i, j]
+
+def supresion_no_maxima(personas, umbral_iou):
+    """Índices de las cajas que sobreviven a la NMS, de mayor a menor confianza
+    
+    Se descartan las cajas con IoU > umbral_iou respecto a una caja de mayor
+    confianza ya conservada (NMS voraz, como la de YOLO).
+    """
+    orden = np.argsort(-personas[:, CONF], kind='stable')
+    conservar = []
+    while len(orden):
+        mejor = orden[0]
+        conservar.append(mejor)
+        resto = orden[1:]
+        iou = iou_entre(personas[mejor:mejor + 1], personas[resto])[0]
+        orden = resto[iou <= umbral_iou]
+    return np.array(conservar, dtype=np.intp)
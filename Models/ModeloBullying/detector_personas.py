@@ -0,0 +1,260 @@
+import argparse
+import math
+import os
+import time
+import cv2
+import numpy as np
+import detecciones
+
+# Backends intercambiables del detector de personas
+BACKENDS = ('ultralytics', 'onnx', 'onnx_int8')
+
+PESOS_POR_DEFECTO = 'yolov8n.pt'
+CLASE_PERSONA = 0
+
+class DetectorPersonasUltralytics:
+    """YOLO a través del wrapper de ultralytics (necesita torch)"""
+    
+    backend = 'ultralytics'
+    
+    def __init__(self, pesos=PESOS_POR_DEFECTO):
+        from ultralytics import YOLO
+        self.yolo = YOLO(pesos)
+    
+    def detectar_lote(self, frames, umbral_confianza):
+        results = self.yolo(frames, classes=[CLASE_PERSONA], verbose=False)
+        return [detecciones.personas_desde_resultado(result, umbral_confianza) for result in results]
+    
+    def detectar(self, frame, umbral_confianza):
+        return self.detectar_lote([frame], umbral_confianza)[0]
+
+def forma_letterbox(alto, ancho, tamano=640, paso=32):
+    """Escala y forma (alto, ancho) de entrada para un frame, múltiplo de `paso`
+    
+    El lado mayor queda en `tamano` y el otro se rellena solo hasta el
+    siguiente múltiplo de `paso` (un 640x480 entra como 640x480, no 640x640).
+    """
+    escala = min(tamano / alto, tamano / ancho)
+    nuevo_alto, nuevo_ancho = round(alto * escala), round(ancho * escala)
+    return escala, (math.ceil(nuevo_alto / paso) * paso, math.ceil(nuevo_ancho / paso) * paso)
+
+def letterbox(frame, forma, relleno=114):
+    """Redimensiona manteniendo la proporción y centra el frame en un lienzo `forma` (alto, ancho)
+    
+    Devuelve la imagen, la escala y el desplazamiento (dx, dy) para deshacer
+    la transformación en las cajas.
+    """
+    alto, ancho = frame.shape[:2]
+    escala = min(forma[0] / alto, forma[1] / ancho)
+    nuevo_ancho, nuevo_alto = round(ancho * escala), round(alto * escala)
+    if (nuevo_ancho, nuevo_alto) != (ancho, alto):
+        frame = cv2.resize(frame, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+    
+    # Mismo reparto del relleno que ultralytics
+    dx = (forma[1] - nuevo_ancho) / 2
+    dy = (forma[0] - nuevo_alto) / 2
+    arriba, abajo = round(dy - 0.1), round(dy + 0.1)
+    izquierda, derecha = round(dx - 0.1), round(dx + 0.1)
+    if arriba or abajo or izquierda or derecha:
+        frame = cv2.copyMakeBorder(frame, arriba, abajo, izquierda, derecha, cv2.BORDER_CONSTANT,
+                                   value=(relleno, relleno, relleno))
+    return frame, escala, (izquierda, arriba)
+
+def preparar_lote(frames, forma):
+    """Tensor NCHW float32 RGB en [0, 1] y las transformaciones de cada frame"""
+    tensor = np.empty((len(frames), 3, forma[0], forma[1]), dtype=np.float32)
+    transformaciones = []
+    for i, frame in enumerate(frames):
+        imagen, escala, desplazamiento = letterbox(frame, forma)
+        # BGR (OpenCV) -> RGB y HWC -> CHW en una sola copia
+        np.multiply(imagen[:, :, ::-1].transpose(2, 0, 1), np.float32(1 / 255), out=tensor[i], casting='unsafe')
+        transformaciones.append((escala, desplazamiento, frame.shape[:2]))
+    return tensor, transformaciones
+
+def postprocesar(salida, transformaciones, umbral_confianza, umbral_iou=0.7, max_detecciones=300):
+    """Convierte la salida cruda de YOLOv8 (N, 4 + clases, anclas) en arreglos de personas
+    
+    Igual que ultralytics con classes=[0]: una caja es persona si supera el
+    umbral y la persona es su clase más probable. Después, NMS y las cajas se
+    llevan de vuelta a las coordenadas del frame original.
+    """
+    salida = salida.transpose(0, 2, 1)  # (N, anclas, 4 + clases)
+    
+    resultados = []
+    for prediccion, (escala, (dx, dy), (alto, ancho)) in zip(salida, transformaciones):
+        candidatas = prediccion[prediccion[:, 4 + CLASE_PERSONA] > umbral_confianza]
+        candidatas = candidatas[np.argmax(candidatas[:, 4:], axis=1) == CLASE_PERSONA]
+        if len(candidatas) == 0:
+            resultados.append(detecciones.personas_vacias())
+            continue
+        
+        # cx, cy, w, h -> x1, y1, x2, y2
+        centro, lados = candidatas[:, 0:2], candidatas[:, 2:4] * 0.5
+        personas = detecciones.construir_personas(np.hstack([centro - lados, centro + lados]),
+                                                  candidatas[:, 4 + CLASE_PERSONA])
+        personas = personas[detecciones.supresion_no_maxima(personas, umbral_iou)[:max_detecciones]]
+        
+        # Deshacer el letterbox
+        xyxy = personas[:, detecciones.X1:detecciones.Y2 + 1]
+        xyxy -= (dx, dy, dx, dy)
+        xyxy /= escala
+        np.clip(xyxy[:, 0::2], 0, ancho, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, alto, out=xyxy[:, 1::2])
+        resultados.append(detecciones.construir_personas(xyxy, personas[:, detecciones.CONF]))
+    return resultados
+
+class DetectorPersonasONNX:
+    """YOLOv8 exportado a ONNX y ejecutado con ONNX Runtime en CPU
+    
+    No depende de torch ni de ultralytics: el preprocesamiento (letterbox) y
+    el posprocesamiento (umbral, clase persona, NMS) se hacen en NumPy. Sirve
+    igual para el grafo float32 y para el cuantizado a INT8.
+    """
+    
+    def __init__(self, ruta_onnx, num_hilos=None, tamano=640, backend='onnx'):
+        import onnxruntime as ort
+        
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_hilos:
+            opciones.intra_op_num_threads = num_hilos
+            opciones.inter_op_num_threads = 1
+        self.sesion = ort.InferenceSession(ruta_onnx, sess_options=opciones, providers=['CPUExecutionProvider'])
+        self.entrada = self.sesion.get_inputs()[0]
+        self.backend = backend
+        self.ruta = ruta_onnx
+        self.tamano = tamano
+        
+        # Un grafo exportado con tamaño fijo solo acepta esa forma; uno dinámico, cualquier múltiplo de 32
+        alto, ancho = self.entrada.shape[2:]
+        self.forma_fija = (alto, ancho) if isinstance(alto, int) and isinstance(ancho, int) else None
+        self.lote_fijo = self.entrada.shape[0] if isinstance(self.entrada.shape[0], int) else None
+    
+    def forma_entrada(self, frames):
+        if self.forma_fija is not None:
+            return self.forma_fija
+        formas = [forma_letterbox(*frame.shape[:2], tamano=self.tamano)[1] for frame in frames]
+        return max(f[0] for f in formas), max(f[1] for f in formas)
+    
+    def detectar_lote(self, frames, umbral_confianza):
+        if not frames:
+            return []
+        if self.lote_fijo == 1 and len(frames) > 1:
+            # Grafo exportado sin lote dinámico: un frame por llamada
+            return [persona for frame in frames for persona in self.detectar_lote([frame], umbral_confianza)]
+        
+        tensor, transformaciones = preparar_lote(frames, self.forma_entrada(frames))
+        salida = self.sesion.run(None, {self.entrada.name: tensor})[0]
+        return postprocesar(salida, transformaciones, umbral_confianza)
+    
+    def detectar(self, frame, umbral_confianza):
+        return self.detectar_lote([frame], umbral_confianza)[0]
+
+def rutas_onnx(pesos):
+    """Rutas del grafo ONNX float32 y del cuantizado a INT8 que corresponden a unos pesos"""
+    base = os.path.splitext(pesos)[0]
+    if base.endswith('_int8'):
+        base = base[:-len('_int8')]
+    return base + '.onnx', base + '_int8.onnx'
+
+def exportar_onnx(pesos=PESOS_POR_DEFECTO, ruta_onnx=None, tamano=640):
+    """Exporta los pesos de ultralytics a ONNX con lote y resolución dinámicos
+    
+    Solo hace falta ultralytics en la máquina que exporta; las cámaras
+    únicamente necesitan el .onnx y onnxruntime.
+    """
+    from ultralytics import YOLO
+    ruta_onnx = ruta_onnx or rutas_onnx(pesos)[0]
+    exportado = YOLO(pesos).export(format='onnx', imgsz=tamano, dynamic=True)
+    if os.path.abspath(exportado) != os.path.abspath(ruta_onnx):
+        os.replace(exportado, ruta_onnx)
+    return ruta_onnx
+
+def cuantizar_int8(ruta_onnx, ruta_int8=None):
+    """Cuantización dinámica de los pesos a INT8 (las activaciones se cuantizan al vuelo)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ruta_int8 = ruta_int8 or rutas_onnx(ruta_onnx)[1]
+    # ConvInteger de la CPU solo admite pesos sin signo
+    quantize_dynamic(ruta_onnx, ruta_int8, weight_type=QuantType.QUInt8)
+    return ruta_int8
+
+def preparar_onnx(pesos=PESOS_POR_DEFECTO, cuantizado=False, tamano=640):
+    """Ruta del grafo ONNX del backend, exportándolo o cuantizándolo si todavía no existe"""
+    if pesos.endswith('.onnx') and (cuantizado == pesos.endswith('_int8.onnx')):
+        return pesos
+    
+    ruta_onnx, ruta_int8 = rutas_onnx(pesos)
+    if cuantizado and os.path.exists(ruta_int8):
+        return ruta_int8
+    if not os.path.exists(ruta_onnx):
+        print(f"📦 Exportando {pesos} a ONNX ({ruta_onnx})...")
+        exportar_onnx(pesos, ruta_onnx, tamano)
+    if not cuantizado:
+        return ruta_onnx
+    
+    print(f"🗜️ Cuantizando {ruta_onnx} a INT8 ({ruta_int8})...")
+    return cuantizar_int8(ruta_onnx, ruta_int8)
+
+def crear_detector_personas(backend='ultralytics', pesos=PESOS_POR_DEFECTO, num_hilos=None, tamano=640):
+    """Crea el detector de personas del backend pedido
+    
+    - 'ultralytics': el wrapper de Python original (torch).
+    - 'onnx': grafo ONNX float32 con ONNX Runtime, sin torch.
+    - 'onnx_int8': el mismo grafo con los pesos cuantizados a INT8.
+    
+    Los backends ONNX exportan/cuantizan los pesos la primera vez si no
+    encuentran el .onnx junto a ellos.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de detector desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    
+    if backend == 'ultralytics':
+        return DetectorPersonasUltralytics(pesos)
+    ruta = preparar_onnx(pesos, cuantizado=backend == 'onnx_int8', tamano=tamano)
+    return DetectorPersonasONNX(ruta, num_hilos=num_hilos, tamano=tamano, backend=backend)
+
+def comparar_backends(video, backends=BACKENDS, pesos=PESOS_POR_DEFECTO, frames=100, umbral_confianza=0.4,
+                      frame_size=(640, 480), num_hilos=None):
+    """Mide cada backend sobre los mismos frames: ms por frame y personas detectadas"""
+    cap = cv2.VideoCapture(video)
+    muestras = []
+    while len(muestras) < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        muestras.append(cv2.resize(frame, frame_size))
+    cap.release()
+    
+    resultados = {}
+    for backend in backends:
+        detector = crear_detector_personas(backend, pesos, num_hilos)
+        detector.detectar(muestras[0], umbral_confianza)  # Calentamiento
+        inicio = time.perf_counter()
+        personas = [len(detector.detectar(frame, umbral_confianza)) for frame in muestras]
+        segundos = time.perf_counter() - inicio
+        resultados[backend] = {
+            'ms_por_frame': 1000 * segundos / max(len(muestras), 1),
+            'personas_por_frame': float(np.mean(personas)) if personas else 0.0
+        }
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Exporta el detector de personas a ONNX/INT8 y compara backends')
+    parser.add_argument('--pesos', default=PESOS_POR_DEFECTO)
+    parser.add_argument('--backend', choices=BACKENDS, nargs='+', default=['onnx', 'onnx_int8'],
+                        help='Backends a preparar (y a comparar con --video)')
+    parser.add_argument('--video', default=None, help='Video para comparar la velocidad de los backends')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--hilos', type=int, default=None, help='Hilos de ONNX Runtime')
+    args = parser.parse_args()
+    
+    if args.video:
+        print(f"⏱️ Comparando backends en {args.video}...")
+        for backend, medidas in comparar_backends(args.video, args.backend, args.pesos, args.frames,
+                                                  num_hilos=args.hilos).items():
+            print(f"  {backend:<12}{medidas['ms_por_frame']:>8.1f} ms/frame"
+                  f"{medidas['personas_por_frame']:>8.2f} personas/frame")
+    else:
+        for backend in args.backend:
+            if backend != 'ultralytics':
+                print(f"✅ {backend}: {preparar_onnx(args.pesos, cuantizado=backend == 'onnx_int8')}")
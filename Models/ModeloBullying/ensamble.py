@@ -0,0 +1,23 @@
+import numpy as np
+
+class EnsambleVotacion:
+    """Votación suave sobre modelos ya entrenados
+    
+    Equivale a VotingClassifier(voting='soft') pero sin volver a ajustar los
+    modelos: la búsqueda de hiperparámetros ya dejó cada uno entrenado sobre
+    los mismos datos, así que el ensemble solo promedia sus probabilidades.
+    """
+    
+    def __init__(self, modelos):
+        self.named_estimators_ = dict(modelos)
+        self.estimators_ = list(self.named_estimators_.values())
+        self.classes_ = self.estimators_[0].classes_
+        for nombre, modelo in self.named_estimators_.items():
+            if not np.array_equal(modelo.classes_, self.classes_):
+                raise ValueError(f"El modelo {nombre} tiene clases distintas al resto")
+    
+    def predict_proba(self, X):
+        return np.mean([modelo.predict_proba(X) for modelo in self.estimators_], axis=0)
+    
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
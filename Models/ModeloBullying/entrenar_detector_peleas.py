@@ -1,15 +1,17 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import os
-import pickle
 from collections import deque
 import time
+from artefacto_modelo import guardar_artefacto
+from lector_video import LectorVideo
+from detector_personas import crear_detector_personas
 
 class DetectorPeleas:
-    def __init__(self):
+    def __init__(self, backend_detector='ultralytics'):
         # Cargar modelo YOLO preentrenado
-        self.model = YOLO('yolov8n.pt')  # Modelo ligero para detección de personas
+        self.backend_detector = backend_detector
+        self.detector = crear_detector_personas(backend_detector, 'yolov8n.pt')  # Modelo ligero para detección de personas
         
         # Parámetros para análisis de movimiento
         self.motion_threshold = 5000
@@ -21,19 +23,13 @@ class DetectorPeleas:
         
     def detectar_personas(self, frame):
         """Detecta personas en el frame usando YOLO"""
-        results = self.model(frame, classes=[0], verbose=False)  # Clase 0 = personas
         personas = []
         
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    if box.conf[0] > 0.5:  # Confianza > 50%
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        personas.append({
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                            'confianza': float(box.conf[0])
-                        })
+        for x1, y1, x2, y2, conf in self.detector.detectar(frame, 0.5)[:, :5]:  # Confianza > 50%
+            personas.append({
+                'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                'confianza': float(conf)
+            })
         return personas
     
     def calcular_movimiento(self, frame_actual, frame_anterior):
@@ -102,31 +98,20 @@ class DetectorPeleas:
     
     def procesar_video(self, ruta_video):
         """Procesa un video completo y extrae características"""
-        cap = cv2.VideoCapture(ruta_video)
+        # Procesar cada 5 frames para optimizar: los demás no se decodifican
+        lector = LectorVideo(ruta_video, paso=5, tamano=(640, 480))
         
-        if not cap.isOpened():
+        if not lector.abierto():
             print(f"Error al abrir video: {ruta_video}")
             return None
         
         frame_anterior = None
         caracteristicas_video = []
-        frame_count = 0
         
         print(f"Procesando: {ruta_video}")
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # Procesar cada 5 frames para optimizar
-            if frame_count % 5 != 0:
-                continue
-            
-            # Redimensionar para optimizar procesamiento
-            frame_resized = cv2.resize(frame, (640, 480))
+        for indice, _, frame_resized in lector:
+            frame_count = indice + 1
             
             # Detectar personas
             personas = self.detectar_personas(frame_resized)
@@ -161,7 +146,7 @@ class DetectorPeleas:
             if frame_count % 100 == 0:
                 print(f"  Procesados {frame_count} frames...")
         
-        cap.release()
+        lector.liberar()
         return caracteristicas_video
     
     def entrenar_modelo(self):
@@ -195,16 +180,19 @@ class DetectorPeleas:
             'parametros': {
                 'motion_threshold': self.motion_threshold,
                 'violence_threshold': self.violence_threshold,
-                'modelo_yolo': 'yolov8n.pt'
+                'modelo_yolo': 'yolov8n.pt',
+                'person_detector_backend': self.backend_detector
             },
             'estadisticas': self.calcular_estadisticas_globales(datos_entrenamiento)
         }
         
         # Guardar modelo
-        with open('detector_peleas_modelo.pkt', 'wb') as f:
-            pickle.dump(modelo_entrenado, f)
+        guardar_artefacto(
+            'detector_peleas_modelo', 'simple', modelo_entrenado['parametros'],
+            entrenamiento={k: v for k, v in modelo_entrenado.items() if k != 'parametros'}
+        )
         
-        print("=== MODELO GUARDADO COMO 'detector_peleas_modelo.pkt' ===")
+        print("=== MODELO GUARDADO EN 'detector_peleas_modelo/' ===")
         print(f"Total de videos procesados: {len(datos_entrenamiento)}")
         
         return modelo_entrenado
@@ -228,7 +216,15 @@ class DetectorPeleas:
         }
 
 if __name__ == "__main__":
-    detector = DetectorPeleas()
+    import argparse
+    from detector_personas import BACKENDS
+    
+    parser = argparse.ArgumentParser(description='Entrenamiento del detector de peleas')
+    parser.add_argument('--detector', choices=BACKENDS, default='ultralytics',
+                        help='Backend del detector de personas (se guarda en el modelo)')
+    args = parser.parse_args()
+    
+    detector = DetectorPeleas(args.detector)
     modelo = detector.entrenar_modelo()
     
     print("\n=== RESUMEN DEL ENTRENAMIENTO ===")
@@ -237,4 +233,4 @@ if __name__ == "__main__":
     print(f"Score promedio global: {stats['score_promedio_global']:.3f}")
     print(f"Score máximo encontrado: {stats['score_maximo_global']:.3f}")
     print(f"Desviación estándar: {stats['desviacion_estandar']:.3f}")
-    print("\nModelo listo para usar en 'detector_peleas_modelo.pkt'")
+    print("\nModelo listo para usar en 'detector_peleas_modelo/'")
@@ -1,37 +1,53 @@
 import cv2
 import numpy as np
-import pickle
-from ultralytics import YOLO
 import os
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.neural_network import MLPClassifier
 import joblib
-from scipy.spatial.distance import euclidean, cosine
 from collections import deque
 import warnings
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import matplotlib.pyplot as plt
+from cache_caracteristicas import CacheCaracteristicas
+from rastreador import RastreadorPersonas
+from extractor_caracteristicas import (MotorCaracteristicas, VERSION_EXTRACTOR, NOMBRES_CARACTERISTICAS,
+                                       MOVIMIENTO, INTERACCION)
+from artefacto_modelo import guardar_artefacto
+from lector_video import LectorVideo
+from detector_personas import BACKENDS, crear_detector_personas
+from busqueda_hiperparametros import buscar_hiperparametros
+from ensamble import EnsambleVotacion
 warnings.filterwarnings('ignore')
 
 class DetectorPeleasAvanzado:
-    def __init__(self):
-        # Cargar modelo YOLO preentrenado
-        self.model = YOLO('yolov8n.pt')
+    def __init__(self, backend_detector='ultralytics', num_hilos=None):
+        # Modelo YOLO preentrenado con el backend elegido (ultralytics, onnx u onnx_int8). Se carga
+        # en la primera detección: con extracción en paralelo solo lo necesitan los procesos hijos
+        self.backend_detector = backend_detector
+        self.num_hilos = num_hilos
+        self.detector = None
         
         # Parámetros dinámicos que se optimizarán
         self.motion_threshold = 5000
         self.violence_threshold = 0.7
-        self.frame_buffer = deque(maxlen=15)
         
         # Buffers para análisis temporal
         self.velocity_buffer = deque(maxlen=10)
         self.acceleration_buffer = deque(maxlen=5)
         
+        # Parámetros de extracción de frames
+        self.paso_muestreo = 3  # Procesar 1 de cada 3 frames
+        self.tamano_frame = (640, 480)
+        self.tamano_lote = 8  # Frames que se envían juntos a YOLO
+        self.umbral_confianza = 0.4  # Umbral más permisivo para detectar personas
+        
         # Modelos de ML que se entrenarán
         self.models = {}
         self.scaler = StandardScaler()
@@ -42,355 +58,130 @@ class DetectorPeleasAvanzado:
         
     def detectar_personas_avanzado(self, frame):
         """Detección avanzada con análisis de pose y movimiento"""
-        results = self.model(frame, classes=[0], verbose=False)
-        personas = []
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    if box.conf[0] > 0.4:  # Umbral más permisivo
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        w, h = x2 - x1, y2 - y1
-                        
-                        # Calcular características geométricas
-                        aspect_ratio = w / h if h > 0 else 0
-                        area = w * h
-                        center_x, center_y = (x1 + x2) / 2, (y1 + y2) / 2
-                        
-                        personas.append({
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                            'center': (center_x, center_y),
-                            'width': w,
-                            'height': h,
-                            'area': area,
-                            'aspect_ratio': aspect_ratio,
-                            'confianza': float(box.conf[0])
-                        })
-        return personas
+        return self.detectar_personas_lote([frame])[0]
     
-    def extraer_caracteristicas_movimiento(self, frame_actual, frame_anterior):
-        """Extrae características avanzadas de movimiento"""
-        if frame_anterior is None:
-            return np.zeros(8)
-        
-        # Convertir a escala de grises
-        gray1 = cv2.cvtColor(frame_anterior, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(frame_actual, cv2.COLOR_BGR2GRAY)
-        
-        # 1. Flujo óptico denso usando Farneback
-        try:
-            flow = cv2.calcOpticalFlowPyrLK(
-                gray1, gray2, 
-                cv2.goodFeaturesToTrack(gray1, maxCorners=100, qualityLevel=0.3, minDistance=7, blockSize=7),
-                None
-            )[0]
-            
-            if flow is not None and len(flow) > 0:
-                # Calcular magnitudes
-                dx = flow[:, 0, 0] if len(flow.shape) == 3 else flow[:, 0]
-                dy = flow[:, 0, 1] if len(flow.shape) == 3 else flow[:, 1]
-                magnitude = np.sqrt(dx**2 + dy**2)
-                angle = np.arctan2(dy, dx)
-                
-                avg_magnitude = np.mean(magnitude) if len(magnitude) > 0 else 0
-                max_magnitude = np.max(magnitude) if len(magnitude) > 0 else 0
-                std_magnitude = np.std(magnitude) if len(magnitude) > 0 else 0
-                avg_angle = np.mean(angle) if len(angle) > 0 else 0
-            else:
-                avg_magnitude = max_magnitude = std_magnitude = avg_angle = 0
-        except:
-            # Fallback a flujo óptico denso
-            flow = cv2.calcOpticalFlowPyrLK(gray1, gray2, None, None)
-            if flow is not None:
-                magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-                avg_magnitude = np.mean(magnitude)
-                max_magnitude = np.max(magnitude)
-                std_magnitude = np.std(magnitude)
-                avg_angle = np.mean(angle)
-            else:
-                avg_magnitude = max_magnitude = std_magnitude = avg_angle = 0
-        
-        # 2. Diferencia de frames
-        diff = cv2.absdiff(gray1, gray2)
-        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-        movimiento_pixeles = np.sum(thresh) / (thresh.shape[0] * thresh.shape[1])
-        
-        # 3. Análisis de gradientes
-        grad_x = cv2.Sobel(diff, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(diff, cv2.CV_64F, 0, 1, ksize=3)
-        grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-        avg_gradient = np.mean(grad_magnitude)
-        
-        # 4. Análisis de textura (LBP simplificado)
-        texture_score = self.calcular_textura_cambio(gray1, gray2)
-        
-        # 5. Entropía del movimiento
-        hist = cv2.calcHist([diff], [0], None, [256], [0, 256])
-        hist_norm = hist / np.sum(hist)
-        entropia = -np.sum(hist_norm * np.log2(hist_norm + 1e-7))
-        
-        return np.array([
-            avg_magnitude, max_magnitude, std_magnitude,
-            movimiento_pixeles, avg_gradient, texture_score,
-            entropia, avg_angle
-        ])
+    def detectar_personas_lote(self, frames):
+        """Detecta personas en varios frames con una sola llamada a YOLO"""
+        if self.detector is None:
+            self.detector = crear_detector_personas(self.backend_detector, 'yolov8n.pt', num_hilos=self.num_hilos)
+        return self.detector.detectar_lote(frames, self.umbral_confianza)
     
-    def calcular_textura_cambio(self, gray1, gray2):
-        """Calcula cambios en la textura entre frames"""
-        # Usar filtros de Gabor para detectar cambios de textura
-        kernel = cv2.getGaborKernel((15, 15), 5, np.pi/4, 2*np.pi, 0.5, 0, ktype=cv2.CV_32F)
-        
-        filtered1 = cv2.filter2D(gray1, cv2.CV_8UC3, kernel)
-        filtered2 = cv2.filter2D(gray2, cv2.CV_8UC3, kernel)
+    def _leer_lotes(self, lector, tamano_lote):
+        """Agrupa los frames muestreados por el lector en lotes para YOLO"""
+        indices = []
+        frames = []
+        
+        # El lector solo decodifica y redimensiona 1 de cada `paso_muestreo` frames
+        for indice, _, frame in lector:
+            # Número de frame contando desde 1, como el resto del entrenamiento
+            indices.append(indice + 1)
+            frames.append(frame)
+            
+            if len(frames) >= tamano_lote:
+                yield indices, frames
+                indices = []
+                frames = []
         
-        texture_diff = cv2.absdiff(filtered1, filtered2)
-        return np.mean(texture_diff)
-    
-    def analizar_interacciones_avanzadas(self, personas_actual, personas_anterior):
-        """Análisis avanzado de interacciones entre personas"""
-        if len(personas_actual) < 2:
-            return np.zeros(10)
-        
-        caracteristicas = []
-        
-        # 1. Análisis de proximidad
-        distancias = []
-        overlaps = []
-        velocidades_relativas = []
-        
-        for i, p1 in enumerate(personas_actual):
-            for j, p2 in enumerate(personas_actual[i+1:], i+1):
-                # Distancia euclidiana
-                dist = euclidean(p1['center'], p2['center'])
-                distancias.append(dist)
-                
-                # Superposición de bounding boxes
-                overlap = self.calcular_overlap_avanzado(p1['bbox'], p2['bbox'])
-                overlaps.append(overlap)
-                
-                # Velocidad relativa (si hay frame anterior)
-                if personas_anterior and i < len(personas_anterior) and j < len(personas_anterior):
-                    vel_rel = self.calcular_velocidad_relativa(
-                        p1, p2, personas_anterior[i], personas_anterior[j]
-                    )
-                    velocidades_relativas.append(vel_rel)
-        
-        # 2. Características estadísticas
-        min_dist = np.min(distancias) if distancias else 0
-        avg_dist = np.mean(distancias) if distancias else 0
-        max_overlap = np.max(overlaps) if overlaps else 0
-        avg_overlap = np.mean(overlaps) if overlaps else 0
-        
-        # 3. Densidad de personas
-        densidad = len(personas_actual) / (640 * 480)  # Normalizado por área frame
-        
-        # 4. Variación en tamaños (puede indicar perspectiva/movimiento)
-        areas = [p['area'] for p in personas_actual]
-        variacion_tamano = np.std(areas) / (np.mean(areas) + 1e-7)
-        
-        # 5. Análisis de formación grupal
-        centroide_x = np.mean([p['center'][0] for p in personas_actual])
-        centroide_y = np.mean([p['center'][1] for p in personas_actual])
-        
-        dispersión = np.mean([
-            euclidean(p['center'], (centroide_x, centroide_y)) 
-            for p in personas_actual
-        ])
-        
-        # 6. Velocidades promedio
-        avg_vel_rel = np.mean(velocidades_relativas) if velocidades_relativas else 0
-        max_vel_rel = np.max(velocidades_relativas) if velocidades_relativas else 0
-        
-        return np.array([
-            min_dist, avg_dist, max_overlap, avg_overlap, densidad,
-            variacion_tamano, dispersión, avg_vel_rel, max_vel_rel, len(personas_actual)
-        ])
-    
-    def calcular_overlap_avanzado(self, bbox1, bbox2):
-        """Cálculo mejorado de superposición"""
-        x1_max = max(bbox1[0], bbox2[0])
-        y1_max = max(bbox1[1], bbox2[1])
-        x2_min = min(bbox1[2], bbox2[2])
-        y2_min = min(bbox1[3], bbox2[3])
-        
-        if x2_min <= x1_max or y2_min <= y1_max:
-            return 0
-        
-        area_overlap = (x2_min - x1_max) * (y2_min - y1_max)
-        area1 = (bbox1[2] - bbox1[0]) * (bbox1[3] - bbox1[1])
-        area2 = (bbox2[2] - bbox2[0]) * (bbox2[3] - bbox2[1])
-        
-        # IoU (Intersection over Union)
-        iou = area_overlap / (area1 + area2 - area_overlap)
-        return iou
+        if frames:
+            yield indices, frames
     
-    def calcular_velocidad_relativa(self, p1_actual, p2_actual, p1_anterior, p2_anterior):
-        """Calcula velocidad relativa entre dos personas"""
-        vel1 = euclidean(p1_actual['center'], p1_anterior['center'])
-        vel2 = euclidean(p2_actual['center'], p2_anterior['center'])
-        return abs(vel1 - vel2)
-    
-    def procesar_video_avanzado(self, ruta_video, es_pelea=True):
-        """Procesamiento avanzado de video con extracción completa de características"""
-        cap = cv2.VideoCapture(ruta_video)
-        
-        if not cap.isOpened():
+    def procesar_video_avanzado(self, ruta_video, es_pelea=True, tamano_lote=None,
+                                frame_inicio=0, frame_fin=None):
+        """Procesamiento avanzado de video con extracción completa de características
+        
+        Con frame_inicio/frame_fin se procesa solo un fragmento del video; el
+        estado temporal se reinicia en cada llamada para que el resultado no
+        dependa de qué se procesó antes. Un fragmento que no empieza en 0 lee
+        también el frame muestreado anterior a frame_inicio, que solo siembra
+        el frame anterior del motor (no genera muestra): así las
+        características de movimiento de su primer frame coinciden con las de
+        la extracción secuencial.
+        """
+        # Último frame muestreado antes del fragmento (el lector muestrea indice % paso == paso - 1)
+        inicio_lectura = frame_inicio
+        if frame_inicio > 0:
+            anterior = frame_inicio - 1 - (frame_inicio - self.paso_muestreo) % self.paso_muestreo
+            if anterior >= 0:
+                inicio_lectura = anterior
+        
+        lector = LectorVideo(ruta_video, paso=self.paso_muestreo, frame_inicio=inicio_lectura,
+                             frame_fin=frame_fin, tamano=self.tamano_frame)
+        
+        if not lector.abierto():
             print(f"❌ Error al abrir video: {ruta_video}")
             return None, None
         
-        print(f"🎥 Procesando: {ruta_video} ({'Pelea' if es_pelea else 'Normal'})")
+        if tamano_lote is None:
+            tamano_lote = self.tamano_lote
+        
+        if frame_inicio > 0 or frame_fin is not None:
+            print(f"🎥 Procesando: {ruta_video} [{frame_inicio}-{frame_fin if frame_fin is not None else 'fin'}] "
+                  f"({'Pelea' if es_pelea else 'Normal'})")
+        else:
+            print(f"🎥 Procesando: {ruta_video} ({'Pelea' if es_pelea else 'Normal'})")
         
         caracteristicas_completas = []
         etiquetas = []
-        frame_anterior = None
-        personas_anterior = None
-        frame_count = 0
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # Procesar cada 3 frames para mayor densidad de datos
-            if frame_count % 3 != 0:
-                continue
-            
-            # Redimensionar
-            frame_resized = cv2.resize(frame, (640, 480))
-            
-            # 1. Detectar personas
-            personas_actual = self.detectar_personas_avanzado(frame_resized)
-            
-            # 2. Características de movimiento
-            mov_features = self.extraer_caracteristicas_movimiento(frame_resized, frame_anterior)
-            
-            # 3. Características de interacción
-            int_features = self.analizar_interacciones_avanzadas(personas_actual, personas_anterior)
-            
-            # 4. Características temporales
-            temp_features = self.extraer_caracteristicas_temporales(personas_actual)
-            
-            # 5. Características contextuales
-            ctx_features = self.extraer_caracteristicas_contextuales(frame_resized, personas_actual)
-            
-            # Combinar todas las características
-            caracteristicas_frame = np.concatenate([
-                mov_features,      # 8 características
-                int_features,      # 10 características
-                temp_features,     # 5 características
-                ctx_features       # 7 características
-            ])  # Total: 30 características
-            
-            caracteristicas_completas.append(caracteristicas_frame)
+        
+        # Estado propio del fragmento: el resultado no depende de llamadas anteriores
+        motor = MotorCaracteristicas()
+        rastreador = RastreadorPersonas()
+        
+        for indices, frames in self._leer_lotes(lector, tamano_lote):
+            # 1. Detectar personas en todo el lote con una sola inferencia
+            personas_lote = self.detectar_personas_lote(frames)
             
-            # Etiquetado inteligente basado en contenido
-            if es_pelea:
-                # Para videos de pelea, etiquetar frames con alta actividad
-                score_actividad = (
-                    np.sum(mov_features[:4]) / 4 +  # Promedio características movimiento
-                    np.sum(int_features[:4]) / 4 +  # Promedio características interacción
-                    len(personas_actual) / 10       # Factor personas (normalizado)
-                )
+            for frame_count, frame_resized, personas_detectadas in zip(indices, frames, personas_lote):
+                # IDs persistentes: las velocidades se calculan por persona, no por posición
+                personas_actual = rastreador.actualizar(personas_detectadas)
                 
-                # Etiquetar como pelea si supera el percentil 40 de actividad
-                etiqueta = 1 if score_actividad > 0.3 else 0
+                # 2. Las 30 características en una sola pasada
+                caracteristicas_frame = motor.extraer(frame_resized, personas_actual)
+                if frame_count <= frame_inicio:
+                    # Frame anterior al fragmento: solo avanza el estado del motor y del rastreador
+                    continue
+                mov_features = caracteristicas_frame[MOVIMIENTO]
+                int_features = caracteristicas_frame[INTERACCION]
                 
-                # Forzar algunas etiquetas positivas para balance
-                if frame_count % 20 == 0 and len(personas_actual) >= 2:
-                    etiqueta = 1
-            else:
-                etiqueta = 0
-            
-            etiquetas.append(etiqueta)
-            
-            # Actualizar frames anteriores
-            frame_anterior = frame_resized.copy()
-            personas_anterior = personas_actual.copy()
-            
-            # Progreso
-            if frame_count % 150 == 0:
-                print(f"  📊 Procesados {frame_count} frames...")
+                caracteristicas_completas.append(caracteristicas_frame)
+                
+                # Etiquetado inteligente basado en contenido
+                if es_pelea:
+                    # Para videos de pelea, etiquetar frames con alta actividad
+                    score_actividad = (
+                        np.sum(mov_features[:4]) / 4 +  # Promedio características movimiento
+                        np.sum(int_features[:4]) / 4 +  # Promedio características interacción
+                        len(personas_actual) / 10       # Factor personas (normalizado)
+                    )
+                    
+                    # Etiquetar como pelea si supera el percentil 40 de actividad
+                    etiqueta = 1 if score_actividad > 0.3 else 0
+                    
+                    # Forzar algunas etiquetas positivas para balance
+                    if frame_count % 20 == 0 and len(personas_actual) >= 2:
+                        etiqueta = 1
+                else:
+                    etiqueta = 0
+                
+                etiquetas.append(etiqueta)
+                
+                # Progreso
+                if frame_count % 150 == 0:
+                    print(f"  📊 Procesados {frame_count} frames...")
         
-        cap.release()
+        lector.liberar()
         
         print(f"  ✅ Completado: {len(caracteristicas_completas)} muestras extraídas")
         return np.array(caracteristicas_completas), np.array(etiquetas)
     
-    def extraer_caracteristicas_temporales(self, personas):
-        """Extrae características relacionadas con patrones temporales"""
-        # Agregar al buffer
-        self.frame_buffer.append(len(personas))
-        
-        if len(self.frame_buffer) < 5:
-            return np.zeros(5)
-        
-        # Variación en número de personas
-        variacion_personas = np.std(list(self.frame_buffer))
-        
-        # Tendencia (regresión lineal simple)
-        x = np.arange(len(self.frame_buffer))
-        y = np.array(list(self.frame_buffer))
-        tendencia = np.polyfit(x, y, 1)[0] if len(x) > 1 else 0
-        
-        # Periodicidad (autocorrelación simple)
-        if len(self.frame_buffer) >= 10:
-            autocorr = np.corrcoef(y[:-5], y[5:])[0, 1]
-            autocorr = autocorr if not np.isnan(autocorr) else 0
-        else:
-            autocorr = 0
-        
-        # Entropía temporal
-        hist, _ = np.histogram(y, bins=5, range=(0, 10))
-        hist_norm = hist / np.sum(hist) if np.sum(hist) > 0 else hist
-        entropia_temporal = -np.sum(hist_norm * np.log2(hist_norm + 1e-7))
-        
-        # Estabilidad (coeficiente de variación)
-        estabilidad = np.std(y) / (np.mean(y) + 1e-7)
-        
-        return np.array([variacion_personas, tendencia, autocorr, entropia_temporal, estabilidad])
-    
-    def extraer_caracteristicas_contextuales(self, frame, personas):
-        """Extrae características del contexto de la escena"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # 1. Brillo promedio de la escena
-        brillo_promedio = np.mean(gray)
-        
-        # 2. Contraste (desviación estándar del brillo)
-        contraste = np.std(gray)
-        
-        # 3. Actividad en los bordes
-        edges = cv2.Canny(gray, 50, 150)
-        actividad_bordes = np.sum(edges) / (edges.shape[0] * edges.shape[1])
-        
-        # 4. Complejidad de la escena (entropía de la imagen)
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        hist_norm = hist / np.sum(hist)
-        entropia_escena = -np.sum(hist_norm * np.log2(hist_norm + 1e-7))
-        
-        # 5. Densidad de personas en frame
-        area_total_personas = sum([p['area'] for p in personas])
-        densidad_visual = area_total_personas / (frame.shape[0] * frame.shape[1])
-        
-        # 6. Distribución espacial de personas
-        if len(personas) > 0:
-            centros_x = [p['center'][0] for p in personas]
-            centros_y = [p['center'][1] for p in personas]
-            dispersion_x = np.std(centros_x) / frame.shape[1]
-            dispersion_y = np.std(centros_y) / frame.shape[0]
-        else:
-            dispersion_x = dispersion_y = 0
-        
-        return np.array([
-            brillo_promedio, contraste, actividad_bordes, entropia_escena,
-            densidad_visual, dispersion_x, dispersion_y
-        ])
-    
-    def entrenar_modelos_avanzados(self, X, y):
-        """Entrena múltiples modelos de ML con optimización de hiperparámetros"""
+    def entrenar_modelos_avanzados(self, X, y, modo_busqueda='halving', max_ajustes=None, max_segundos=None,
+                                   paciencia=None):
+        """Entrena múltiples modelos de ML con optimización de hiperparámetros
+        
+        modo_busqueda: 'halving' (por defecto), 'aleatoria' o 'grid' (exhaustivo).
+        max_ajustes y max_segundos son el presupuesto de la búsqueda de cada modelo;
+        paciencia detiene la búsqueda aleatoria tras esas rondas sin mejorar.
+        """
         print("\n🤖 INICIANDO ENTRENAMIENTO DE MODELOS AVANZADOS")
         print("=" * 60)
         
@@ -445,42 +236,41 @@ class DetectorPeleasAvanzado:
         for nombre, config in modelos_config.items():
             print(f"\n🔧 Optimizando {nombre}...")
             
-            # Grid Search con validación cruzada
-            grid_search = GridSearchCV(
-                config['model'], config['params'], 
-                cv=5, scoring='accuracy', n_jobs=-1
+            # Búsqueda con presupuesto y validación cruzada (5 pliegues)
+            busqueda = buscar_hiperparametros(
+                config['model'], config['params'], X_train_scaled, y_train,
+                modo=modo_busqueda, cv=5, max_ajustes=max_ajustes, max_segundos=max_segundos,
+                paciencia=paciencia
             )
             
-            grid_search.fit(X_train_scaled, y_train)
-            
-            # Mejor modelo
-            mejor_modelo = grid_search.best_estimator_
+            # Mejor modelo (ya ajustado sobre todo el conjunto de entrenamiento)
+            mejor_modelo = busqueda['modelo']
             mejores_modelos[nombre] = mejor_modelo
             
             # Evaluación
             y_pred = mejor_modelo.predict(X_test_scaled)
             accuracy = accuracy_score(y_test, y_pred)
             
-            # Validación cruzada
-            cv_scores = cross_val_score(mejor_modelo, X_train_scaled, y_train, cv=5)
-            
+            # La validación cruzada del mejor candidato ya la calculó la búsqueda
             resultados[nombre] = {
                 'accuracy': accuracy,
-                'cv_mean': cv_scores.mean(),
-                'cv_std': cv_scores.std(),
-                'best_params': grid_search.best_params_
+                'cv_mean': busqueda['cv_mean'],
+                'cv_std': busqueda['cv_std'],
+                'best_params': busqueda['params'],
+                'search_mode': busqueda['modo'],
+                'search_candidates': busqueda['candidatos'],
+                'search_fits': busqueda['ajustes'],
+                'search_seconds': busqueda['segundos']
             }
             
             print(f"  ✅ Accuracy: {accuracy:.3f}")
-            print(f"  📊 CV Score: {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
+            print(f"  📊 CV Score: {busqueda['cv_mean']:.3f} ± {busqueda['cv_std']:.3f}")
+            print(f"  ⏱️ Búsqueda {busqueda['modo']}: {busqueda['candidatos']} candidatos, "
+                  f"{busqueda['ajustes']} ajustes en {busqueda['segundos']:.1f}s")
         
-        # Crear ensemble (voting classifier)
+        # Crear ensemble (votación suave sobre los modelos ya entrenados, sin reajustarlos)
         print(f"\n🎯 Creando modelo ensemble...")
-        ensemble = VotingClassifier(
-            estimators=[(nombre, modelo) for nombre, modelo in mejores_modelos.items()],
-            voting='soft'
-        )
-        ensemble.fit(X_train_scaled, y_train)
+        ensemble = EnsambleVotacion(mejores_modelos)
         
         # Evaluar ensemble
         y_pred_ensemble = ensemble.predict(X_test_scaled)
@@ -502,31 +292,131 @@ class DetectorPeleasAvanzado:
         
         return resultados, accuracy_ensemble
     
-    def entrenar_sistema_completo(self):
-        """Entrenamiento completo del sistema"""
+    def planificar_extraccion(self, videos, es_pelea=True, frames_por_fragmento=None):
+        """Divide los videos en tareas (video, fragmento) para los procesos de extracción"""
+        tareas = []
+        
+        for video in videos:
+            if frames_por_fragmento is None:
+                tareas.append((video, es_pelea, 0, None))
+                continue
+            
+            with LectorVideo(video) as lector:
+                total_frames = lector.total_frames()
+            
+            if total_frames <= 0:
+                # El contenedor no informa la duración: procesar el video completo
+                tareas.append((video, es_pelea, 0, None))
+                continue
+            
+            for inicio in range(0, total_frames, frames_por_fragmento):
+                fin = inicio + frames_por_fragmento
+                tareas.append((video, es_pelea, inicio, fin if fin < total_frames else None))
+        
+        return tareas
+    
+    def configuracion_extraccion(self):
+        """Parámetros que determinan las características extraídas de un video"""
+        return {
+            'paso_muestreo': self.paso_muestreo,
+            'umbral_confianza': self.umbral_confianza,
+            'tamano_frame': list(self.tamano_frame),
+            'backend_detector': self.backend_detector,
+            'version_extractor': VERSION_EXTRACTOR
+        }
+    
+    def extraer_caracteristicas_paralelo(self, tareas, num_procesos=None):
+        """Ejecuta las tareas de extracción en varios procesos, cada uno con su propio YOLO
+        
+        Los resultados se devuelven en el mismo orden que las tareas.
+        """
+        if num_procesos is None:
+            num_procesos = os.cpu_count() or 1
+        num_procesos = max(1, min(num_procesos, len(tareas)))
+        
+        if num_procesos == 1:
+            return [
+                self.procesar_video_avanzado(video, es_pelea, frame_inicio=inicio, frame_fin=fin)
+                for video, es_pelea, inicio, fin in tareas
+            ]
+        
+        print(f"⚙️ Extrayendo {len(tareas)} tareas con {num_procesos} procesos")
+        
+        # Repartir los hilos de cada proceso para no sobresuscribir la CPU
+        hilos_por_proceso = max(1, (os.cpu_count() or 1) // num_procesos)
+        
+        with ProcessPoolExecutor(
+            max_workers=num_procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_inicializar_proceso_extraccion,
+            initargs=(hilos_por_proceso, self.configuracion_extraccion(), self.tamano_lote)
+        ) as executor:
+            return list(executor.map(_procesar_tarea_extraccion, tareas))
+    
+    def entrenar_sistema_completo(self, num_procesos=None, frames_por_fragmento=None,
+                                  directorio_cache='cache_caracteristicas', modo_busqueda='halving',
+                                  max_ajustes=None, max_segundos=None, paciencia=None):
+        """Entrenamiento completo del sistema
+        
+        Las características de cada video se guardan en directorio_cache y se
+        reutilizan mientras el video y los parámetros de extracción no cambien
+        (directorio_cache=None desactiva la caché). modo_busqueda, max_ajustes,
+        max_segundos y paciencia se pasan a entrenar_modelos_avanzados.
+        """
         print("🚀 INICIANDO ENTRENAMIENTO COMPLETO DEL SISTEMA")
         print("=" * 70)
         
         # Videos disponibles
         videos_pelea = ['pelea1.mp4', 'pelea2.mp4', 'pelea3.mp4', 'pelea4.mp4', 'pelea5.mp4']
+        videos_pelea = [video for video in videos_pelea if os.path.exists(video)]
         
         X_total = []
         y_total = []
         estadisticas_videos = {}
         
-        # Procesar videos de peleas
-        for video in videos_pelea:
-            if os.path.exists(video):
-                X_video, y_video = self.procesar_video_avanzado(video, es_pelea=True)
+        # Reutilizar características ya extraídas
+        cache = CacheCaracteristicas(directorio_cache) if directorio_cache else None
+        parametros_cache = dict(self.configuracion_extraccion(), es_pelea=True,
+                                frames_por_fragmento=frames_por_fragmento)
+        datos_por_video = {}
+        
+        if cache is not None:
+            for video in videos_pelea:
+                X_video, y_video = cache.cargar(video, parametros_cache)
                 if X_video is not None:
-                    X_total.append(X_video)
-                    y_total.append(y_video)
-                    
-                    estadisticas_videos[video] = {
-                        'samples': len(X_video),
-                        'positive_ratio': np.mean(y_video),
-                        'feature_means': np.mean(X_video, axis=0)
-                    }
+                    print(f"💾 Características en caché: {video} ({len(X_video)} muestras)")
+                    datos_por_video[video] = (X_video, y_video)
+        
+        # Procesar videos de peleas (en paralelo, fusionando en orden)
+        pendientes = [video for video in videos_pelea if video not in datos_por_video]
+        tareas = self.planificar_extraccion(pendientes, es_pelea=True,
+                                            frames_por_fragmento=frames_por_fragmento)
+        resultados_tareas = self.extraer_caracteristicas_paralelo(tareas, num_procesos) if tareas else []
+        
+        fragmentos_por_video = {}
+        for (video, _, _, _), (X_fragmento, y_fragmento) in zip(tareas, resultados_tareas):
+            if X_fragmento is not None and len(X_fragmento) > 0:
+                fragmentos_por_video.setdefault(video, []).append((X_fragmento, y_fragmento))
+        
+        for video, fragmentos in fragmentos_por_video.items():
+            X_video = np.vstack([X for X, _ in fragmentos])
+            y_video = np.hstack([y for _, y in fragmentos])
+            datos_por_video[video] = (X_video, y_video)
+            
+            if cache is not None:
+                cache.guardar(video, parametros_cache, X_video, y_video)
+        
+        for video in videos_pelea:
+            if video in datos_por_video:
+                X_video, y_video = datos_por_video[video]
+                X_total.append(X_video)
+                y_total.append(y_video)
+                
+                estadisticas_videos[video] = {
+                    'samples': len(X_video),
+                    'positive_ratio': np.mean(y_video),
+                    'feature_means': np.mean(X_video, axis=0)
+                }
         
         # Combinar datos
         if X_total:
@@ -541,7 +431,9 @@ class DetectorPeleasAvanzado:
             print(f"  Ratio de peleas: {np.mean(y_combinado):.3f}")
             
             # Entrenar modelos
-            resultados, ensemble_acc = self.entrenar_modelos_avanzados(X_combinado, y_combinado)
+            resultados, ensemble_acc = self.entrenar_modelos_avanzados(
+                X_combinado, y_combinado, modo_busqueda, max_ajustes, max_segundos, paciencia
+            )
             
             # Crear modelo final
             modelo_final = {
@@ -563,16 +455,29 @@ class DetectorPeleasAvanzado:
                 'parameters': {
                     'motion_threshold': self.motion_threshold,
                     'violence_threshold': self.violence_threshold,
-                    'yolo_model': 'yolov8n.pt'
+                    'yolo_model': 'yolov8n.pt',
+                    'person_detector_backend': self.backend_detector,
+                    'frame_sampling_stride': self.paso_muestreo,
+                    'person_confidence_threshold': self.umbral_confianza,
+                    'frame_size': list(self.tamano_frame),
+                    'feature_extractor_version': VERSION_EXTRACTOR
                 }
             }
             
-            # Guardar modelo
-            with open('detector_peleas_modelo.pkt', 'wb') as f:
-                pickle.dump(modelo_final, f)
+            # Guardar modelo: la inferencia solo necesita ensemble + scaler
+            guardar_artefacto(
+                'detector_peleas_modelo', 'avanzado', modelo_final['parameters'],
+                inferencia={'ensemble': self.models['ensemble'], 'scaler': self.models['scaler']},
+                entrenamiento={
+                    'timestamp': modelo_final['timestamp'],
+                    'models': {k: v for k, v in self.models.items() if k not in ('ensemble', 'scaler')},
+                    'statistics': modelo_final['statistics']
+                },
+                nombres_caracteristicas=modelo_final['feature_names']
+            )
             
             print(f"\n💾 MODELO GUARDADO EXITOSAMENTE")
-            print(f"📁 Archivo: detector_peleas_modelo.pkt")
+            print(f"📁 Directorio: detector_peleas_modelo/")
             
             # Mostrar resumen final
             self.mostrar_resumen_entrenamiento(modelo_final)
@@ -584,29 +489,7 @@ class DetectorPeleasAvanzado:
     
     def generar_nombres_caracteristicas(self):
         """Genera nombres descriptivos para las características"""
-        mov_names = [
-            'optical_flow_avg', 'optical_flow_max', 'optical_flow_std',
-            'pixel_movement', 'gradient_avg', 'texture_change',
-            'entropy_movement', 'angle_avg'
-        ]
-        
-        int_names = [
-            'min_distance', 'avg_distance', 'max_overlap', 'avg_overlap',
-            'person_density', 'size_variation', 'group_dispersion',
-            'avg_relative_velocity', 'max_relative_velocity', 'person_count'
-        ]
-        
-        temp_names = [
-            'person_variation', 'trend', 'autocorrelation',
-            'temporal_entropy', 'stability'
-        ]
-        
-        ctx_names = [
-            'brightness', 'contrast', 'edge_activity', 'scene_entropy',
-            'visual_density', 'spatial_dispersion_x', 'spatial_dispersion_y'
-        ]
-        
-        return mov_names + int_names + temp_names + ctx_names
+        return list(NOMBRES_CARACTERISTICAS)
     
     def mostrar_resumen_entrenamiento(self, modelo):
         """Muestra un resumen detallado del entrenamiento"""
@@ -635,6 +518,48 @@ class DetectorPeleasAvanzado:
         print(f"\n⏰ Entrenamiento completado: {modelo['timestamp']}")
         print("🎉 ¡Sistema listo para detección en tiempo real!")
 
+# Estado por proceso para la extracción paralela
+_detector_proceso = None
+
+def _inicializar_proceso_extraccion(num_hilos, configuracion, tamano_lote):
+    """Crea el detector (y su modelo YOLO) una sola vez por proceso"""
+    global _detector_proceso
+    cv2.setNumThreads(num_hilos)
+    try:
+        import torch
+        torch.set_num_threads(num_hilos)
+    except ImportError:
+        pass
+    _detector_proceso = DetectorPeleasAvanzado(configuracion['backend_detector'], num_hilos)
+    _detector_proceso.paso_muestreo = configuracion['paso_muestreo']
+    _detector_proceso.umbral_confianza = configuracion['umbral_confianza']
+    _detector_proceso.tamano_frame = tuple(configuracion['tamano_frame'])
+    _detector_proceso.tamano_lote = tamano_lote
+
+def _procesar_tarea_extraccion(tarea):
+    """Procesa una tarea (video, fragmento) en el proceso actual"""
+    video, es_pelea, inicio, fin = tarea
+    return _detector_proceso.procesar_video_avanzado(
+        video, es_pelea, frame_inicio=inicio, frame_fin=fin
+    )
+
 if __name__ == "__main__":
-    detector = DetectorPeleasAvanzado()
-    modelo = detector.entrenar_sistema_completo()
+    import argparse
+    from busqueda_hiperparametros import MODOS_BUSQUEDA
+    
+    parser = argparse.ArgumentParser(description='Entrenamiento del detector de peleas avanzado')
+    parser.add_argument('--busqueda', choices=MODOS_BUSQUEDA, default='halving',
+                        help='Búsqueda de hiperparámetros (grid = exhaustiva, la más lenta)')
+    parser.add_argument('--max-ajustes', type=int, default=None,
+                        help='Máximo de ajustes de modelo por búsqueda (candidatos x pliegues)')
+    parser.add_argument('--max-segundos', type=float, default=None,
+                        help='Tiempo máximo por búsqueda (solo en modo aleatoria)')
+    parser.add_argument('--paciencia', type=int, default=None,
+                        help='Rondas sin mejora antes de detener la búsqueda (solo en modo aleatoria)')
+    parser.add_argument('--detector', choices=BACKENDS, default='ultralytics',
+                        help='Backend del detector de personas (se guarda en el modelo)')
+    args = parser.parse_args()
+    
+    detector = DetectorPeleasAvanzado(args.detector)
+    modelo = detector.entrenar_sistema_completo(modo_busqueda=args.busqueda, max_ajustes=args.max_ajustes,
+                                                max_segundos=args.max_segundos, paciencia=args.paciencia)
@@ -0,0 +1,243 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import cv2
+from estado_camara import EstadoCamara
+from lector_video import LectorVideo
+from detector_personas import BACKENDS
+
+EXTENSIONES_VIDEO = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.ts')
+
+COLUMNAS_CSV = (
+    'video', 'camara', 'inicio', 'fin', 'inicio_s', 'fin_s', 'duracion_s',
+    'score_pico', 'frames_evidencia', 'evidencia'
+)
+
+def buscar_videos(directorio, extensiones=EXTENSIONES_VIDEO):
+    """Grabaciones del directorio (y subdirectorios) en orden alfabético"""
+    videos = []
+    for raiz, _, archivos in os.walk(directorio):
+        for archivo in archivos:
+            if archivo.lower().endswith(extensiones):
+                videos.append(os.path.join(raiz, archivo))
+    return sorted(videos)
+
+def _nombre_camara(ruta, directorio):
+    """Nombre legible de la grabación: ruta relativa sin extensión"""
+    relativa = os.path.splitext(os.path.relpath(ruta, directorio))[0]
+    return relativa.replace(os.sep, '_')
+
+def escanear_video(probador, ruta, directorio_evidencia, camara=None, frame_size=(640, 480)):
+    """Pasa una grabación por el detector y devuelve su resumen y sus incidentes
+    
+    Usa el mismo análisis que la cámara en vivo (compuerta, rastreador,
+    extractor y clasificador de ProbadorPeleas) y la misma máquina de estados
+    de grabación de EstadoCamara, pero con el reloj del video: los frames se
+    procesan tan rápido como se decodifican y las horas de las carpetas, fotos
+    e incidentes son las de la grabación. La hora de inicio del video se
+    estima como la fecha de modificación del archivo menos su duración.
+    """
+    camara = camara or os.path.splitext(os.path.basename(ruta))[0]
+    inicio_proceso = time.perf_counter()
+    
+    lector = LectorVideo(ruta, tamano=frame_size)
+    if not lector.abierto():
+        return {'video': ruta, 'camara': camara, 'error': 'no se pudo abrir el video'}, []
+    
+    fps = lector.fps if lector.fps > 0 else 20.0
+    inicio_video = os.path.getmtime(ruta) - lector.total_frames() / fps
+    segundos_video = 0.0
+    
+    estado = EstadoCamara(nombre=camara, frame_size=frame_size, cada_k_frames=probador.cada_k_frames,
+                          directorio_evidencia=directorio_evidencia, fps=fps)
+    estado.reloj = lambda: datetime.fromtimestamp(inicio_video + segundos_video)
+    
+    incidentes = []
+    manifiestos = []
+    actual = None
+    frame_anterior = None
+    frames = 0
+    
+    def cerrar_incidente(incidente):
+        incidente['duracion_s'] = round(incidente['fin_s'] - incidente['inicio_s'], 3)
+        incidente['inicio'] = datetime.fromtimestamp(inicio_video + incidente['inicio_s']).isoformat(timespec='seconds')
+        incidente['fin'] = datetime.fromtimestamp(inicio_video + incidente['fin_s']).isoformat(timespec='seconds')
+        incidentes.append(incidente)
+    
+    for _, segundos_video, frame in lector:
+        indice, vista = estado.buffer.agregar(frame, inicio_video + segundos_video)
+        personas, score, es_pelea = probador.analizar_frame(vista, frame_anterior, estado)
+        
+        grababa = estado.grabando
+        sumidero = estado.sumidero
+        estado.actualizar_grabacion(indice, es_pelea, score)
+        frame_anterior = vista
+        frames += 1
+        
+        if estado.grabando and actual is None:
+            actual = {
+                'video': ruta,
+                'camara': camara,
+                'inicio_s': round(segundos_video, 3),
+                'fin_s': round(segundos_video, 3),
+                'score_pico': float(score),
+                'evidencia': os.path.join(estado.carpeta_actual, 'evidencia_pelea.mp4')
+            }
+        if actual is not None:
+            actual['score_pico'] = max(actual['score_pico'], float(score))
+            actual['fin_s'] = round(segundos_video, 3)
+            if grababa and not estado.grabando:
+                # La máquina de estados cerró la grabación en este frame
+                actual['frames_evidencia'] = sumidero.frames_escritos
+                manifiestos.append(estado.ultimo_manifiesto)
+                cerrar_incidente(actual)
+                actual = None
+    
+    lector.liberar()
+    
+    # Incidente todavía abierto al terminar el video
+    if estado.grabando:
+        actual['frames_evidencia'] = estado.sumidero.frames_escritos
+        manifiestos.append(estado.detener_grabacion_precisa())
+        cerrar_incidente(actual)
+    
+    # Esperar a que las fotos y manifiestos de este video estén en disco
+    for futuro in manifiestos:
+        if futuro is not None:
+            futuro.result()
+    
+    segundos_proceso = time.perf_counter() - inicio_proceso
+    duracion = frames / fps
+    resumen = {
+        'video': ruta,
+        'camara': camara,
+        'frames': frames,
+        'duracion_s': round(duracion, 3),
+        'segundos_proceso': round(segundos_proceso, 3),
+        'veces_tiempo_real': round(duracion / segundos_proceso, 2) if segundos_proceso > 0 else None,
+        'incidentes': len(incidentes),
+        'tasa_compuerta': estado.compuerta.tasa_apertura()
+    }
+    return resumen, incidentes
+
+def guardar_linea_tiempo(ruta, resumen, incidentes):
+    """Escribe la línea de tiempo de incidentes en JSON o CSV según la extensión"""
+    if ruta.lower().endswith('.csv'):
+        with open(ruta, 'w', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS_CSV, extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(incidentes)
+    else:
+        with open(ruta, 'w') as f:
+            json.dump(dict(resumen, incidentes=incidentes), f, indent=2, ensure_ascii=False)
+
+# Detector por proceso para el análisis en paralelo
+_probador_proceso = None
+
+def _inicializar_proceso_escaneo(num_hilos, modelo, usar_compuerta, cada_k_frames, backend_detector):
+    """Carga el modelo (YOLO + clasificador) una sola vez por proceso"""
+    global _probador_proceso
+    cv2.setNumThreads(num_hilos)
+    try:
+        import torch
+        torch.set_num_threads(num_hilos)
+    except ImportError:
+        pass
+    from probar_detector import ProbadorPeleas
+    _probador_proceso = ProbadorPeleas(modelo, usar_compuerta=usar_compuerta, cada_k_frames=cada_k_frames,
+                                       backend_detector=backend_detector, num_hilos=num_hilos)
+
+def _escanear_tarea(tarea):
+    ruta, camara, directorio_evidencia = tarea
+    return escanear_video(_probador_proceso, ruta, directorio_evidencia, camara)
+
+def escanear_directorio(directorio, modelo='detector_peleas_modelo', directorio_evidencia=None,
+                        num_procesos=None, usar_compuerta=True, cada_k_frames=None, backend_detector=None):
+    """Analiza todas las grabaciones del directorio en paralelo (un video por proceso)
+    
+    Devuelve (resumen, incidentes) con los incidentes ordenados por hora de inicio.
+    """
+    videos = buscar_videos(directorio)
+    if not videos:
+        print(f"❌ No se encontraron videos en {directorio}")
+        return None, []
+    
+    directorio_evidencia = directorio_evidencia or 'evidencias_archivo'
+    os.makedirs(directorio_evidencia, exist_ok=True)
+    
+    if num_procesos is None:
+        num_procesos = max(1, multiprocessing.cpu_count() - 1)
+    num_procesos = min(num_procesos, len(videos))
+    num_hilos = max(1, multiprocessing.cpu_count() // num_procesos)
+    
+    print(f"🔎 Analizando {len(videos)} grabaciones con {num_procesos} procesos ({num_hilos} hilos cada uno)")
+    inicio = time.perf_counter()
+    
+    tareas = [(video, _nombre_camara(video, directorio), directorio_evidencia) for video in videos]
+    resumenes = []
+    incidentes = []
+    # 'spawn' como en la extracción de entrenamiento: cada proceso crea su propio
+    # torch/OpenCV en lugar de heredar por fork el estado de hilos del padre
+    with ProcessPoolExecutor(max_workers=num_procesos, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_inicializar_proceso_escaneo,
+                             initargs=(num_hilos, modelo, usar_compuerta, cada_k_frames,
+                                       backend_detector)) as executor:
+        futuros = {executor.submit(_escanear_tarea, tarea): tarea for tarea in tareas}
+        for futuro in as_completed(futuros):
+            video, camara, _ = futuros[futuro]
+            try:
+                resumen_video, incidentes_video = futuro.result()
+            except Exception as e:
+                # Un video corrupto o ilegible no debe tirar el escaneo del resto del archivo
+                resumen_video, incidentes_video = {'video': video, 'camara': camara, 'error': str(e)}, []
+            resumenes.append(resumen_video)
+            incidentes.extend(incidentes_video)
+            if 'error' in resumen_video:
+                print(f"  ❌ {resumen_video['camara']}: {resumen_video['error']}")
+            else:
+                print(f"  ✅ {resumen_video['camara']}: {resumen_video['incidentes']} incidentes, "
+                      f"{resumen_video['duracion_s']:.0f}s de video en {resumen_video['segundos_proceso']:.1f}s "
+                      f"({resumen_video['veces_tiempo_real']}x tiempo real)")
+    
+    segundos = time.perf_counter() - inicio
+    duracion_total = sum(r.get('duracion_s', 0) for r in resumenes)
+    incidentes.sort(key=lambda incidente: (incidente['inicio'], incidente['camara']))
+    resumenes.sort(key=lambda r: r['video'])
+    
+    resumen = {
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'directorio': os.path.abspath(directorio),
+        'modelo': modelo,
+        'videos': resumenes,
+        'duracion_total_s': round(duracion_total, 3),
+        'segundos_proceso': round(segundos, 3),
+        'veces_tiempo_real': round(duracion_total / segundos, 2) if segundos > 0 else None
+    }
+    return resumen, incidentes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analiza un directorio de grabaciones y genera la línea de tiempo de incidentes')
+    parser.add_argument('directorio', help='Directorio con las grabaciones (se recorre recursivamente)')
+    parser.add_argument('--salida', default='incidentes.json', help='Línea de tiempo (.json o .csv)')
+    parser.add_argument('--modelo', default='detector_peleas_modelo',
+                        help='Directorio del artefacto del modelo (o un .pkt antiguo)')
+    parser.add_argument('--evidencia', default='evidencias_archivo', help='Directorio para los clips de evidencia')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos en paralelo (por defecto, núcleos - 1)')
+    parser.add_argument('--sin-compuerta', action='store_true', help='Analizar también los frames estáticos')
+    parser.add_argument('--cada-k', type=int, default=None, help='Correr YOLO cada K frames')
+    parser.add_argument('--detector', choices=BACKENDS, default=None,
+                        help='Backend del detector de personas (por defecto, el del modelo)')
+    args = parser.parse_args()
+    
+    resumen, incidentes = escanear_directorio(args.directorio, args.modelo, args.evidencia, args.procesos,
+                                              not args.sin_compuerta, args.cada_k, args.detector)
+    if resumen is not None:
+        guardar_linea_tiempo(args.salida, resumen, incidentes)
+        print(f"\n📋 {len(incidentes)} incidentes en {resumen['duracion_total_s'] / 60:.1f} min de video, "
+              f"analizados en {resumen['segundos_proceso']:.0f}s ({resumen['veces_tiempo_real']}x tiempo real)")
+        print(f"💾 Línea de tiempo: {args.salida}")
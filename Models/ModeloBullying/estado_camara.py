@@ -0,0 +1,231 @@
+import os
+from datetime import datetime
+from buffer_circular import BufferCircularFrames
+from evidencia import SumideroEvidencia
+from extractor_caracteristicas import MotorCaracteristicas
+from compuerta_movimiento import CompuertaMovimiento
+from rastreador import RastreadorPersonas
+import detecciones
+
+class EstadoCamara:
+    """Estado de detección y grabación de una sola fuente de video
+    
+    El modelo (YOLO + clasificador) se comparte entre cámaras; todo lo que
+    depende del flujo de frames de una cámara (frame anterior, buffer previo,
+    contador de detección y grabación en curso) vive aquí.
+    """
+    
+    def __init__(self, nombre=None, frame_size=(640, 480), frames_previos=60, margen_buffer=8,
+                 cada_k_frames=1, directorio_evidencia='.', fps=20.0):
+        self.nombre = nombre
+        self.etiqueta = nombre or 'principal'  # Etiqueta `camara` en las métricas
+        self.frame_size = frame_size
+        self.frame_anterior = None
+        
+        # Extractor de características propio del flujo de esta cámara; el score
+        # se recalcula cada `paso_muestreo` frames, como en entrenamiento
+        self.motor = MotorCaracteristicas()
+        self.frames_analizados = 0
+        self.ultimo_score = 0.0
+        
+        # IDs persistentes de las personas; YOLO solo corre cada `cada_k_frames` frames
+        self.rastreador = RastreadorPersonas(cada_k_frames=cada_k_frames)
+        
+        # Compuerta de movimiento: en frames estáticos se reutiliza el último análisis
+        self.compuerta = CompuertaMovimiento()
+        self.ultimo_analisis = (detecciones.personas_vacias(), 0.0, False)
+        
+        # Variables para grabación
+        self.grabando = False
+        self.sumidero = None
+        self.carpeta_actual = None
+        self.tiempo_inicio_pelea = None
+        self.contador_deteccion = 0
+        self.incidentes = 0
+        
+        # Evidencia: clip y fotos se generan según llegan los frames (ver SumideroEvidencia)
+        self.directorio_evidencia = directorio_evidencia
+        self.fps = fps
+        self.intervalo_fotos = 10
+        self.frames_perdidos = 0
+        self.ultimo_manifiesto = None  # Futuro del manifiesto de la última grabación cerrada
+        
+        # Buffer circular preasignado para capturar momentos previos. El margen
+        # cubre los frames que aún están en colas entre captura y escritura; el
+        # hueco extra es el que la captura está sobrescribiendo.
+        self.frames_previos = frames_previos  # 3 segundos a 20fps
+        self.buffer = BufferCircularFrames(frames_previos + margen_buffer + 1, frame_size)
+        
+        # Control de grabación precisa
+        self.frames_post_pelea = 0
+        self.max_frames_post = 100  # 5 segundos después de que termine
+        self.pelea_activa = False
+        
+        # Siguiente frame del buffer que falta pasar por la máquina de grabación y
+        # última decisión de inferencia, que heredan los frames no inferidos
+        self.siguiente_grabacion = 0
+        self.ultima_decision = (False, None)
+        
+        # Hora usada para nombrar carpetas y medir duraciones; al analizar
+        # grabaciones se sustituye por la hora del propio video
+        self.reloj = datetime.now
+    
+    def reservar_buffer(self, margen_buffer):
+        """Amplía el buffer circular si hay más frames en vuelo de los previstos"""
+        capacidad = self.frames_previos + margen_buffer + 1
+        if capacidad > self.buffer.capacidad and self.buffer.total == 0:
+            self.buffer = BufferCircularFrames(capacidad, self.frame_size)
+    
+    def exportar_metricas(self, metricas):
+        """Indicadores de grabación, buffer y compuerta de la cámara (proveedor de metricas.Metricas)"""
+        camara = self.etiqueta
+        metricas.fijar('grabando', int(self.grabando), camara=camara)
+        metricas.fijar('pelea_activa', int(self.pelea_activa), camara=camara)
+        metricas.fijar('frames_evidencia', self.sumidero.frames_escritos if self.sumidero else 0, camara=camara)
+        metricas.fijar_contador('incidentes', self.incidentes, camara=camara)
+        metricas.fijar('frames_perdidos_buffer', self.frames_perdidos, camara=camara)
+        metricas.fijar('tasa_apertura_compuerta', self.compuerta.tasa_apertura(), camara=camara)
+        metricas.fijar('ultimo_score', self.ultimo_score, camara=camara)
+    
+    def crear_carpeta_evidencia(self):
+        """Crea carpeta con fecha y hora para guardar evidencias"""
+        timestamp = self.reloj().strftime("%Y%m%d_%H%M%S")
+        if self.nombre is None:
+            base = f"Pelea_Detectada_{timestamp}"
+        else:
+            base = f"Pelea_Detectada_{self.nombre}_{timestamp}"
+        
+        # Dos incidentes en el mismo segundo (p. ej. analizando más rápido que
+        # tiempo real) no deben compartir carpeta
+        carpeta = os.path.join(self.directorio_evidencia, base)
+        sufijo = 2
+        while os.path.exists(carpeta):
+            carpeta = os.path.join(self.directorio_evidencia, f"{base}_{sufijo}")
+            sufijo += 1
+        
+        os.makedirs(carpeta)
+        print(f"📁 Carpeta creada: {carpeta}")
+        
+        return carpeta
+    
+    def iniciar_grabacion_precisa(self, indice):
+        """Inicia la grabación precisa del momento de la pelea"""
+        if not self.grabando:
+            self.carpeta_actual = self.crear_carpeta_evidencia()
+            self.tiempo_inicio_pelea = self.reloj()
+            self.sumidero = SumideroEvidencia(self.carpeta_actual, self.frame_size, fps=self.fps,
+                                              intervalo_fotos=self.intervalo_fotos)
+            
+            self.grabando = True
+            self.pelea_activa = True
+            self.frames_post_pelea = 0
+            self.incidentes += 1
+            
+            # Escribir frames previos directamente desde el buffer circular
+            previos = self.buffer.rango(indice - self.frames_previos, indice)
+            print(f"🔴 GRABANDO PELEA - {self.tiempo_inicio_pelea.strftime('%H:%M:%S')}")
+            print(f"📼 Incluyendo {len(previos)} frames previos...")
+            
+            for indice_previo in previos:
+                self._escribir_frame(indice_previo)
+    
+    def detener_grabacion_precisa(self):
+        """Detiene la grabación cuando ya no hay pelea
+        
+        Devuelve el futuro del manifiesto: las fotos pendientes terminan en segundo plano.
+        """
+        if self.grabando and self.sumidero:
+            futuro = self.sumidero.cerrar()
+            self.ultimo_manifiesto = futuro
+            self.grabando = False
+            self.pelea_activa = False
+            
+            duracion = self.reloj() - self.tiempo_inicio_pelea
+            print(f"⏹️ GRABACIÓN COMPLETADA - Duración: {duracion.seconds}s")
+            print(f"📊 Total frames: {self.sumidero.frames_escritos}")
+            print(f"📸 {len(self.sumidero.fotos)} fotos de evidencia en cola")
+            print(f"💾 Evidencias guardadas en: {self.carpeta_actual}")
+            
+            self.sumidero = None
+            self.frames_post_pelea = 0
+            return futuro
+        return None
+    
+    def registrar_inferencia(self, indice, es_pelea_detectada, score=None):
+        """Pasa por la máquina de grabación todos los frames capturados hasta `indice`
+        
+        En los pipelines con hilos las colas descartan frames antes de la
+        inferencia; esos frames igual van a la evidencia, con la última
+        decisión conocida, para que el clip no tenga huecos ni se reproduzca
+        acelerado. Solo los frames inferidos cuentan para iniciar o cortar la
+        detección.
+        """
+        if indice < self.siguiente_grabacion:
+            return
+        
+        es_pelea_anterior, score_anterior = self.ultima_decision
+        for intermedio in range(self.siguiente_grabacion, indice):
+            self.actualizar_grabacion(intermedio, es_pelea_anterior, score_anterior, inferido=False)
+        
+        self.actualizar_grabacion(indice, es_pelea_detectada, score)
+        self.ultima_decision = (es_pelea_detectada, score)
+        self.siguiente_grabacion = indice + 1
+    
+    def completar_grabacion(self):
+        """Al terminar la fuente, pasa los frames capturados después del último inferido"""
+        es_pelea, score = self.ultima_decision
+        for intermedio in range(self.siguiente_grabacion, self.buffer.total):
+            self.actualizar_grabacion(intermedio, es_pelea, score, inferido=False)
+        self.siguiente_grabacion = max(self.siguiente_grabacion, self.buffer.total)
+    
+    def _escribir_frame(self, indice, score=None):
+        """Escribe el frame `indice` del buffer al clip sin que la captura lo sobrescriba a mitad"""
+        with self.buffer.leer(indice) as frame:
+            if frame is None:
+                self.frames_perdidos += 1
+                return
+            self.sumidero.agregar(frame, self.buffer.timestamp(indice), score)
+    
+    def actualizar_grabacion(self, indice, es_pelea_detectada, score=None, inferido=True):
+        """Actualiza la máquina de estados de grabación con el frame `indice` del buffer
+        
+        Con inferido=False el frame solo se escribe (si hay grabación en curso)
+        y cuenta como frame posterior a la pelea; no cambia el contador de
+        detección.
+        """
+        if not inferido and not self.grabando:
+            return
+        
+        if not self.buffer.disponible(indice):
+            # El frame se sobrescribió antes de llegar aquí (escritura muy atrasada)
+            self.frames_perdidos += 1
+            return
+        
+        if es_pelea_detectada:
+            if inferido:
+                self.contador_deteccion += 1
+                
+                # Iniciar grabación si detecta pelea por 2 frames consecutivos
+                if self.contador_deteccion >= 2 and not self.grabando:
+                    self.iniciar_grabacion_precisa(indice)
+            
+            # Si está grabando, continuar grabando
+            if self.grabando:
+                self._escribir_frame(indice, score)
+                self.frames_post_pelea = 0  # Resetear contador post-pelea
+        
+        else:
+            # No hay pelea detectada
+            if inferido:
+                self.contador_deteccion = max(0, self.contador_deteccion - 1)
+            
+            # Si estaba grabando una pelea, continuar por algunos frames más
+            if self.grabando and self.pelea_activa:
+                self.frames_post_pelea += 1
+                
+                # Continuar grabando frames post-pelea
+                self._escribir_frame(indice, score)
+                
+                # Detener grabación después de suficientes frames post-pelea
+                if self.frames_post_pelea >= self.max_frames_post:
+                    self.detener_grabacion_precisa()
@@ -0,0 +1,165 @@
+import cv2
+import json
+import numpy as np
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+_pool_fotos = None
+_lock_pool = threading.Lock()
+
+def pool_fotos():
+    """Pool compartido para codificar JPEG fuera del hilo de detección/escritura"""
+    global _pool_fotos
+    with _lock_pool:
+        if _pool_fotos is None:
+            _pool_fotos = ThreadPoolExecutor(max_workers=2, thread_name_prefix='evidencia')
+        return _pool_fotos
+
+class SumideroEvidencia:
+    """Escribe la evidencia de un incidente a medida que llegan los frames
+    
+    - El clip se codifica frame a frame con un VideoWriter.
+    - Las fotos se eligen de forma incremental: de cada ventana de
+      `intervalo_fotos` frames se queda el de mayor score, copiado a uno de
+      los huecos preasignados.
+    - Los JPEG se codifican en un pool en segundo plano; como mucho hay
+      `max_pendientes` fotos en vuelo, así la memoria es fija sin importar
+      cuánto dure la pelea.
+    - Al cerrar se escribe manifiesto.json con índice, hora y score de cada foto.
+    """
+    
+    def __init__(self, carpeta, frame_size, fps=20.0, intervalo_fotos=10,
+                 max_fotos=100, max_pendientes=4, calidad_jpeg=90):
+        self.carpeta = carpeta
+        self.frame_size = frame_size
+        self.fps = fps
+        self.intervalo_fotos = intervalo_fotos
+        self.max_fotos = max_fotos
+        self.parametros_jpeg = [int(cv2.IMWRITE_JPEG_QUALITY), calidad_jpeg]
+        self.pool = pool_fotos()
+        
+        video_path = os.path.join(carpeta, "evidencia_pelea.mp4")
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.video_writer = cv2.VideoWriter(video_path, fourcc, fps, frame_size)
+        
+        # Huecos preasignados: uno para la ventana actual y el resto para fotos en vuelo
+        ancho, alto = frame_size
+        self.huecos = np.zeros((max_pendientes + 1, alto, ancho, 3), dtype=np.uint8)
+        self.huecos_libres = deque(range(max_pendientes + 1))
+        self.condicion = threading.Condition()
+        
+        self.hueco_ventana = None
+        self.mejor_ventana = None  # (score, índice, timestamp) del candidato de la ventana
+        self.frames_ventana = 0
+        
+        self.frames_escritos = 0
+        self.fotos = []
+        self.futuros = []
+        self.esperas_pool = 0
+        self.inicio = None
+        self.cerrado = False
+    
+    def agregar(self, frame, timestamp, score=None):
+        """Escribe el frame al clip y lo considera como foto de la ventana actual"""
+        self.video_writer.write(frame)
+        indice = self.frames_escritos
+        self.frames_escritos += 1
+        if self.inicio is None:
+            self.inicio = timestamp
+        
+        if len(self.fotos) >= self.max_fotos:
+            return
+        
+        valor = -1.0 if score is None else float(score)
+        if self.mejor_ventana is None or valor > self.mejor_ventana[0]:
+            if self.hueco_ventana is None:
+                self.hueco_ventana = self._tomar_hueco()
+            np.copyto(self.huecos[self.hueco_ventana], frame)
+            self.mejor_ventana = (valor, indice, timestamp)
+        
+        self.frames_ventana += 1
+        if self.frames_ventana >= self.intervalo_fotos:
+            self._emitir_foto()
+    
+    def _tomar_hueco(self):
+        with self.condicion:
+            if not self.huecos_libres:
+                self.esperas_pool += 1
+            while not self.huecos_libres:
+                self.condicion.wait()
+            return self.huecos_libres.popleft()
+    
+    def _liberar_hueco(self, hueco):
+        with self.condicion:
+            self.huecos_libres.append(hueco)
+            self.condicion.notify()
+    
+    def _emitir_foto(self):
+        """Envía el mejor frame de la ventana al pool y abre una ventana nueva"""
+        if self.mejor_ventana is not None:
+            score, indice, timestamp = self.mejor_ventana
+            nombre = f"evidencia_{len(self.fotos) + 1:03d}.jpg"
+            self.fotos.append({
+                'archivo': nombre,
+                'frame': indice,
+                'timestamp': timestamp,
+                'hora': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+                'segundos_desde_inicio': round(timestamp - self.inicio, 3),
+                'score': None if score < 0 else round(score, 4)
+            })
+            self.futuros.append(self.pool.submit(self._guardar_foto, self.hueco_ventana,
+                                                 os.path.join(self.carpeta, nombre)))
+        
+        self.hueco_ventana = None
+        self.mejor_ventana = None
+        self.frames_ventana = 0
+    
+    def _guardar_foto(self, hueco, ruta):
+        try:
+            ok, datos = cv2.imencode('.jpg', self.huecos[hueco], self.parametros_jpeg)
+            if ok:
+                with open(ruta, 'wb') as f:
+                    f.write(datos.tobytes())
+            return ok
+        finally:
+            self._liberar_hueco(hueco)
+    
+    def cerrar(self):
+        """Cierra el clip; las fotos pendientes y el manifiesto se terminan en segundo plano"""
+        if self.cerrado:
+            return None
+        self.cerrado = True
+        
+        self._emitir_foto()
+        self.video_writer.release()
+        
+        # Los trabajos anteriores ya están en la cola del pool, así que este termina después
+        return self.pool.submit(self._escribir_manifiesto)
+    
+    def _escribir_manifiesto(self):
+        fallidas = 0
+        for futuro in self.futuros:
+            try:
+                if not futuro.result():
+                    fallidas += 1
+            except Exception as e:
+                print(f"⚠️ Error guardando foto de evidencia: {e}")
+                fallidas += 1
+        
+        manifiesto = {
+            'video': "evidencia_pelea.mp4",
+            'fps': self.fps,
+            'frame_size': list(self.frame_size),
+            'frames': self.frames_escritos,
+            'intervalo_fotos': self.intervalo_fotos,
+            'fotos_fallidas': fallidas,
+            'fotos': self.fotos
+        }
+        
+        ruta = os.path.join(self.carpeta, "manifiesto.json")
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        return ruta
@@ -0,0 +1,350 @@
+import cv2
+import numpy as np
+import time
+from collections import deque
+import detecciones
+from flujo_optico import FlujoOpticoKLT
+
+# Versión del extractor de características: incrementarla al cambiar cualquier
+# cálculo de las 30 características invalida las entradas de la caché
+VERSION_EXTRACTOR = 5
+
+NOMBRES_MOVIMIENTO = [
+    'optical_flow_avg', 'optical_flow_max', 'optical_flow_std',
+    'pixel_movement', 'gradient_avg', 'texture_change',
+    'entropy_movement', 'angle_avg'
+]
+
+NOMBRES_INTERACCION = [
+    'min_distance', 'avg_distance', 'max_overlap', 'avg_overlap',
+    'person_density', 'size_variation', 'group_dispersion',
+    'avg_relative_velocity', 'max_relative_velocity', 'person_count'
+]
+
+NOMBRES_TEMPORALES = [
+    'person_variation', 'trend', 'autocorrelation',
+    'temporal_entropy', 'stability'
+]
+
+NOMBRES_CONTEXTO = [
+    'brightness', 'contrast', 'edge_activity', 'scene_entropy',
+    'visual_density', 'spatial_dispersion_x', 'spatial_dispersion_y'
+]
+
+NOMBRES_CARACTERISTICAS = NOMBRES_MOVIMIENTO + NOMBRES_INTERACCION + NOMBRES_TEMPORALES + NOMBRES_CONTEXTO
+
+# Posición de cada grupo dentro del vector de 30 características
+MOVIMIENTO = slice(0, 8)
+INTERACCION = slice(8, 18)
+TEMPORALES = slice(18, 23)
+CONTEXTO = slice(23, 30)
+
+# Etapas cuyo costo se mide en cada frame (ver MotorCaracteristicas.resumen_costos)
+ETAPAS = (
+    'gris_gabor', 'flujo_optico', 'diferencia', 'gradientes', 'textura',
+    'entropia_movimiento', 'interaccion', 'temporales', 'contexto'
+)
+
+# Filtro de Gabor para los cambios de textura (se construye una sola vez)
+KERNEL_GABOR = cv2.getGaborKernel((15, 15), 5, np.pi/4, 2*np.pi, 0.5, 0, ktype=cv2.CV_32F)
+
+def _entropia(imagen):
+    hist = cv2.calcHist([imagen], [0], None, [256], [0, 256])
+    hist_norm = hist / np.sum(hist)
+    return -np.sum(hist_norm * np.log2(hist_norm + 1e-7))
+
+class MotorCaracteristicas:
+    """Calcula las 30 características de un flujo de frames en una sola pasada
+    
+    Guarda el estado de un flujo (una cámara o un video): gris y respuesta de
+    Gabor del frame anterior, personas anteriores e historial temporal. Cada
+    frame se convierte a gris y se filtra una sola vez, y todos los
+    intermedios (diferencia, umbral, gradientes, bordes) se escriben en
+    buffers preasignados; los gradientes se calculan en float32.
+    
+    Es el mismo extractor para entrenamiento (procesar_video_avanzado) y para
+    la cámara (ProbadorPeleas); el costo acumulado de cada etapa queda en
+    `costos` para comprobar que cabe en el presupuesto de tiempo real.
+    
+    El flujo óptico lo lleva un FlujoOpticoKLT con puntos persistentes
+    sembrados dentro de las cajas de las personas.
+    """
+    
+    def __init__(self, ventana_temporal=15):
+        self.historial_personas = deque(maxlen=ventana_temporal)
+        self.forma = None
+        self.hay_anterior = False
+        self.personas_anterior = None
+        self.flujo = FlujoOpticoKLT()
+        self.costos = dict.fromkeys(ETAPAS, 0.0)
+        self.frames_medidos = 0
+    
+    def _medir(self, etapa, inicio):
+        """Acumula el tiempo de `etapa` desde `inicio` y devuelve el instante actual"""
+        ahora = time.perf_counter()
+        self.costos[etapa] += ahora - inicio
+        return ahora
+    
+    def resumen_costos(self):
+        """Milisegundos medios por frame de cada etapa y total"""
+        n = max(self.frames_medidos, 1)
+        resumen = {etapa: 1000 * segundos / n for etapa, segundos in self.costos.items()}
+        resumen['total'] = sum(resumen.values())
+        return resumen
+    
+    def _preparar(self, forma):
+        """(Re)asigna los buffers si cambia el tamaño del frame"""
+        if forma == self.forma:
+            return
+        
+        alto, ancho = forma
+        self.forma = forma
+        self.area = alto * ancho
+        self.gray = np.empty((alto, ancho), np.uint8)
+        self.gray_anterior = np.empty((alto, ancho), np.uint8)
+        self.gabor = np.empty((alto, ancho), np.uint8)
+        self.gabor_anterior = np.empty((alto, ancho), np.uint8)
+        self.diff = np.empty((alto, ancho), np.uint8)
+        self.diff_gabor = np.empty((alto, ancho), np.uint8)
+        self.umbral = np.empty((alto, ancho), np.uint8)
+        self.bordes = np.empty((alto, ancho), np.uint8)
+        self.grad_x = np.empty((alto, ancho), np.float32)
+        self.grad_y = np.empty((alto, ancho), np.float32)
+        self.magnitud = np.empty((alto, ancho), np.float32)
+        self.hay_anterior = False
+        self.flujo.reiniciar()
+    
+    def reiniciar(self):
+        """Olvida el estado del flujo (p. ej. al empezar otro video o fragmento)"""
+        self.historial_personas.clear()
+        self.hay_anterior = False
+        self.personas_anterior = None
+        self.flujo.reiniciar()
+    
+    def extraer(self, frame, personas):
+        """Devuelve el vector de 30 características del frame y avanza el estado del flujo"""
+        self._preparar(frame.shape[:2])
+        inicio = time.perf_counter()
+        
+        # Una sola conversión a gris y un solo filtrado de Gabor por frame
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.filter2D(self.gray, cv2.CV_8U, KERNEL_GABOR, dst=self.gabor)
+        self._medir('gris_gabor', inicio)
+        
+        caracteristicas = np.empty(30)
+        caracteristicas[MOVIMIENTO] = self.caracteristicas_movimiento(personas)
+        inicio = time.perf_counter()
+        caracteristicas[INTERACCION] = self.caracteristicas_interaccion(personas)
+        inicio = self._medir('interaccion', inicio)
+        caracteristicas[TEMPORALES] = self.caracteristicas_temporales(personas)
+        inicio = self._medir('temporales', inicio)
+        caracteristicas[CONTEXTO] = self.caracteristicas_contextuales(personas)
+        self._medir('contexto', inicio)
+        self.frames_medidos += 1
+        
+        # El frame actual pasa a ser el anterior sin copiar: se intercambian buffers
+        self.gray, self.gray_anterior = self.gray_anterior, self.gray
+        self.gabor, self.gabor_anterior = self.gabor_anterior, self.gabor
+        self.hay_anterior = True
+        self.personas_anterior = personas
+        
+        return caracteristicas
+    
+    def caracteristicas_movimiento(self, personas):
+        """Flujo óptico, diferencia de frames, gradientes, textura y entropía del movimiento"""
+        if not self.hay_anterior:
+            return np.zeros(8)
+        
+        gray1, gray2 = self.gray_anterior, self.gray
+        inicio = time.perf_counter()
+        
+        # 1. Flujo óptico de los puntos seguidos dentro de las personas
+        avg_magnitude, max_magnitude, std_magnitude, avg_angle = self.flujo.actualizar(gray1, gray2, personas)
+        inicio = self._medir('flujo_optico', inicio)
+        
+        # 2. Diferencia de frames
+        cv2.absdiff(gray1, gray2, dst=self.diff)
+        cv2.threshold(self.diff, 25, 255, cv2.THRESH_BINARY, dst=self.umbral)
+        movimiento_pixeles = cv2.countNonZero(self.umbral) * 255 / self.area
+        inicio = self._medir('diferencia', inicio)
+        
+        # 3. Análisis de gradientes (float32)
+        cv2.Sobel(self.diff, cv2.CV_32F, 1, 0, dst=self.grad_x, ksize=3)
+        cv2.Sobel(self.diff, cv2.CV_32F, 0, 1, dst=self.grad_y, ksize=3)
+        cv2.magnitude(self.grad_x, self.grad_y, self.magnitud)
+        avg_gradient = cv2.mean(self.magnitud)[0]
+        inicio = self._medir('gradientes', inicio)
+        
+        # 4. Cambio de textura: la respuesta de Gabor del frame anterior ya está calculada
+        cv2.absdiff(self.gabor_anterior, self.gabor, dst=self.diff_gabor)
+        texture_score = cv2.mean(self.diff_gabor)[0]
+        inicio = self._medir('textura', inicio)
+        
+        # 5. Entropía del movimiento
+        entropia = _entropia(self.diff)
+        self._medir('entropia_movimiento', inicio)
+        
+        return np.array([
+            avg_magnitude, max_magnitude, std_magnitude,
+            movimiento_pixeles, avg_gradient, texture_score,
+            entropia, avg_angle
+        ])
+    
+    def caracteristicas_interaccion(self, personas_actual):
+        """Análisis de interacciones entre personas"""
+        n = len(personas_actual)
+        if n < 2:
+            return np.zeros(10)
+        
+        personas_anterior = self.personas_anterior
+        centros = detecciones.centros(personas_actual)
+        
+        # 1. Análisis de proximidad (todos los pares a la vez)
+        distancias = detecciones.triangulo_superior(detecciones.distancias_pares(centros))
+        overlaps = detecciones.triangulo_superior(detecciones.iou_pares(personas_actual))
+        
+        # Velocidad relativa entre pares presentes también en el frame anterior
+        velocidades_relativas = np.zeros(0)
+        if personas_anterior is not None:
+            if detecciones.tiene_ids(personas_actual) and detecciones.tiene_ids(personas_anterior):
+                # La misma persona en ambos frames según su ID de seguimiento
+                _, i_actual, i_anterior = np.intersect1d(
+                    personas_actual[:, detecciones.ID], personas_anterior[:, detecciones.ID],
+                    return_indices=True
+                )
+            else:
+                # Sin rastreador solo queda emparejar por posición en la lista
+                m = min(n, len(personas_anterior))
+                i_actual = i_anterior = np.arange(m)
+            
+            if len(i_actual) >= 2:
+                desplazamiento = centros[i_actual] - detecciones.centros(personas_anterior[i_anterior])
+                velocidades = np.sqrt(np.sum(desplazamiento ** 2, axis=1))
+                velocidades_relativas = detecciones.triangulo_superior(
+                    np.abs(velocidades[:, None] - velocidades[None, :])
+                )
+        
+        # 2. Características estadísticas
+        min_dist = np.min(distancias)
+        avg_dist = np.mean(distancias)
+        max_overlap = np.max(overlaps)
+        avg_overlap = np.mean(overlaps)
+        
+        # 3. Densidad de personas
+        densidad = n / (640 * 480)  # Normalizado por área frame
+        
+        # 4. Variación en tamaños (puede indicar perspectiva/movimiento)
+        areas = personas_actual[:, detecciones.AREA]
+        variacion_tamano = np.std(areas) / (np.mean(areas) + 1e-7)
+        
+        # 5. Análisis de formación grupal
+        centroide = np.mean(centros, axis=0)
+        dispersion = np.mean(np.sqrt(np.sum((centros - centroide) ** 2, axis=1)))
+        
+        # 6. Velocidades promedio
+        avg_vel_rel = np.mean(velocidades_relativas) if len(velocidades_relativas) else 0
+        max_vel_rel = np.max(velocidades_relativas) if len(velocidades_relativas) else 0
+        
+        return np.array([
+            min_dist, avg_dist, max_overlap, avg_overlap, densidad,
+            variacion_tamano, dispersion, avg_vel_rel, max_vel_rel, n
+        ])
+    
+    def caracteristicas_temporales(self, personas):
+        """Patrones temporales del número de personas"""
+        self.historial_personas.append(len(personas))
+        
+        if len(self.historial_personas) < 5:
+            return np.zeros(5)
+        
+        y = np.array(self.historial_personas)
+        
+        # Variación en número de personas
+        variacion_personas = np.std(y)
+        
+        # Tendencia (regresión lineal simple)
+        x = np.arange(len(y))
+        tendencia = np.polyfit(x, y, 1)[0]
+        
+        # Periodicidad (autocorrelación simple)
+        if len(y) >= 10:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                autocorr = np.corrcoef(y[:-5], y[5:])[0, 1]
+            autocorr = autocorr if not np.isnan(autocorr) else 0
+        else:
+            autocorr = 0
+        
+        # Entropía temporal
+        hist, _ = np.histogram(y, bins=5, range=(0, 10))
+        hist_norm = hist / np.sum(hist) if np.sum(hist) > 0 else hist
+        entropia_temporal = -np.sum(hist_norm * np.log2(hist_norm + 1e-7))
+        
+        # Estabilidad (coeficiente de variación)
+        estabilidad = np.std(y) / (np.mean(y) + 1e-7)
+        
+        return np.array([variacion_personas, tendencia, autocorr, entropia_temporal, estabilidad])
+    
+    def caracteristicas_contextuales(self, personas):
+        """Contexto de la escena a partir del gris ya calculado"""
+        gray = self.gray
+        
+        # 1-2. Brillo promedio y contraste
+        media, desviacion = cv2.meanStdDev(gray)
+        brillo_promedio = media[0, 0]
+        contraste = desviacion[0, 0]
+        
+        # 3. Actividad en los bordes
+        cv2.Canny(gray, 50, 150, edges=self.bordes)
+        actividad_bordes = cv2.countNonZero(self.bordes) * 255 / self.area
+        
+        # 4. Complejidad de la escena (entropía de la imagen)
+        entropia_escena = _entropia(gray)
+        
+        # 5. Densidad de personas en frame
+        densidad_visual = np.sum(personas[:, detecciones.AREA]) / self.area
+        
+        # 6. Distribución espacial de personas
+        if len(personas) > 0:
+            dispersion_x, dispersion_y = np.std(detecciones.centros(personas), axis=0) / (
+                self.forma[1], self.forma[0]
+            )
+        else:
+            dispersion_x = dispersion_y = 0
+        
+        return np.array([
+            brillo_promedio, contraste, actividad_bordes, entropia_escena,
+            densidad_visual, dispersion_x, dispersion_y
+        ])
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Costo por etapa del extractor de características sobre un video')
+    parser.add_argument('video')
+    parser.add_argument('--paso', type=int, default=3, help='Procesar 1 de cada N frames (como en entrenamiento)')
+    parser.add_argument('--fps', type=float, default=20.0, help='FPS de la cámara para el presupuesto por frame')
+    args = parser.parse_args()
+    
+    # Sin detector: solo se mide el extractor; una persona que ocupa todo el
+    # frame para que el flujo óptico tenga dónde sembrar puntos
+    motor = MotorCaracteristicas()
+    frame_completo = detecciones.construir_personas([[0, 0, 640, 480]], [1.0])
+    cap = cv2.VideoCapture(args.video)
+    frame_count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count % args.paso == 0:
+            motor.extraer(cv2.resize(frame, (640, 480)), frame_completo)
+        frame_count += 1
+    cap.release()
+    
+    resumen = motor.resumen_costos()
+    presupuesto = 1000 * args.paso / args.fps
+    print(f"⏱️ Costo por frame analizado ({motor.frames_medidos} frames):")
+    for etapa, ms in resumen.items():
+        print(f"  {etapa}: {ms:.2f} ms")
+    print(f"🎯 Presupuesto: {presupuesto:.1f} ms cada {args.paso} frames a {args.fps:.0f} fps "
+          f"({100 * resumen['total'] / presupuesto:.0f}% usado)")
+    print(f"🎯 Flujo óptico: {motor.flujo.siembras} siembras de esquinas en {motor.flujo.pasos} pasos")
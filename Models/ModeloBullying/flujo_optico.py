@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+import detecciones
+
+class FlujoOpticoKLT:
+    """Flujo óptico disperso (KLT) con puntos que persisten entre frames
+    
+    En lugar de buscar esquinas en cada par de frames, mantiene un conjunto
+    de puntos vivos que se siguen con calcOpticalFlowPyrLK. Solo se buscan
+    esquinas nuevas (goodFeaturesToTrack) cuando sobreviven menos de
+    `min_puntos` o cada `intervalo_resiembra` frames, y siempre dentro de las
+    cajas de las personas. Las estadísticas se calculan sobre el
+    desplazamiento real de cada punto entre los dos frames.
+    """
+    
+    def __init__(self, max_puntos=100, min_puntos=30, intervalo_resiembra=10,
+                 calidad=0.3, distancia_min=7, tam_bloque=7, margen=10):
+        self.max_puntos = max_puntos
+        self.min_puntos = min_puntos
+        self.intervalo_resiembra = intervalo_resiembra
+        self.calidad = calidad
+        self.distancia_min = distancia_min
+        self.tam_bloque = tam_bloque
+        self.margen = margen  # Píxeles alrededor de cada caja donde también se siembra
+        self.parametros_lk = dict(winSize=(15, 15), maxLevel=2,
+                                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.mascara = None
+        self.reiniciar()
+        
+        # Estadísticas
+        self.siembras = 0
+        self.pasos = 0
+    
+    def reiniciar(self):
+        self.puntos = np.zeros((0, 1, 2), np.float32)
+        self.frames_desde_siembra = 0
+    
+    def _mascara_personas(self, forma, personas):
+        """Máscara con las cajas de las personas (más un margen)"""
+        if self.mascara is None or self.mascara.shape != forma:
+            self.mascara = np.zeros(forma, np.uint8)
+        else:
+            self.mascara.fill(0)
+        
+        alto, ancho = forma
+        cajas = np.round(personas[:, detecciones.X1:detecciones.Y2 + 1]).astype(int)
+        for x1, y1, x2, y2 in cajas:
+            self.mascara[max(y1 - self.margen, 0):min(y2 + self.margen, alto),
+                         max(x1 - self.margen, 0):min(x2 + self.margen, ancho)] = 255
+        return self.mascara
+    
+    def _sembrar(self, gray, personas):
+        """Añade esquinas nuevas dentro de las personas, lejos de los puntos ya vivos"""
+        mascara = self._mascara_personas(gray.shape, personas)
+        for x, y in self.puntos.reshape(-1, 2):
+            cv2.circle(mascara, (int(x), int(y)), self.distancia_min, 0, -1)
+        
+        faltan = self.max_puntos - len(self.puntos)
+        if faltan > 0:
+            nuevos = cv2.goodFeaturesToTrack(gray, maxCorners=faltan, qualityLevel=self.calidad,
+                                             minDistance=self.distancia_min, blockSize=self.tam_bloque,
+                                             mask=mascara)
+            if nuevos is not None:
+                self.puntos = np.concatenate([self.puntos, nuevos.astype(np.float32)])
+        
+        self.frames_desde_siembra = 0
+        self.siembras += 1
+    
+    def actualizar(self, gray_anterior, gray, personas):
+        """Sigue los puntos de gray_anterior a gray
+        
+        Devuelve (magnitud media, máxima, desviación y ángulo medio) del desplazamiento.
+        """
+        self.pasos += 1
+        if len(personas) == 0:
+            # Sin personas no hay dónde medir movimiento de personas
+            self.reiniciar()
+            return 0, 0, 0, 0
+        
+        if len(self.puntos) < self.min_puntos or self.frames_desde_siembra >= self.intervalo_resiembra:
+            self._sembrar(gray_anterior, personas)
+        self.frames_desde_siembra += 1
+        
+        if len(self.puntos) == 0:
+            return 0, 0, 0, 0
+        
+        siguientes, estado, _ = cv2.calcOpticalFlowPyrLK(gray_anterior, gray, self.puntos, None, **self.parametros_lk)
+        validos = estado.reshape(-1) == 1
+        desplazamiento = (siguientes - self.puntos).reshape(-1, 2)[validos]
+        
+        # Solo siguen vivos los puntos encontrados que continúan dentro de alguna persona
+        siguientes = siguientes[validos]
+        self.puntos = siguientes[self._dentro_de_personas(siguientes.reshape(-1, 2), personas)]
+        
+        if len(desplazamiento) == 0:
+            return 0, 0, 0, 0
+        
+        dx = desplazamiento[:, 0]
+        dy = desplazamiento[:, 1]
+        magnitude = np.sqrt(dx**2 + dy**2)
+        angle = np.arctan2(dy, dx)
+        return np.mean(magnitude), np.max(magnitude), np.std(magnitude), np.mean(angle)
+    
+    def _dentro_de_personas(self, puntos, personas):
+        x = puntos[:, 0:1]
+        y = puntos[:, 1:2]
+        dentro = (
+            (x >= personas[None, :, detecciones.X1] - self.margen) &
+            (x <= personas[None, :, detecciones.X2] + self.margen) &
+            (y >= personas[None, :, detecciones.Y1] - self.margen) &
+            (y <= personas[None, :, detecciones.Y2] + self.margen)
+        )
+        return np.any(dentro, axis=1)
@@ -0,0 +1,117 @@
+import cv2
+
+class LectorVideo:
+    """Fuente de frames muestreados de un video: itera (indice, timestamp, frame)
+    
+    Solo se decodifica lo que se usa:
+    - Los frames que no tocan se avanzan con grab(), que demultiplexa el
+      paquete sin convertirlo a imagen; retrieve() solo se llama en los
+      frames muestreados.
+    - Con `salto_minimo`, si el siguiente frame muestreado está a esa
+      distancia o más, se busca directamente con CAP_PROP_POS_FRAMES (el
+      backend salta al keyframe anterior) en lugar de avanzar uno a uno.
+      Con algunos códecs (H.264 con B-frames) la búsqueda no es exacta al
+      frame, por eso está desactivada por defecto: conviene para pasos
+      grandes cuando un frame de diferencia no importa.
+    - Con `tamano` se pide al backend esa resolución (las cámaras y algunos
+      backends la aplican al decodificar) y, si el frame llega con otra, se
+      redimensiona solo el frame muestreado.
+    
+    `indice` es la posición del frame en el video empezando en 0 y se
+    muestrean los frames con indice % paso == desfase; el desfase por
+    defecto (paso - 1) equivale a procesar "cada paso-ésimo frame" contando
+    desde 1. `timestamp` está en segundos desde el inicio del video.
+    """
+    
+    def __init__(self, ruta, paso=1, desfase=None, frame_inicio=0, frame_fin=None,
+                 tamano=None, salto_minimo=None, interpolacion=cv2.INTER_LINEAR):
+        self.ruta = ruta
+        self.paso = paso
+        self.desfase = paso - 1 if desfase is None else desfase
+        self.frame_inicio = frame_inicio
+        self.frame_fin = frame_fin
+        self.tamano = tuple(tamano) if tamano is not None else None
+        self.salto_minimo = salto_minimo
+        self.interpolacion = interpolacion
+        
+        self.cap = cv2.VideoCapture(ruta)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0.0
+        if self.tamano is not None and self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.tamano[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.tamano[1])
+        
+        # Estadísticas
+        self.decodificados = 0
+        self.saltados = 0
+        self.busquedas = 0
+    
+    def abierto(self):
+        return self.cap.isOpened()
+    
+    def total_frames(self):
+        """Frames que informa el contenedor (0 si no lo sabe)"""
+        return max(int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    
+    def _siguiente_muestreado(self, indice):
+        """Primer índice >= indice que toca procesar"""
+        return indice + (self.desfase - indice) % self.paso
+    
+    def _timestamp(self, indice):
+        if self.fps > 0:
+            return indice / self.fps
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    
+    def __iter__(self):
+        if not self.cap.isOpened():
+            return
+        
+        total = self.total_frames()
+        indice = self.frame_inicio
+        if indice > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, indice)
+            self.busquedas += 1
+        
+        while True:
+            objetivo = self._siguiente_muestreado(indice)
+            if self.frame_fin is not None and objetivo >= self.frame_fin:
+                break
+            
+            if self.salto_minimo is not None and objetivo - indice >= self.salto_minimo:
+                # Una búsqueda más allá del final deja al backend devolviendo el último frame
+                if total > 0 and objetivo >= total:
+                    return
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, objetivo)
+                if int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) != objetivo:
+                    return
+                self.busquedas += 1
+                self.saltados += objetivo - indice
+                indice = objetivo
+            else:
+                # Avanzar sin decodificar a imagen hasta el frame objetivo
+                while indice < objetivo:
+                    if not self.cap.grab():
+                        return
+                    self.saltados += 1
+                    indice += 1
+            
+            if not self.cap.grab():
+                return
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                return
+            self.decodificados += 1
+            
+            if self.tamano is not None and (frame.shape[1], frame.shape[0]) != self.tamano:
+                frame = cv2.resize(frame, self.tamano, interpolation=self.interpolacion)
+            
+            yield indice, self._timestamp(indice), frame
+            indice += 1
+    
+    def liberar(self):
+        self.cap.release()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.liberar()
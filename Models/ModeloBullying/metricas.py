@@ -0,0 +1,270 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIJO = 'detector_peleas'
+
+# Límites (segundos) del histograma de latencia de inferencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+def _formatear_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pares) + '}'
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # El último es +Inf
+        self.suma = 0.0
+        self.n = 0
+    
+    def observar(self, valor):
+        self.cuentas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.n += 1
+    
+    def acumulado(self):
+        total = 0
+        for limite, cuenta in zip(self.limites + (float('inf'),), self.cuentas):
+            total += cuenta
+            yield limite, total
+
+class Metricas:
+    """Contadores, indicadores, tiempos por etapa e histograma de latencia del detector
+    
+    Todo lo que se mide en el camino caliente es una suma bajo un lock. Lo que
+    ya vive en otros objetos (profundidad de colas, estado de grabación,
+    descartes) no se copia en cada frame: se registran "proveedores" que lo
+    leen solo cuando alguien pide las métricas (ver `registrar_proveedor`).
+    
+    Las etiquetas son palabras clave, p. ej. incrementar('frames', camara='cam0').
+    """
+    
+    habilitadas = True
+    
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.contadores = {}
+        self.indicadores = {}
+        self.etapas = {}        # (etapa, etiquetas) -> [segundos acumulados, veces]
+        self.histogramas = {}
+        self.proveedores = []
+        self.inicio = time.time()
+    
+    def incrementar(self, nombre, n=1, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self.lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + n
+    
+    def fijar(self, nombre, valor, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self.lock:
+            self.indicadores[clave] = valor
+    
+    def fijar_contador(self, nombre, valor, **etiquetas):
+        """Contador que otro objeto ya lleva acumulado (p. ej. descartes de una cola)"""
+        clave = _clave(nombre, etiquetas)
+        with self.lock:
+            self.contadores[clave] = valor
+    
+    def observar_etapa(self, etapa, segundos, **etiquetas):
+        clave = _clave(etapa, etiquetas)
+        with self.lock:
+            acumulado = self.etapas.get(clave)
+            if acumulado is None:
+                self.etapas[clave] = [segundos, 1]
+            else:
+                acumulado[0] += segundos
+                acumulado[1] += 1
+    
+    def observar_latencia(self, segundos, **etiquetas):
+        """Latencia de inferencia de un frame (histograma)"""
+        clave = _clave('latencia_inferencia_segundos', etiquetas)
+        with self.lock:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = Histograma(self.buckets)
+            histograma.observar(segundos)
+    
+    def registrar_proveedor(self, proveedor):
+        """`proveedor(metricas)` se llama justo antes de exportar para fijar indicadores"""
+        self.proveedores.append(proveedor)
+    
+    def _actualizar_proveedores(self):
+        for proveedor in list(self.proveedores):
+            proveedor(self)
+    
+    def texto_prometheus(self):
+        """Formato de texto de Prometheus (versión 0.0.4)"""
+        self._actualizar_proveedores()
+        lineas = []
+        with self.lock:
+            vistos = set()
+            for (nombre, etiquetas), valor in sorted(self.contadores.items()):
+                metrica = f'{PREFIJO}_{nombre}_total'
+                if metrica not in vistos:
+                    lineas.append(f'# TYPE {metrica} counter')
+                    vistos.add(metrica)
+                lineas.append(f'{metrica}{_formatear_etiquetas(etiquetas)} {valor}')
+            
+            for (nombre, etiquetas), valor in sorted(self.indicadores.items()):
+                metrica = f'{PREFIJO}_{nombre}'
+                if metrica not in vistos:
+                    lineas.append(f'# TYPE {metrica} gauge')
+                    vistos.add(metrica)
+                lineas.append(f'{metrica}{_formatear_etiquetas(etiquetas)} {float(valor)}')
+            
+            if self.etapas:
+                metrica = f'{PREFIJO}_etapa_segundos'
+                lineas.append(f'# TYPE {metrica} summary')
+                for (etapa, etiquetas), (segundos, veces) in sorted(self.etapas.items()):
+                    texto = _formatear_etiquetas(etiquetas, [('etapa', etapa)])
+                    lineas.append(f'{metrica}_sum{texto} {segundos}')
+                    lineas.append(f'{metrica}_count{texto} {veces}')
+            
+            for (nombre, etiquetas), histograma in sorted(self.histogramas.items()):
+                metrica = f'{PREFIJO}_{nombre}'
+                if metrica not in vistos:
+                    lineas.append(f'# TYPE {metrica} histogram')
+                    vistos.add(metrica)
+                for limite, total in histograma.acumulado():
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(f'{metrica}_bucket{_formatear_etiquetas(etiquetas, [("le", le)])} {total}')
+                lineas.append(f'{metrica}_sum{_formatear_etiquetas(etiquetas)} {histograma.suma}')
+                lineas.append(f'{metrica}_count{_formatear_etiquetas(etiquetas)} {histograma.n}')
+        return '\n'.join(lineas) + '\n'
+    
+    def instantanea(self):
+        """Diccionario con todas las métricas (para la línea JSON periódica)"""
+        self._actualizar_proveedores()
+        
+        def agrupar(elementos, convertir):
+            grupos = {}
+            for (nombre, etiquetas), valor in elementos:
+                texto = ','.join(f'{k}={v}' for k, v in etiquetas) or '_'
+                grupos.setdefault(nombre, {})[texto] = convertir(valor)
+            return grupos
+        
+        with self.lock:
+            return {
+                'timestamp': time.time(),
+                'segundos_activo': time.time() - self.inicio,
+                'contadores': agrupar(self.contadores.items(), lambda v: v),
+                'indicadores': agrupar(self.indicadores.items(), float),
+                'etapas_ms': agrupar(self.etapas.items(), lambda v: {
+                    'media_ms': 1000 * v[0] / v[1], 'n': v[1]
+                }),
+                'latencia_inferencia': agrupar(self.histogramas.items(), lambda h: {
+                    'n': h.n,
+                    'media_ms': 1000 * h.suma / h.n if h.n else 0.0,
+                    'buckets': {('+Inf' if l == float('inf') else str(l)): t for l, t in h.acumulado()}
+                })
+            }
+
+class MetricasDesactivadas:
+    """Misma interfaz que Metricas sin hacer nada: el costo es una llamada vacía"""
+    
+    habilitadas = False
+    
+    def incrementar(self, nombre, n=1, **etiquetas):
+        pass
+    
+    def fijar(self, nombre, valor, **etiquetas):
+        pass
+    
+    def fijar_contador(self, nombre, valor, **etiquetas):
+        pass
+    
+    def observar_etapa(self, etapa, segundos, **etiquetas):
+        pass
+    
+    def observar_latencia(self, segundos, **etiquetas):
+        pass
+    
+    def registrar_proveedor(self, proveedor):
+        pass
+
+SIN_METRICAS = MetricasDesactivadas()
+
+class ServidorMetricas:
+    """Endpoint HTTP: /metrics (texto Prometheus) y /metrics.json, en un hilo aparte"""
+    
+    def __init__(self, metricas, puerto=9100, host='0.0.0.0'):
+        self.metricas = metricas
+        metricas_servidor = metricas
+        
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    cuerpo = json.dumps(metricas_servidor.instantanea()).encode()
+                    tipo = 'application/json'
+                elif self.path.startswith('/metrics'):
+                    cuerpo = metricas_servidor.texto_prometheus().encode()
+                    tipo = 'text/plain; version=0.0.4; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+            
+            def log_message(self, formato, *args):
+                pass  # Sin una línea en consola por cada scrape
+        
+        self.servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        self.servidor.daemon_threads = True
+        self.puerto = self.servidor.server_address[1]
+        self.hilo = None
+    
+    def iniciar(self):
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, name='metricas', daemon=True)
+        self.hilo.start()
+        print(f"📈 Métricas en http://localhost:{self.puerto}/metrics")
+        return self
+    
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+class ReporteroJSON:
+    """Escribe una línea JSON con las métricas cada `intervalo` segundos ('-' = salida estándar)"""
+    
+    def __init__(self, metricas, ruta='-', intervalo=10.0):
+        self.metricas = metricas
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.detenido = threading.Event()
+        self.hilo = None
+    
+    def _escribir(self):
+        linea = json.dumps(self.metricas.instantanea())
+        if self.ruta == '-':
+            print(linea, flush=True)
+        else:
+            with open(self.ruta, 'a') as f:
+                f.write(linea + '\n')
+    
+    def _bucle(self):
+        while not self.detenido.wait(self.intervalo):
+            self._escribir()
+    
+    def iniciar(self):
+        self.hilo = threading.Thread(target=self._bucle, name='metricas_json', daemon=True)
+        self.hilo.start()
+        return self
+    
+    def detener(self):
+        self.detenido.set()
+        if self.hilo is not None:
+            self.hilo.join()
+        self._escribir()
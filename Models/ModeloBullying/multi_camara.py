@@ -0,0 +1,289 @@
+import cv2
+import threading
+import time
+from estado_camara import EstadoCamara
+from pipeline_tiempo_real import ColaDescarte, EstadisticasLatencia
+
+class Camara:
+    """Una fuente de video del servidor: captura propia y estado de grabación propio"""
+    
+    def __init__(self, indice, fuente, frame_size, margen_buffer=32, cada_k_frames=1):
+        self.fuente = fuente
+        self.nombre = f"cam{indice}"
+        self.frame_size = frame_size
+        self.estado = EstadoCamara(nombre=self.nombre, frame_size=frame_size,
+                                   margen_buffer=margen_buffer, cada_k_frames=cada_k_frames)
+        
+        # Solo se infiere el último frame: si la inferencia va atrasada se descartan
+        # (el escritor igual graba todos los frames capturados desde el buffer)
+        self.ultimo_frame = ColaDescarte(1, self.nombre)
+        self.frames_procesados = 0
+        self.frames_estaticos = 0
+        self.frames_perdidos_inferencia = 0  # Sobrescritos antes de que la inferencia los tomara
+        self.cap = None
+        self.hilo = None
+        self.vista = None
+    
+    def abrir(self):
+        self.cap = cv2.VideoCapture(self.fuente)
+        if not self.cap.isOpened():
+            print(f"❌ Error: No se puede abrir la fuente {self.fuente} ({self.nombre})")
+            self.ultimo_frame.cerrar()
+            return False
+        
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_size[1])
+        return True
+    
+    def capturar(self, detener):
+        """Hilo de captura de la cámara"""
+        try:
+            while not detener.is_set():
+                indice, _ = self.estado.buffer.capturar(self.cap, time.time())
+                if indice is None:
+                    print(f"⏹️ Fin de la fuente {self.fuente} ({self.nombre})")
+                    break
+                
+                self.ultimo_frame.poner((indice, time.perf_counter()))
+        finally:
+            self.cap.release()
+            self.ultimo_frame.cerrar()
+
+class ServidorMultiCamara:
+    """Sirve varias cámaras desde un solo proceso con un único modelo
+    
+    Cada cámara tiene su hilo de captura y su EstadoCamara. En cada ciclo se
+    toma el último frame nuevo de cada cámara y todos se envían juntos a YOLO
+    en una sola llamada; el score y la grabación se resuelven por cámara. La
+    escritura de evidencia de todas las cámaras la hace un hilo escritor
+    compartido, que graba cada frame capturado aunque no se haya inferido.
+    """
+    
+    def __init__(self, probador, fuentes, frame_size=(640, 480),
+                 tam_cola_escritura=256, mostrar=False, intervalo_reporte=10.0):
+        self.probador = probador
+        self.frame_size = frame_size
+        self.mostrar = mostrar
+        self.intervalo_reporte = intervalo_reporte
+        self.camaras = [
+            Camara(i, fuente, frame_size, cada_k_frames=probador.cada_k_frames)
+            for i, fuente in enumerate(fuentes)
+        ]
+        
+        self.cola_escritura = ColaDescarte(tam_cola_escritura, 'escritura')
+        self.latencias = {
+            'deteccion_lote': EstadisticasLatencia(),
+            'score': EstadisticasLatencia(),
+            'escritura': EstadisticasLatencia(),
+            'extremo_a_extremo': EstadisticasLatencia()
+        }
+        self.lotes = 0
+        self.frames_en_lotes = 0
+        self.detener = threading.Event()
+        
+        self.metricas = probador.metricas
+        self.metricas.registrar_proveedor(self.exportar_metricas)
+        for camara in self.camaras:
+            self.metricas.registrar_proveedor(camara.estado.exportar_metricas)
+    
+    def _escribir(self):
+        """Hilo escritor compartido por todas las cámaras"""
+        while True:
+            elemento = self.cola_escritura.obtener()
+            if elemento is None:
+                break
+            
+            estado, indice, score, es_pelea, t_captura = elemento
+            inicio = time.perf_counter()
+            estado.registrar_inferencia(indice, es_pelea, score)
+            fin = time.perf_counter()
+            
+            self.latencias['escritura'].registrar(fin - inicio)
+            self.latencias['extremo_a_extremo'].registrar(fin - t_captura)
+            self.metricas.observar_etapa('escritura', fin - inicio, camara=estado.etiqueta)
+        
+        for camara in self.camaras:
+            camara.estado.completar_grabacion()
+            if camara.estado.grabando:
+                camara.estado.detener_grabacion_precisa()
+    
+    def procesar_ciclo(self):
+        """Procesa el último frame nuevo de cada cámara con una sola inferencia
+        
+        Devuelve cuántos frames se procesaron, o None si todas las fuentes terminaron.
+        """
+        listos = []
+        rastreados = []
+        estaticos = []
+        for camara in self.camaras:
+            elemento = camara.ultimo_frame.obtener_sin_esperar()
+            if elemento is None:
+                continue
+            
+            # Copia propia: la captura puede reutilizar el hueco del buffer mientras se analiza
+            indice, t_captura = elemento
+            frame = camara.estado.buffer.copiar(indice)
+            if frame is None:
+                camara.frames_perdidos_inferencia += 1
+                continue
+            elemento = (indice, frame, t_captura)
+            
+            # Solo los frames con movimiento a los que les toca detector van al lote de YOLO
+            if not self.probador.compuerta_abierta(elemento[1], camara.estado):
+                estaticos.append((camara,) + elemento)
+            elif camara.estado.rastreador.necesita_deteccion():
+                listos.append((camara,) + elemento)
+            else:
+                rastreados.append((camara,) + elemento)
+        
+        if not listos and not rastreados and not estaticos:
+            if all(camara.ultimo_frame.cerrada for camara in self.camaras):
+                return None
+            return 0
+        
+        inicio_ciclo = time.perf_counter()
+        if listos:
+            # Una sola llamada a YOLO para todas las cámaras con movimiento
+            personas_lote = self.probador.detectar_personas_lote([frame for _, _, frame, _ in listos])
+            segundos = time.perf_counter() - inicio_ciclo
+            self.latencias['deteccion_lote'].registrar(segundos)
+            self.metricas.observar_etapa('deteccion_lote', segundos)
+            self.lotes += 1
+            self.frames_en_lotes += len(listos)
+        else:
+            personas_lote = []
+        
+        # Con detección nueva se actualiza el rastreador; sin ella se predicen las pistas
+        analizados = list(zip(listos, personas_lote)) + [(elemento, None) for elemento in rastreados]
+        for (camara, indice, frame, t_captura), personas_detectadas in analizados:
+            inicio = time.perf_counter()
+            estado = camara.estado
+            personas = self.probador.personas_rastreadas(frame, estado, personas_detectadas)
+            score, es_pelea = self.probador.analizar_personas(frame, estado.frame_anterior, personas, estado)
+            estado.frame_anterior = frame
+            fin = time.perf_counter()
+            self.latencias['score'].registrar(fin - inicio)
+            self.metricas.observar_etapa('score', fin - inicio, camara=estado.etiqueta)
+            # Latencia de inferencia del frame: lote de YOLO compartido + su score
+            self.metricas.observar_latencia(fin - inicio_ciclo, camara=estado.etiqueta)
+            
+            self._entregar(camara, indice, frame, t_captura, personas, score, es_pelea)
+        
+        for camara, indice, frame, t_captura in estaticos:
+            # Escena estática: se reutiliza el último análisis de la cámara
+            personas, score, es_pelea = camara.estado.ultimo_analisis
+            camara.estado.frame_anterior = frame
+            camara.frames_estaticos += 1
+            self.metricas.incrementar('frames_estaticos', camara=camara.estado.etiqueta)
+            self._entregar(camara, indice, frame, t_captura, personas, score, es_pelea)
+        
+        return len(listos) + len(rastreados) + len(estaticos)
+    
+    def _entregar(self, camara, indice, frame, t_captura, personas, score, es_pelea):
+        """Envía el resultado del frame al escritor y a la visualización"""
+        camara.frames_procesados += 1
+        self.metricas.incrementar('frames_procesados', camara=camara.estado.etiqueta)
+        self.cola_escritura.poner((camara.estado, indice, score, es_pelea, t_captura))
+        
+        if self.mostrar:
+            camara.vista = (frame, personas, score, es_pelea)
+    
+    def _mostrar(self):
+        for camara in self.camaras:
+            if camara.vista is not None:
+                frame, personas, score, es_pelea = camara.vista
+                vista = frame.copy()
+                self.probador.dibujar_interfaz(vista, personas, score, es_pelea, camara.estado)
+                cv2.imshow(f"Detector de Peleas - {camara.nombre}", vista)
+                camara.vista = None
+        
+        return cv2.waitKey(1) & 0xFF == ord('q')
+    
+    def exportar_metricas(self, metricas):
+        """Colas de cada cámara y del escritor (proveedor de metricas.Metricas)"""
+        for camara in self.camaras:
+            metricas.fijar('profundidad_cola', len(camara.ultimo_frame), camara=camara.nombre, cola='captura')
+            metricas.fijar_contador('frames_descartados', camara.ultimo_frame.descartados,
+                                    camara=camara.nombre, cola='captura')
+        metricas.fijar('profundidad_cola', len(self.cola_escritura), camara='todas', cola='escritura')
+        metricas.fijar_contador('frames_descartados', self.cola_escritura.descartados,
+                                camara='todas', cola='escritura')
+        if self.lotes:
+            metricas.fijar('tamano_lote_medio', self.frames_en_lotes / self.lotes)
+    
+    def reporte(self):
+        """Latencias, tamaño medio de lote y frames por cámara"""
+        return {
+            'latencias': {etapa: stats.resumen() for etapa, stats in self.latencias.items()},
+            'tamano_lote_medio': self.frames_en_lotes / max(self.lotes, 1),
+            'camaras': {
+                camara.nombre: {
+                    'fuente': str(camara.fuente),
+                    'frames_procesados': camara.frames_procesados,
+                    'frames_descartados': camara.ultimo_frame.descartados,
+                    'frames_estaticos': camara.frames_estaticos,
+                    'compuerta': camara.estado.compuerta.reporte(),
+                    'frames_perdidos_buffer': camara.estado.frames_perdidos,
+                    'frames_perdidos_inferencia': camara.frames_perdidos_inferencia,
+                    'costo_caracteristicas_ms': camara.estado.motor.resumen_costos()['total'],
+                    'grabando': camara.estado.grabando
+                }
+                for camara in self.camaras
+            },
+            'descartados_escritura': self.cola_escritura.descartados
+        }
+    
+    def imprimir_reporte(self):
+        reporte = self.reporte()
+        print(f"⏱️ Lote medio: {reporte['tamano_lote_medio']:.1f} frames")
+        for etapa, stats in reporte['latencias'].items():
+            print(f"  {etapa}: media {stats['media_ms']:.1f} ms | p99 {stats['p99_ms']:.1f} ms")
+        for nombre, datos in reporte['camaras'].items():
+            print(f"  📹 {nombre}: {datos['frames_procesados']} procesados "
+                  f"({datos['frames_estaticos']} estáticos), {datos['frames_descartados']} descartados")
+    
+    def ejecutar(self):
+        """Arranca captura y escritor, y procesa ciclos hasta que terminen las fuentes o se pulse 'q'"""
+        camaras_abiertas = [camara for camara in self.camaras if camara.abrir()]
+        if not camaras_abiertas:
+            return None
+        
+        print(f"🎥 DETECTOR DE PELEAS MULTICÁMARA: {len(camaras_abiertas)} fuentes")
+        print("-" * 50)
+        
+        for camara in camaras_abiertas:
+            camara.hilo = threading.Thread(target=camara.capturar, args=(self.detener,),
+                                           name=f"captura-{camara.nombre}", daemon=True)
+            camara.hilo.start()
+        
+        escritor = threading.Thread(target=self._escribir, name='escritor', daemon=True)
+        escritor.start()
+        
+        ultimo_reporte = time.time()
+        try:
+            while True:
+                procesados = self.procesar_ciclo()
+                if procesados is None:
+                    break
+                if procesados == 0:
+                    time.sleep(0.002)
+                
+                if self.mostrar and self._mostrar():
+                    break
+                
+                if time.time() - ultimo_reporte >= self.intervalo_reporte:
+                    self.imprimir_reporte()
+                    ultimo_reporte = time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.detener.set()
+            for camara in camaras_abiertas:
+                camara.hilo.join()
+            self.cola_escritura.cerrar()
+            escritor.join()
+            if self.mostrar:
+                cv2.destroyAllWindows()
+        
+        self.imprimir_reporte()
+        return self.reporte()
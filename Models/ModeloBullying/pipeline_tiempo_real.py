@@ -0,0 +1,287 @@
+import cv2
+import numpy as np
+import threading
+import time
+from collections import deque
+
+class ColaDescarte:
+    """Cola acotada entre etapas: si está llena descarta el elemento más antiguo
+    
+    Así una etapa lenta nunca bloquea a la anterior; los descartes quedan
+    contados para poder ver dónde se pierde tiempo real.
+    """
+    
+    def __init__(self, maxsize, nombre):
+        self.nombre = nombre
+        self.maxsize = maxsize
+        self.elementos = deque()
+        self.condicion = threading.Condition()
+        self.cerrada = False
+        self.descartados = 0
+    
+    def poner(self, elemento):
+        with self.condicion:
+            if len(self.elementos) >= self.maxsize:
+                self.elementos.popleft()
+                self.descartados += 1
+            self.elementos.append(elemento)
+            self.condicion.notify()
+    
+    def obtener(self, timeout=None):
+        """Devuelve el siguiente elemento; None si la cola se cerró y está vacía
+        
+        Con `timeout` (segundos) también devuelve None si en ese tiempo no
+        llegó ningún elemento; sin él espera hasta que llegue uno o se cierre.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self.condicion:
+            while not self.elementos:
+                if self.cerrada:
+                    return None
+                if limite is None:
+                    self.condicion.wait()
+                else:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        return None
+                    self.condicion.wait(restante)
+            return self.elementos.popleft()
+    
+    def obtener_sin_esperar(self):
+        """Devuelve el siguiente elemento o None si no hay ninguno disponible"""
+        with self.condicion:
+            return self.elementos.popleft() if self.elementos else None
+    
+    def cerrar(self):
+        with self.condicion:
+            self.cerrada = True
+            self.condicion.notify_all()
+    
+    def __len__(self):
+        return len(self.elementos)
+
+class EstadisticasLatencia:
+    """Latencias recientes de una etapa (ventana deslizante)"""
+    
+    def __init__(self, ventana=500):
+        self.muestras = deque(maxlen=ventana)
+        self.total = 0
+    
+    def registrar(self, segundos):
+        self.muestras.append(segundos)
+        self.total += 1
+    
+    def resumen(self):
+        if not self.muestras:
+            return {'n': self.total, 'media_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0}
+        
+        ms = np.array(self.muestras) * 1000
+        return {
+            'n': self.total,
+            'media_ms': float(np.mean(ms)),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p99_ms': float(np.percentile(ms, 99))
+        }
+
+class PipelineTiempoReal:
+    """Pipeline de tres hilos para ProbadorPeleas: captura -> inferencia -> escritor
+    
+    - Captura: decodifica cada frame directamente en el buffer circular del estado.
+    - Inferencia: detecta personas y calcula el score de cada frame.
+    - Escritor: máquina de estados de grabación y VideoWriter.
+    
+    Las etapas se conectan con colas acotadas que descartan el frame más
+    antiguo cuando se llenan; por las colas solo viajan índices del buffer.
+    La inferencia trabaja sobre una copia del frame (puede tardar más de lo
+    que el frame sigue en el buffer) y el escritor lee cada frame del buffer
+    con su lock. Los descartes solo reducen los frames inferidos: el
+    escritor graba todos los frames capturados desde el buffer. El hilo
+    principal solo muestra el último resultado disponible.
+    """
+    
+    ETAPAS = ('captura', 'inferencia', 'escritura', 'extremo_a_extremo')
+    
+    def __init__(self, probador, estado, fuente=0, frame_size=(640, 480),
+                 tam_cola_inferencia=2, tam_cola_escritura=16, margen_captura=32,
+                 mostrar=True, intervalo_reporte=10.0):
+        self.probador = probador
+        self.estado = estado
+        self.fuente = fuente
+        self.frame_size = frame_size
+        self.mostrar = mostrar
+        self.intervalo_reporte = intervalo_reporte
+        
+        self.cola_inferencia = ColaDescarte(tam_cola_inferencia, 'inferencia')
+        self.cola_escritura = ColaDescarte(tam_cola_escritura, 'escritura')
+        self.cola_visualizacion = ColaDescarte(1, 'visualizacion')
+        
+        # Un frame debe seguir en el buffer mientras está en alguna cola o en
+        # proceso, y también los capturados entre dos frames inferidos, que el
+        # escritor graba al llegar el siguiente resultado
+        self.estado.reservar_buffer(tam_cola_inferencia + tam_cola_escritura + margen_captura + 4)
+        
+        self.latencias = {etapa: EstadisticasLatencia() for etapa in self.ETAPAS}
+        self.frames_perdidos_inferencia = 0  # Sobrescritos antes de que la inferencia los tomara
+        self.detener = threading.Event()
+        self.hilos = []
+        
+        self.metricas = probador.metricas
+        self.metricas.registrar_proveedor(self.exportar_metricas)
+    
+    def _capturar(self, cap):
+        """Hilo de captura: lee frames lo más rápido que entrega la fuente"""
+        try:
+            while not self.detener.is_set():
+                inicio = time.perf_counter()
+                indice, _ = self.estado.buffer.capturar(cap, time.time())
+                if indice is None:
+                    print("❌ Fin de la fuente o error al leer frame")
+                    break
+                
+                segundos = time.perf_counter() - inicio
+                self.latencias['captura'].registrar(segundos)
+                self.metricas.observar_etapa('captura', segundos, camara=self.estado.etiqueta)
+                self.cola_inferencia.poner((indice, time.perf_counter()))
+        finally:
+            cap.release()
+            self.cola_inferencia.cerrar()
+    
+    def _inferir(self):
+        """Hilo de inferencia: personas + score de pelea"""
+        frame_anterior = None
+        try:
+            while True:
+                elemento = self.cola_inferencia.obtener()
+                if elemento is None:
+                    break
+                
+                indice, t_captura = elemento
+                # Copia propia: la captura puede reutilizar el hueco mientras se analiza
+                frame = self.estado.buffer.copiar(indice)
+                if frame is None:
+                    self.frames_perdidos_inferencia += 1
+                    continue
+                
+                inicio = time.perf_counter()
+                personas, score, es_pelea = self.probador.analizar_frame(frame, frame_anterior, self.estado)
+                self.latencias['inferencia'].registrar(time.perf_counter() - inicio)
+                
+                self.cola_escritura.poner((indice, score, es_pelea, t_captura))
+                if self.mostrar:
+                    self.cola_visualizacion.poner((frame, personas, score, es_pelea))
+                
+                frame_anterior = frame
+        finally:
+            self.cola_escritura.cerrar()
+            self.cola_visualizacion.cerrar()
+    
+    def _escribir(self):
+        """Hilo escritor: evidencia de video a partir del buffer circular"""
+        while True:
+            elemento = self.cola_escritura.obtener()
+            if elemento is None:
+                break
+            
+            indice, score, es_pelea, t_captura = elemento
+            inicio = time.perf_counter()
+            self.estado.registrar_inferencia(indice, es_pelea, score)
+            fin = time.perf_counter()
+            
+            self.latencias['escritura'].registrar(fin - inicio)
+            self.latencias['extremo_a_extremo'].registrar(fin - t_captura)
+            self.metricas.observar_etapa('escritura', fin - inicio, camara=self.estado.etiqueta)
+        
+        # La fuente terminó: grabar los últimos frames capturados y cerrar la evidencia pendiente
+        self.estado.completar_grabacion()
+        if self.estado.grabando:
+            self.estado.detener_grabacion_precisa()
+    
+    def exportar_metricas(self, metricas):
+        """Profundidad y descartes de las colas (proveedor de metricas.Metricas)"""
+        camara = self.estado.etiqueta
+        for cola in (self.cola_inferencia, self.cola_escritura, self.cola_visualizacion):
+            metricas.fijar('profundidad_cola', len(cola), camara=camara, cola=cola.nombre)
+            metricas.fijar_contador('frames_descartados', cola.descartados, camara=camara, cola=cola.nombre)
+    
+    def reporte(self):
+        """Latencia por etapa y frames descartados en cada cola"""
+        return {
+            'latencias': {etapa: stats.resumen() for etapa, stats in self.latencias.items()},
+            'descartados': {
+                cola.nombre: cola.descartados
+                for cola in (self.cola_inferencia, self.cola_escritura, self.cola_visualizacion)
+            },
+            'profundidad_colas': {
+                cola.nombre: len(cola)
+                for cola in (self.cola_inferencia, self.cola_escritura)
+            },
+            'frames_perdidos_buffer': self.estado.frames_perdidos,
+            'frames_perdidos_inferencia': self.frames_perdidos_inferencia,
+            'costos_caracteristicas_ms': self.estado.motor.resumen_costos(),
+            'compuerta': self.estado.compuerta.reporte()
+        }
+    
+    def imprimir_reporte(self):
+        reporte = self.reporte()
+        print("⏱️ Latencias por etapa (ms):")
+        for etapa, stats in reporte['latencias'].items():
+            print(f"  {etapa}: media {stats['media_ms']:.1f} | p50 {stats['p50_ms']:.1f} | "
+                  f"p99 {stats['p99_ms']:.1f} ({stats['n']} frames)")
+        print(f"🗑️ Descartados: {reporte['descartados']}")
+        print(f"🚪 Compuerta abierta en {100 * reporte['compuerta']['tasa_apertura']:.0f}% de los frames")
+    
+    def ejecutar(self):
+        """Arranca los hilos y muestra resultados hasta que se pulse 'q' o termine la fuente"""
+        cap = cv2.VideoCapture(self.fuente)
+        
+        if not cap.isOpened():
+            print(f"❌ Error: No se puede abrir la fuente {self.fuente}")
+            return None
+        
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_size[1])
+        
+        print("🎥 DETECTOR DE PELEAS ACTIVADO (pipeline)")
+        print(f"📹 Fuente: {self.fuente}")
+        print("Presiona 'q' para salir")
+        print("-" * 50)
+        
+        self.hilos = [
+            threading.Thread(target=self._capturar, args=(cap,), name='captura', daemon=True),
+            threading.Thread(target=self._inferir, name='inferencia', daemon=True),
+            threading.Thread(target=self._escribir, name='escritor', daemon=True)
+        ]
+        for hilo in self.hilos:
+            hilo.start()
+        
+        ultimo_reporte = time.time()
+        try:
+            while self.hilos[1].is_alive():
+                if self.mostrar:
+                    elemento = self.cola_visualizacion.obtener(timeout=0.1)
+                    if elemento is not None:
+                        frame, personas, score, es_pelea = elemento
+                        # Dibujar sobre una copia: la inferencia usa el frame como frame anterior
+                        vista = frame.copy()
+                        self.probador.dibujar_interfaz(vista, personas, score, es_pelea, self.estado)
+                        cv2.imshow('Detector de Peleas - Cámara en Vivo', vista)
+                    
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                else:
+                    self.hilos[1].join(timeout=0.5)
+                
+                if time.time() - ultimo_reporte >= self.intervalo_reporte:
+                    self.imprimir_reporte()
+                    ultimo_reporte = time.time()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.detener.set()
+            for hilo in self.hilos:
+                hilo.join()
+            if self.mostrar:
+                cv2.destroyAllWindows()
+        
+        self.imprimir_reporte()
+        return self.reporte()
@@ -1,72 +1,78 @@
+import argparse
 import cv2
-import numpy as np
-import pickle
-from ultralytics import YOLO
 import time
-import os
-from datetime import datetime
-from collections import deque
+import numpy as np
+from artefacto_modelo import cargar_modelo
+import detecciones
+from detector_personas import BACKENDS, crear_detector_personas
+from estado_camara import EstadoCamara
+from pipeline_tiempo_real import PipelineTiempoReal
+from multi_camara import ServidorMultiCamara
+from metricas import Metricas, SIN_METRICAS, ServidorMetricas, ReporteroJSON
 
 class ProbadorPeleas:
-    def __init__(self, modelo_path='detector_peleas_modelo.pkt'):
-        # Cargar modelo entrenado
-        with open(modelo_path, 'rb') as f:
-            self.modelo_data = pickle.load(f)
-        
-        # Cargar YOLO
-        self.yolo = YOLO('yolov8n.pt')
-        
-        # Parámetros del modelo entrenado (compatibilidad con ambos formatos)
-        if 'parametros' in self.modelo_data:
-            # Modelo simple
-            params = self.modelo_data['parametros']
-            self.motion_threshold = params['motion_threshold']
-            self.violence_threshold = params['violence_threshold']
-            self.usar_ml_avanzado = False
-        else:
-            # Modelo avanzado
-            params = self.modelo_data['parameters']
-            self.motion_threshold = params['motion_threshold']
-            self.violence_threshold = params['violence_threshold']
-            self.usar_ml_avanzado = True
-            self.modelo_ml = self.modelo_data['models']['ensemble']
-            self.scaler = self.modelo_data['models']['scaler']
-        
-        # Variables para grabación
-        self.grabando = False
-        self.video_writer = None
-        self.carpeta_actual = None
-        self.tiempo_inicio_pelea = None
-        self.frames_pelea = []
-        self.contador_deteccion = 0
-        
-        # Buffer circular para capturar momentos previos
-        self.buffer_frames = deque(maxlen=60)  # 3 segundos a 20fps
-        self.buffer_timestamps = deque(maxlen=60)
-        
-        # Control de grabación precisa
-        self.frames_post_pelea = 0
-        self.max_frames_post = 100  # 5 segundos después de que termine
-        self.pelea_activa = False
+    def __init__(self, modelo_path='detector_peleas_modelo', usar_compuerta=True, cada_k_frames=None,
+                 metricas=None, backend_detector=None, num_hilos=None):
+        # Cargar modelo entrenado: solo el manifiesto y, si hace falta, el estimador
+        # de inferencia (las estadísticas de entrenamiento no se cargan)
+        self.artefacto = cargar_modelo(modelo_path)
+        
+        # Parámetros del modelo entrenado (compatibilidad con ambos tipos)
+        params = self.artefacto.parametros
+        
+        # Detector de personas: el backend del entrenamiento salvo que se pida otro
+        self.backend_detector = backend_detector or params.get('person_detector_backend', 'ultralytics')
+        pesos = params.get('yolo_model', params.get('modelo_yolo', 'yolov8n.pt'))
+        self.detector = crear_detector_personas(self.backend_detector, pesos, num_hilos=num_hilos)
+        print(f"🧠 Detector de personas: {self.backend_detector}")
+        self.motion_threshold = params['motion_threshold']
+        self.violence_threshold = params['violence_threshold']
+        self.usar_ml_avanzado = self.artefacto.tipo == 'avanzado'
+        
+        # Detección y muestreo iguales a los del entrenamiento, para que el
+        # clasificador vea las mismas características que vio al entrenar
+        self.paso_muestreo = params.get('frame_sampling_stride', 3) if self.usar_ml_avanzado else 1
+        self.umbral_confianza = params.get('person_confidence_threshold', 0.4 if self.usar_ml_avanzado else 0.5)
+        
+        if self.usar_ml_avanzado:
+            inferencia = self.artefacto.inferencia()
+            self.modelo_ml = inferencia['ensemble']
+            self.scaler = inferencia['scaler']
+        
+        # Saltar YOLO y clasificador en frames sin movimiento
+        self.usar_compuerta = usar_compuerta
+        
+        # YOLO cada K frames (por defecto, los mismos frames en que se extraen
+        # características); en los intermedios el rastreador lleva las personas
+        self.cada_k_frames = cada_k_frames or self.paso_muestreo
+        
+        # Estado de grabación de la cámara principal (modo de una sola cámara)
+        self.estado = EstadoCamara(cada_k_frames=self.cada_k_frames)
+        
+        # Tiempos por etapa y contadores (sin métricas, todas las llamadas son vacías)
+        self.metricas = metricas or SIN_METRICAS
+        self.metricas.registrar_proveedor(self.estado.exportar_metricas)
         
     def detectar_personas(self, frame):
         """Detecta personas usando YOLO"""
-        results = self.yolo(frame, classes=[0], verbose=False)
-        personas = []
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    if box.conf[0] > 0.5:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        personas.append([int(x1), int(y1), int(x2), int(y2)])
-        return personas
+        return self.detectar_personas_lote([frame])[0]
+    
+    def detectar_personas_lote(self, frames):
+        """Detecta personas en varios frames (p. ej. uno por cámara) con una sola llamada a YOLO"""
+        return self.detector.detectar_lote(frames, self.umbral_confianza)
     
-    def calcular_score_pelea(self, frame, frame_anterior, personas):
+    def personas_rastreadas(self, frame, estado, personas_detectadas=None):
+        """Personas con ID del frame: detecta si toca o lleva las pistas hacia delante"""
+        if personas_detectadas is not None:
+            return estado.rastreador.actualizar(personas_detectadas)
+        if estado.rastreador.necesita_deteccion():
+            return estado.rastreador.actualizar(self.detectar_personas(frame))
+        return estado.rastreador.predecir()
+    
+    def calcular_score_pelea(self, frame, frame_anterior, personas, estado=None):
         """Calcula score de pelea basado en el modelo entrenado"""
         if self.usar_ml_avanzado:
-            return self.calcular_score_ml_avanzado(frame, frame_anterior, personas)
+            return self.calcular_score_ml_avanzado(frame, frame_anterior, personas, estado or self.estado)
         else:
             return self.calcular_score_basico(frame, frame_anterior, personas)
     
@@ -90,147 +96,82 @@ class ProbadorPeleas:
                 score += 0.4
         
         # Analizar proximidad entre personas
-        for i, p1 in enumerate(personas):
-            for j, p2 in enumerate(personas[i+1:], i+1):
-                x1_c = (p1[0] + p1[2]) // 2
-                y1_c = (p1[1] + p1[3]) // 2
-                x2_c = (p2[0] + p2[2]) // 2
-                y2_c = (p2[1] + p2[3]) // 2
-                
-                dist = np.sqrt((x1_c - x2_c)**2 + (y1_c - y2_c)**2)
-                if dist < 100:
-                    score += 0.3
+        if len(personas) >= 2:
+            distancias = detecciones.triangulo_superior(
+                detecciones.distancias_pares(detecciones.centros(personas))
+            )
+            score += 0.3 * np.count_nonzero(distancias < 100)
         
         return min(score, 1.0)
     
-    def calcular_score_ml_avanzado(self, frame, frame_anterior, personas):
-        """Método avanzado usando ML"""
+    def calcular_score_ml_avanzado(self, frame, frame_anterior, personas, estado):
+        """Método avanzado usando ML
+        
+        Usa el mismo extractor que el entrenamiento (las 30 características en
+        el mismo orden) con el estado de la cámara, y solo cada
+        `paso_muestreo` frames, que es el espaciado con el que se entrenó; en
+        los frames intermedios se mantiene el último score.
+        """
         try:
-            # Extraer características (versión simplificada)
-            caracteristicas = self.extraer_caracteristicas_simplificadas(frame, frame_anterior, personas)
-            
-            # Normalizar características
-            caracteristicas_norm = self.scaler.transform(caracteristicas.reshape(1, -1))
-            
-            # Predecir probabilidad
-            probabilidad = self.modelo_ml.predict_proba(caracteristicas_norm)[0][1]
+            if estado.frames_analizados % self.paso_muestreo == 0:
+                # Extraer características
+                inicio = time.perf_counter()
+                caracteristicas = estado.motor.extraer(frame, personas)
+                t = time.perf_counter()
+                self.metricas.observar_etapa('caracteristicas', t - inicio, camara=estado.etiqueta)
+                
+                # Normalizar características
+                caracteristicas_norm = self.scaler.transform(caracteristicas.reshape(1, -1))
+                
+                # Predecir probabilidad
+                estado.ultimo_score = self.modelo_ml.predict_proba(caracteristicas_norm)[0][1]
+                self.metricas.observar_etapa('clasificador', time.perf_counter() - t, camara=estado.etiqueta)
             
-            return probabilidad
+            estado.frames_analizados += 1
+            return estado.ultimo_score
         except Exception as e:
             print(f"Error en ML avanzado, usando método básico: {e}")
             return self.calcular_score_basico(frame, frame_anterior, personas)
     
-    def extraer_caracteristicas_simplificadas(self, frame, frame_anterior, personas):
-        """Extrae características básicas para el modelo ML"""
-        # Inicializar array de características (30 dimensiones)
-        features = np.zeros(30)
-        
-        if frame_anterior is not None:
-            # Características de movimiento básicas
-            gray1 = cv2.cvtColor(frame_anterior, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            diff = cv2.absdiff(gray1, gray2)
-            _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-            movimiento = np.sum(thresh) / (thresh.shape[0] * thresh.shape[1])
-            
-            # Gradientes
-            grad_x = cv2.Sobel(diff, cv2.CV_64F, 1, 0, ksize=3)
-            grad_y = cv2.Sobel(diff, cv2.CV_64F, 0, 1, ksize=3)
-            grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)
-            avg_gradient = np.mean(grad_magnitude)
-            
-            features[0:4] = [movimiento, avg_gradient, 0, 0]  # Características de movimiento
-        
-        # Características de interacción
-        if len(personas) >= 2:
-            distancias = []
-            for i, p1 in enumerate(personas):
-                for j, p2 in enumerate(personas[i+1:], i+1):
-                    x1_c = (p1[0] + p1[2]) // 2
-                    y1_c = (p1[1] + p1[3]) // 2
-                    x2_c = (p2[0] + p2[2]) // 2
-                    y2_c = (p2[1] + p2[3]) // 2
-                    
-                    dist = np.sqrt((x1_c - x2_c)**2 + (y1_c - y2_c)**2)
-                    distancias.append(dist)
-            
-            features[8] = np.min(distancias) if distancias else 0
-            features[9] = np.mean(distancias) if distancias else 0
-        
-        features[19] = len(personas)  # Número de personas
-        
-        return features
+    def compuerta_abierta(self, frame, estado):
+        """True si el frame debe pasar por YOLO y el clasificador"""
+        return not self.usar_compuerta or estado.compuerta.evaluar(frame)
+    
+    def analizar_frame(self, frame, frame_anterior, estado=None):
+        """Detecta personas y calcula el score de pelea de un frame"""
+        estado = estado or self.estado
+        camara = estado.etiqueta
+        inicio = time.perf_counter()
+        self.metricas.incrementar('frames_procesados', camara=camara)
+        if not self.compuerta_abierta(frame, estado):
+            # Escena estática: se reutiliza el último resultado sin pasar por YOLO
+            self.metricas.incrementar('frames_estaticos', camara=camara)
+            self.metricas.observar_etapa('compuerta', time.perf_counter() - inicio, camara=camara)
+            return estado.ultimo_analisis
+        
+        t = time.perf_counter()
+        self.metricas.observar_etapa('compuerta', t - inicio, camara=camara)
+        personas = self.personas_rastreadas(frame, estado)
+        self.metricas.observar_etapa('deteccion', time.perf_counter() - t, camara=camara)
+        
+        score, es_pelea_detectada = self.analizar_personas(frame, frame_anterior, personas, estado)
+        self.metricas.observar_latencia(time.perf_counter() - inicio, camara=camara)
+        return personas, score, es_pelea_detectada
     
-    def crear_carpeta_evidencia(self):
-        """Crea carpeta con fecha y hora para guardar evidencias"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        carpeta = f"Pelea_Detectada_{timestamp}"
+    def analizar_personas(self, frame, frame_anterior, personas, estado=None):
+        """Calcula el score de pelea de un frame cuyas personas ya se detectaron"""
+        estado = estado or self.estado
+        score = self.calcular_score_pelea(frame, frame_anterior, personas, estado)
         
-        if not os.path.exists(carpeta):
-            os.makedirs(carpeta)
-            print(f"📁 Carpeta creada: {carpeta}")
+        # Lógica mejorada de detección de pelea
+        es_pelea_detectada = score > 0.6 and len(personas) >= 2
         
-        return carpeta
+        estado.ultimo_analisis = (personas, score, es_pelea_detectada)
+        return score, es_pelea_detectada
     
-    def iniciar_grabacion_precisa(self, frame_size):
-        """Inicia la grabación precisa del momento de la pelea"""
-        if not self.grabando:
-            self.carpeta_actual = self.crear_carpeta_evidencia()
-            self.tiempo_inicio_pelea = datetime.now()
-            
-            # Configurar video writer
-            video_path = os.path.join(self.carpeta_actual, "evidencia_pelea.mp4")
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            self.video_writer = cv2.VideoWriter(video_path, fourcc, 20.0, frame_size)
-            
-            self.grabando = True
-            self.pelea_activa = True
-            self.frames_post_pelea = 0
-            
-            # Escribir frames previos del buffer
-            print(f"🔴 GRABANDO PELEA - {self.tiempo_inicio_pelea.strftime('%H:%M:%S')}")
-            print(f"📼 Incluyendo {len(self.buffer_frames)} frames previos...")
-            
-            for frame_previo in self.buffer_frames:
-                self.video_writer.write(frame_previo)
-            
-            self.frames_pelea = list(self.buffer_frames)  # Copiar frames previos
-    
-    def detener_grabacion_precisa(self):
-        """Detiene la grabación cuando ya no hay pelea"""
-        if self.grabando and self.video_writer:
-            self.video_writer.release()
-            self.grabando = False
-            self.pelea_activa = False
-            
-            # Guardar fotos clave de la pelea
-            self.guardar_fotos_evidencia()
-            
-            duracion = datetime.now() - self.tiempo_inicio_pelea
-            print(f"⏹️ GRABACIÓN COMPLETADA - Duración: {duracion.seconds}s")
-            print(f"📊 Total frames: {len(self.frames_pelea)}")
-            print(f"💾 Evidencias guardadas en: {self.carpeta_actual}")
-            
-            self.video_writer = None
-            self.frames_pelea = []
-            self.frames_post_pelea = 0
-    
-    def guardar_fotos_evidencia(self):
-        """Guarda fotos clave durante la pelea"""
-        if len(self.frames_pelea) > 0:
-            # Guardar cada 10 frames para no saturar
-            frames_a_guardar = self.frames_pelea[::10]
-            
-            for i, frame in enumerate(frames_a_guardar):
-                foto_path = os.path.join(self.carpeta_actual, f"evidencia_{i+1:03d}.jpg")
-                cv2.imwrite(foto_path, frame)
-            
-            print(f"📸 {len(frames_a_guardar)} fotos guardadas como evidencia")
-    
-    def procesar_camara_tiempo_real(self):
+    def procesar_camara_tiempo_real(self, fuente=0):
         """Procesa cámara en tiempo real con detección y grabación automática"""
-        cap = cv2.VideoCapture(0)  # Cámara principal
+        cap = cv2.VideoCapture(fuente)  # Cámara principal por defecto
         
         if not cap.isOpened():
             print("❌ Error: No se puede acceder a la cámara")
@@ -239,7 +180,6 @@ class ProbadorPeleas:
         # Configurar resolución
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        frame_size = (640, 480)
         
         print("🎥 DETECTOR DE PELEAS ACTIVADO")
         print("📹 Usando cámara en tiempo real")
@@ -249,96 +189,94 @@ class ProbadorPeleas:
         frame_anterior = None
         
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            # Decodificar directamente en el buffer circular (sin copias)
+            inicio = time.perf_counter()
+            indice, frame = self.estado.buffer.capturar(cap, time.time())
+            if indice is None:
                 print("❌ Error al leer frame de la cámara")
                 break
+            self.metricas.observar_etapa('captura', time.perf_counter() - inicio, camara=self.estado.etiqueta)
             
-            # Agregar frame al buffer circular (siempre)
-            self.buffer_frames.append(frame.copy())
-            self.buffer_timestamps.append(time.time())
+            # Detectar personas y calcular score de pelea
+            personas, score, es_pelea_detectada = self.analizar_frame(frame, frame_anterior)
             
-            # Detectar personas
-            personas = self.detectar_personas(frame)
+            # Grabación de evidencia a partir del buffer
+            inicio = time.perf_counter()
+            self.estado.actualizar_grabacion(indice, es_pelea_detectada, score)
+            self.metricas.observar_etapa('escritura', time.perf_counter() - inicio, camara=self.estado.etiqueta)
             
-            # Calcular score de pelea
-            score = self.calcular_score_pelea(frame, frame_anterior, personas)
+            # El frame sigue en el buffer: basta con la vista
+            frame_anterior = frame
             
-            # Lógica mejorada de detección de pelea
-            es_pelea_detectada = score > 0.6 and len(personas) >= 2
-            
-            if es_pelea_detectada:
-                self.contador_deteccion += 1
-                
-                # Iniciar grabación si detecta pelea por 2 frames consecutivos
-                if self.contador_deteccion >= 2 and not self.grabando:
-                    self.iniciar_grabacion_precisa(frame_size)
-                
-                # Si está grabando, continuar grabando
-                if self.grabando:
-                    self.video_writer.write(frame)
-                    self.frames_pelea.append(frame.copy())
-                    self.frames_post_pelea = 0  # Resetear contador post-pelea
-                    
-                # Alerta visual de pelea
-                cv2.putText(frame, "¡PELEA DETECTADA!", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                
-            else:
-                # No hay pelea detectada
-                self.contador_deteccion = max(0, self.contador_deteccion - 1)
-                
-                # Si estaba grabando una pelea, continuar por algunos frames más
-                if self.grabando and self.pelea_activa:
-                    self.frames_post_pelea += 1
-                    
-                    # Continuar grabando frames post-pelea
-                    self.video_writer.write(frame)
-                    self.frames_pelea.append(frame.copy())
-                    
-                    # Detener grabación después de suficientes frames post-pelea
-                    if self.frames_post_pelea >= self.max_frames_post:
-                        self.detener_grabacion_precisa()
-                    
-                    # Mostrar que está en modo post-pelea
-                    cv2.putText(frame, f"Post-pelea: {self.frames_post_pelea}/{self.max_frames_post}", 
-                               (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 165, 0), 1)
-            
-            # Visualización
-            self.dibujar_interfaz(frame, personas, score)
+            # Visualización sobre una copia para no ensuciar la evidencia
+            vista = frame.copy()
+            self.dibujar_interfaz(vista, personas, score, es_pelea_detectada)
             
             # Mostrar frame
-            cv2.imshow('Detector de Peleas - Cámara en Vivo', frame)
+            cv2.imshow('Detector de Peleas - Cámara en Vivo', vista)
             
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
-            
-            frame_anterior = frame.copy()
         
         # Limpiar al salir
-        if self.grabando:
-            self.detener_grabacion_precisa()
+        if self.estado.grabando:
+            self.estado.detener_grabacion_precisa()
+        
+        if self.usar_compuerta:
+            print(f"🚪 Compuerta de movimiento: {100 * self.estado.compuerta.tasa_apertura():.0f}% "
+                  f"de los frames analizados")
+        
+        if self.usar_ml_avanzado:
+            costos = self.estado.motor.resumen_costos()
+            print(f"⏱️ Características: {costos['total']:.1f} ms por frame analizado "
+                  f"(1 de cada {self.paso_muestreo})")
         
         cap.release()
         cv2.destroyAllWindows()
     
-    def dibujar_interfaz(self, frame, personas, score):
+    def procesar_camara_pipeline(self, fuente=0, **opciones):
+        """Procesa la cámara con captura, inferencia y escritura en hilos separados"""
+        pipeline = PipelineTiempoReal(self, self.estado, fuente=fuente, **opciones)
+        return pipeline.ejecutar()
+    
+    def procesar_multiples_camaras(self, fuentes, **opciones):
+        """Procesa varias cámaras compartiendo YOLO y clasificador en un solo proceso"""
+        servidor = ServidorMultiCamara(self, fuentes, **opciones)
+        return servidor.ejecutar()
+    
+    def dibujar_interfaz(self, frame, personas, score, es_pelea_detectada=False, estado=None):
         """Dibuja la interfaz de usuario en el frame"""
+        if estado is None:
+            estado = self.estado
+        
+        # Alerta visual de pelea
+        if es_pelea_detectada:
+            cv2.putText(frame, "¡PELEA DETECTADA!", (10, 30), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        elif estado.grabando and estado.pelea_activa:
+            # Mostrar que está en modo post-pelea
+            cv2.putText(frame, f"Post-pelea: {estado.frames_post_pelea}/{estado.max_frames_post}", 
+                       (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 165, 0), 1)
+        
         # Dibujar personas detectadas
         for bbox in personas:
             color = (0, 0, 255) if score > 0.6 else (0, 255, 0)
-            cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
+            x1, y1, x2, y2 = bbox[:4].astype(int)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            if detecciones.tiene_ids(personas):
+                cv2.putText(frame, f"ID {int(bbox[detecciones.ID])}", (x1, max(y1 - 5, 10)),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
         
         # Indicador de estado (círculo)
         if score > 0.6:
             cv2.circle(frame, (30, 30), 20, (0, 0, 255), -1)  # Rojo = Pelea
-            estado = "PELIGRO"
+            texto_estado = "PELIGRO"
         else:
             cv2.circle(frame, (30, 30), 20, (0, 255, 0), -1)  # Verde = Normal
-            estado = "NORMAL"
+            texto_estado = "NORMAL"
         
         # Información en pantalla
-        cv2.putText(frame, f"Estado: {estado}", (60, 35), 
+        cv2.putText(frame, f"Estado: {texto_estado}", (60, 35), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
         
         cv2.putText(frame, f"Personas: {len(personas)}", (10, 460), 
@@ -348,12 +286,12 @@ class ProbadorPeleas:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
         # Información del buffer
-        cv2.putText(frame, f"Buffer: {len(self.buffer_frames)}/60", (300, 460), 
+        cv2.putText(frame, f"Buffer: {min(len(estado.buffer), estado.frames_previos)}/{estado.frames_previos}", (300, 460), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
         # Indicador de grabación con más detalles
-        if self.grabando:
-            if self.pelea_activa:
+        if estado.grabando:
+            if estado.pelea_activa:
                 cv2.putText(frame, "🔴 GRABANDO PELEA", (450, 30), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
             else:
@@ -361,30 +299,72 @@ class ProbadorPeleas:
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
             
             # Mostrar contador de frames grabados
-            cv2.putText(frame, f"Frames: {len(self.frames_pelea)}", (450, 460), 
+            cv2.putText(frame, f"Frames: {estado.sumidero.frames_escritos}", (450, 460), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         
         # Mostrar contador de detección
-        if self.contador_deteccion > 0:
-            cv2.putText(frame, f"Detección: {self.contador_deteccion}/2", (10, 90), 
+        if estado.contador_deteccion > 0:
+            cv2.putText(frame, f"Detección: {estado.contador_deteccion}/2", (10, 90), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
 
 def main():
     """Función principal para usar cámara en tiempo real"""
+    parser = argparse.ArgumentParser(description='Detector de peleas en tiempo real')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Captura, inferencia y escritura en hilos separados')
+    parser.add_argument('--modelo', default='detector_peleas_modelo',
+                        help='Directorio del artefacto del modelo (o un .pkt antiguo)')
+    parser.add_argument('--sin-compuerta', action='store_true',
+                        help='Analizar todos los frames, también los estáticos')
+    parser.add_argument('--cada-k', type=int, default=None,
+                        help='Correr YOLO cada K frames y rastrear en los intermedios '
+                             '(por defecto, el paso de muestreo del modelo)')
+    parser.add_argument('--detector', choices=BACKENDS, default=None,
+                        help='Backend del detector de personas (por defecto, el del modelo)')
+    parser.add_argument('--fuente', nargs='+', default=['0'],
+                        help='Índices de cámara, archivos de video o URLs RTSP; '
+                             'con varias fuentes se usa el modo multicámara')
+    parser.add_argument('--metricas-puerto', type=int, default=None,
+                        help='Servir métricas Prometheus en http://host:PUERTO/metrics')
+    parser.add_argument('--metricas-json', default=None,
+                        help="Escribir una línea JSON de métricas periódicamente en este archivo ('-' = consola)")
+    parser.add_argument('--metricas-intervalo', type=float, default=10.0,
+                        help='Segundos entre líneas JSON de métricas')
+    args = parser.parse_args()
+    fuentes = [int(fuente) if fuente.isdigit() else fuente for fuente in args.fuente]
+    
+    # Sin ninguna salida de métricas la instrumentación queda desactivada
+    metricas = Metricas() if args.metricas_puerto is not None or args.metricas_json else None
+    exportadores = []
+    
     try:
-        probador = ProbadorPeleas()
+        probador = ProbadorPeleas(args.modelo, usar_compuerta=not args.sin_compuerta,
+                                  cada_k_frames=args.cada_k, metricas=metricas, backend_detector=args.detector)
+        
+        if args.metricas_puerto is not None:
+            exportadores.append(ServidorMetricas(metricas, args.metricas_puerto).iniciar())
+        if args.metricas_json:
+            exportadores.append(ReporteroJSON(metricas, args.metricas_json, args.metricas_intervalo).iniciar())
         
         print("🛡️  SISTEMA DE DETECCIÓN DE PELEAS ACTIVO")
         print("=" * 50)
         
-        # Usar cámara en tiempo real
-        probador.procesar_camara_tiempo_real()
+        if len(fuentes) > 1:
+            probador.procesar_multiples_camaras(fuentes)
+        elif args.pipeline:
+            probador.procesar_camara_pipeline(fuentes[0])
+        else:
+            # Usar cámara en tiempo real
+            probador.procesar_camara_tiempo_real(fuentes[0])
         
     except FileNotFoundError:
-        print("❌ ERROR: No se encontró 'detector_peleas_modelo.pkt'")
+        print(f"❌ ERROR: No se encontró el modelo '{args.modelo}'")
         print("➡️  Ejecuta primero 'entrenar_detector_peleas.py'")
     except Exception as e:
         print(f"❌ Error: {e}")
+    finally:
+        for exportador in exportadores:
+            exportador.detener()
 
 if __name__ == "__main__":
     main()
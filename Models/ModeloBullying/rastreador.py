@@ -0,0 +1,119 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+import detecciones
+
+class Pista:
+    """Una persona seguida entre frames"""
+    
+    def __init__(self, id_pista, fila):
+        self.id = id_pista
+        self.caja = fila[detecciones.X1:detecciones.Y2 + 1].astype(np.float64)
+        self.velocidad = np.zeros(4)  # Píxeles por frame de cada coordenada de la caja
+        self.conf = float(fila[detecciones.CONF])
+        self.aciertos = 1
+        self.rondas_perdida = 0  # Rondas de detección seguidas sin emparejar
+        self.frames_desde_deteccion = 0
+    
+    def predecir(self, frames=1):
+        """Caja esperada dentro de `frames` frames (velocidad constante)"""
+        return self.caja + self.velocidad * (self.frames_desde_deteccion + frames)
+    
+    def actualizar(self, fila, suavizado):
+        caja = fila[detecciones.X1:detecciones.Y2 + 1].astype(np.float64)
+        frames = self.frames_desde_deteccion + 1
+        velocidad = (caja - self.caja) / frames
+        self.velocidad = suavizado * velocidad + (1 - suavizado) * self.velocidad
+        self.caja = caja
+        self.conf = float(fila[detecciones.CONF])
+        self.aciertos += 1
+        self.rondas_perdida = 0
+        self.frames_desde_deteccion = 0
+
+class RastreadorPersonas:
+    """Rastreador tipo SORT con IDs persistentes para el arreglo de personas
+    
+    Empareja detecciones y pistas por IoU con asignación húngara
+    (linear_sum_assignment) sobre las cajas predichas con un modelo de
+    velocidad constante suavizado. Devuelve el arreglo de personas con una
+    columna extra de ID (detecciones.ID), así las velocidades entre frames
+    se calculan siempre para la misma persona.
+    
+    Con `cada_k_frames` > 1 el detector solo hace falta cada K frames
+    (ver `necesita_deteccion`); en los intermedios `predecir` lleva las
+    pistas hacia delante sin YOLO.
+    """
+    
+    def __init__(self, max_edad=30, min_aciertos=3, umbral_iou=0.3, cada_k_frames=1, suavizado=0.5):
+        self.max_edad = max_edad          # Rondas de detección que sobrevive una pista sin verse
+        self.min_aciertos = min_aciertos  # Detecciones necesarias para confirmar una pista
+        self.umbral_iou = umbral_iou
+        self.cada_k_frames = cada_k_frames
+        self.suavizado = suavizado
+        self.pistas = []
+        self.siguiente_id = 1
+        self.rondas = 0
+        self.frames_sin_detectar = 0
+    
+    def reiniciar(self):
+        self.pistas = []
+        self.rondas = 0
+        self.frames_sin_detectar = 0
+    
+    def necesita_deteccion(self):
+        """True si en este frame hay que correr el detector completo"""
+        return self.frames_sin_detectar % self.cada_k_frames == 0
+    
+    def actualizar(self, personas):
+        """Incorpora las detecciones del frame y devuelve las personas con ID"""
+        self.rondas += 1
+        self.frames_sin_detectar = 1
+        
+        emparejadas = set()
+        pistas_emparejadas = set()
+        if self.pistas and len(personas):
+            predichas = detecciones.construir_personas(
+                np.array([pista.predecir() for pista in self.pistas]),
+                np.zeros(len(self.pistas))
+            )
+            iou = detecciones.iou_entre(predichas, personas)
+            filas, columnas = linear_sum_assignment(-iou)
+            
+            for i, j in zip(filas, columnas):
+                if iou[i, j] >= self.umbral_iou:
+                    self.pistas[i].actualizar(personas[j], self.suavizado)
+                    pistas_emparejadas.add(i)
+                    emparejadas.add(j)
+        
+        for i, pista in enumerate(self.pistas):
+            if i not in pistas_emparejadas:
+                pista.rondas_perdida += 1
+                pista.frames_desde_deteccion += 1
+        
+        for j in range(len(personas)):
+            if j not in emparejadas:
+                self.pistas.append(Pista(self.siguiente_id, personas[j]))
+                self.siguiente_id += 1
+        
+        self.pistas = [pista for pista in self.pistas if pista.rondas_perdida <= self.max_edad]
+        
+        visibles = [pista for pista in self.pistas if self._visible(pista)]
+        return self._arreglo(visibles, [pista.caja for pista in visibles])
+    
+    def predecir(self):
+        """Lleva las pistas un frame hacia delante sin detector"""
+        self.frames_sin_detectar += 1
+        for pista in self.pistas:
+            pista.frames_desde_deteccion += 1
+        
+        visibles = [pista for pista in self.pistas if self._visible(pista)]
+        return self._arreglo(visibles, [pista.predecir(0) for pista in visibles])
+    
+    def _visible(self, pista):
+        """Como SORT: vista en la última ronda y confirmada (o al inicio del video)"""
+        return pista.rondas_perdida == 0 and (pista.aciertos >= self.min_aciertos or self.rondas <= self.min_aciertos)
+    
+    def _arreglo(self, pistas, cajas):
+        if not pistas:
+            return detecciones.con_ids(detecciones.personas_vacias(), [])
+        personas = detecciones.construir_personas(np.array(cajas), [pista.conf for pista in pistas])
+        return detecciones.con_ids(personas, [pista.id for pista in pistas])
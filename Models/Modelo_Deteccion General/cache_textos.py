@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from datos_textos import RUTA_DATOS, cargar_corpus
+
+# Subir si cambia el formato de las entradas o la forma de tokenizar
+VERSION_CACHE = 1
+
+ARCHIVOS_CORPUS = ('normal.txt', 'ofensivo.txt')
+
+class CorpusTokenizado:
+    """Corpus tokenizado en arreglos planos mapeados en memoria
+
+    Los tokens de todos los textos van seguidos en `tokens` (int32) y el texto
+    i ocupa tokens[offsets[i]:offsets[i + 1]]. Los arreglos se abren con
+    mmap copy-on-write: cortar un texto no copia nada y el sistema comparte
+    las páginas entre procesos (workers del DataLoader, evaluaciones).
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.tokens = np.load(os.path.join(directorio, 'tokens.npy'), mmap_mode='c')
+        self.offsets = np.load(os.path.join(directorio, 'offsets.npy'), mmap_mode='c')
+        self.etiquetas = np.load(os.path.join(directorio, 'etiquetas.npy'), mmap_mode='c')
+        with open(os.path.join(directorio, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.longitudes = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.etiquetas)
+
+    def input_ids(self, idx):
+        return self.tokens[self.offsets[idx]:self.offsets[idx + 1]]
+
+class TextoDatasetTokenizado(Dataset):
+    """TextoDataset sobre un CorpusTokenizado (todo o un subconjunto de índices)
+
+    Devuelve vistas de los arreglos mapeados, sin tokenizar ni copiar; se usa
+    igual que TextoDataset con LotesPorLongitud y RellenoDinamico.
+    """
+
+    def __init__(self, corpus, indices=None):
+        self.corpus = corpus
+        self.indices = np.arange(len(corpus)) if indices is None else np.asarray(indices)
+        self.longitudes = corpus.longitudes[self.indices].tolist()
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        i = self.indices[idx]
+        return {
+            'input_ids': torch.from_numpy(self.corpus.input_ids(i)),
+            'labels': torch.tensor(int(self.corpus.etiquetas[i]), dtype=torch.long)
+        }
+
+def hash_corpus(directorio_datos=RUTA_DATOS, archivos=ARCHIVOS_CORPUS):
+    """SHA-256 del contenido de los archivos del corpus"""
+    sha = hashlib.sha256()
+    for nombre in archivos:
+        sha.update(nombre.encode('utf-8') + b'\0')
+        with open(os.path.join(directorio_datos, nombre), 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloque)
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+def hash_vocabulario(tokenizer):
+    """SHA-256 del vocabulario y de las opciones que cambian la tokenización"""
+    datos = {
+        'clase': type(tokenizer).__name__,
+        'vocab': sorted(tokenizer.get_vocab().items()),
+        'minusculas': getattr(tokenizer, 'do_lower_case', None),
+        'especiales': tokenizer.all_special_tokens
+    }
+    return hashlib.sha256(json.dumps(datos, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class CacheTextos:
+    """Caché en disco del corpus de textos ya tokenizado
+
+    Cada entrada es un directorio con tokens.npy, offsets.npy, etiquetas.npy
+    y meta.json, identificado por el hash del corpus, el del vocabulario del
+    tokenizador y max_length. Si cualquiera cambia se tokeniza de nuevo y la
+    entrada vieja del mismo corpus se borra.
+    """
+
+    def __init__(self, directorio='cache_textos'):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _prefijo(self, directorio_datos):
+        """Prefijo común a todas las entradas de un mismo directorio de datos"""
+        ruta_absoluta = os.path.abspath(directorio_datos)
+        return f"corpus-{hashlib.sha1(ruta_absoluta.encode('utf-8')).hexdigest()[:8]}"
+
+    def clave(self, directorio_datos, tokenizer, max_length):
+        datos = {
+            'corpus': hash_corpus(directorio_datos),
+            'vocabulario': hash_vocabulario(tokenizer),
+            'max_length': max_length,
+            'version': VERSION_CACHE
+        }
+        return hashlib.sha256(json.dumps(datos, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def cargar(self, tokenizer, directorio_datos=RUTA_DATOS, max_length=512):
+        """Devuelve el CorpusTokenizado, tokenizando el corpus solo si no hay entrada válida"""
+        clave = self.clave(directorio_datos, tokenizer, max_length)
+        ruta = os.path.join(self.directorio, f"{self._prefijo(directorio_datos)}.{clave}")
+
+        if os.path.exists(os.path.join(ruta, 'meta.json')):
+            try:
+                return CorpusTokenizado(ruta)
+            except (OSError, ValueError):
+                # Entrada corrupta: se regenera
+                shutil.rmtree(ruta, ignore_errors=True)
+
+        textos, etiquetas = cargar_corpus(directorio_datos)
+        print(f"🔤 Tokenizando {len(textos)} textos para la caché ({clave})")
+        self._guardar(ruta, textos, etiquetas, tokenizer, max_length)
+        self._limpiar(directorio_datos, clave)
+        return CorpusTokenizado(ruta)
+
+    def _guardar(self, ruta, textos, etiquetas, tokenizer, max_length, tamano_bloque=4096):
+        partes = []
+        longitudes = np.empty(len(textos), dtype=np.int64)
+        for inicio in range(0, len(textos), tamano_bloque):
+            bloque = tokenizer(textos[inicio:inicio + tamano_bloque], truncation=True, max_length=max_length)['input_ids']
+            for i, ids in enumerate(bloque):
+                longitudes[inicio + i] = len(ids)
+                partes.append(np.asarray(ids, dtype=np.int32))
+
+        offsets = np.zeros(len(textos) + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=offsets[1:])
+        # int32 mientras el corpus quepa (más de 2^31 tokens necesita int64)
+        if offsets[-1] <= np.iinfo(np.int32).max:
+            offsets = offsets.astype(np.int32)
+        tokens = np.concatenate(partes) if partes else np.empty(0, dtype=np.int32)
+
+        # Escribir en un directorio temporal y renombrarlo al terminar
+        temporal = ruta + '.tmp'
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        np.save(os.path.join(temporal, 'tokens.npy'), tokens)
+        np.save(os.path.join(temporal, 'offsets.npy'), offsets)
+        np.save(os.path.join(temporal, 'etiquetas.npy'), np.asarray(etiquetas, dtype=np.int8))
+        with open(os.path.join(temporal, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'textos': len(textos), 'tokens': int(offsets[-1]), 'max_length': max_length,
+                       'version': VERSION_CACHE}, f, indent=2)
+        shutil.rmtree(ruta, ignore_errors=True)
+        os.replace(temporal, ruta)
+
+    def _limpiar(self, directorio_datos, clave):
+        """Elimina las entradas obsoletas del mismo corpus"""
+        prefijo = self._prefijo(directorio_datos) + '.'
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith(prefijo) and nombre != prefijo + clave:
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
@@ -0,0 +1,431 @@
+import argparse
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter, deque
+from concurrent.futures import Future
+import numpy as np
+from scipy.sparse import hstack
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from casos_prueba_textos import todos_los_casos
+from datos_textos import RUTA_DATOS, cargar_corpus
+
+# Léxico base (insultos, grupos y generalizaciones) que se suma a las palabras minadas
+RUTA_TERMINOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'terminos_textos.txt')
+
+# umbral_normal de los prefiltros que no se calibraron (ver PrefiltroTextos.calibrar_umbral_normal)
+UMBRAL_NORMAL_DEFECTO = 0.15
+
+# Palabras funcionales que abundan en los insultos ("esa chica...", "eres un...") pero no los delatan
+PALABRAS_VACIAS = {
+    'ese', 'esa', 'eso', 'esos', 'esas', 'este', 'esta', 'esto', 'estos', 'estas', 'aquel', 'aquella',
+    'eres', 'es', 'son', 'ser', 'tan', 'muy', 'mas', 'que', 'con', 'sin', 'por', 'para', 'del', 'los', 'las',
+    'una', 'uno', 'unos', 'unas', 'tu', 'tus', 'te', 'ti', 'el', 'ella', 'ellos', 'ellas', 'nunca', 'siempre'
+}
+
+# Palabras corrientes en el aula (órdenes, partes del cuerpo, lugares, verbos comunes) que en el corpus
+# solo aparecen en los ofensivos por cómo están redactados, pero que por sí solas no delatan nada
+PALABRAS_GENERICAS = {
+    'mira', 'deja', 'calla', 'callese', 'callate', 'oye', 'vete', 'aparta', 'aprende', 'recoge', 'trae',
+    'traeme', 'acerques', 'metas', 'hablar', 'habla', 'sabe', 'sabes', 'cree', 'crees', 'parece', 'entiende',
+    'entienden', 'puede', 'puedes', 'falta', 'indica', 'revela', 'deberia', 'estar', 'cara', 'mano', 'boca',
+    'salon', 'clase', 'patio', 'grupo', 'libros', 'idea', 'nada', 'nadie', 'solo', 'todo', 'todos', 'aqui', 'mis',
+    'forma'
+}
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para que 'Cállate' y 'callate' coincidan"""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+def palabras(texto):
+    return ''.join(c if c.isalnum() else ' ' for c in normalizar(texto)).split()
+
+class BuscadorTerminos:
+    """Autómata de Aho-Corasick: encuentra todos los términos en una sola pasada por el texto
+
+    Los términos (palabras o frases) se normalizan igual que el texto y solo
+    cuentan si aparecen como palabras completas.
+    """
+
+    def __init__(self, terminos):
+        self.terminos = sorted({normalizar(t).strip() for t in terminos if t.strip()})
+        self.transiciones = [{}]
+        self.fallo = [0]
+        self.salidas = [[]]
+
+        for termino in self.terminos:
+            estado = 0
+            for c in termino:
+                if c not in self.transiciones[estado]:
+                    self.transiciones.append({})
+                    self.fallo.append(0)
+                    self.salidas.append([])
+                    self.transiciones[estado][c] = len(self.transiciones) - 1
+                estado = self.transiciones[estado][c]
+            self.salidas[estado].append(termino)
+
+        # Enlaces de fallo por niveles (BFS)
+        cola = deque(self.transiciones[0].values())
+        while cola:
+            estado = cola.popleft()
+            for c, siguiente in self.transiciones[estado].items():
+                cola.append(siguiente)
+                f = self.fallo[estado]
+                while f and c not in self.transiciones[f]:
+                    f = self.fallo[f]
+                self.fallo[siguiente] = self.transiciones[f].get(c, 0)
+                self.salidas[siguiente] = self.salidas[siguiente] + self.salidas[self.fallo[siguiente]]
+
+    def buscar(self, texto):
+        """Términos presentes en el texto (sin repetir, en orden de aparición)"""
+        texto = normalizar(texto)
+        encontrados = []
+        estado = 0
+        for i, c in enumerate(texto):
+            while estado and c not in self.transiciones[estado]:
+                estado = self.fallo[estado]
+            estado = self.transiciones[estado].get(c, 0)
+            for termino in self.salidas[estado]:
+                inicio = i - len(termino) + 1
+                if (inicio == 0 or not texto[inicio - 1].isalnum()) and (i + 1 == len(texto) or not texto[i + 1].isalnum()):
+                    if termino not in encontrados:
+                        encontrados.append(termino)
+        return encontrados
+
+def minar_terminos(textos_ofensivos, textos_normales, min_apariciones=2, razon_minima=5.0, longitud_minima=3):
+    """Palabras mucho más frecuentes en los textos ofensivos que en los normales
+
+    Compara en cuántos textos de cada clase aparece cada palabra (con
+    suavizado de Laplace) y se queda con las que aparecen al menos
+    `min_apariciones` veces en ofensivos y son `razon_minima` veces más
+    probables allí que en los normales (sin contar PALABRAS_VACIAS ni
+    PALABRAS_GENERICAS).
+    """
+    df_ofensivo = Counter(p for texto in textos_ofensivos for p in set(palabras(texto)))
+    df_normal = Counter(p for texto in textos_normales for p in set(palabras(texto)))
+    n_ofensivo, n_normal = len(textos_ofensivos), len(textos_normales)
+
+    excluidas = PALABRAS_VACIAS | PALABRAS_GENERICAS
+    terminos = []
+    for palabra, apariciones in df_ofensivo.items():
+        if apariciones < min_apariciones or len(palabra) < longitud_minima or palabra in excluidas:
+            continue
+        razon = ((apariciones + 1) / (n_ofensivo + 2)) / ((df_normal[palabra] + 1) / (n_normal + 2))
+        if razon >= razon_minima:
+            terminos.append(palabra)
+    return sorted(terminos)
+
+def leer_terminos(ruta=RUTA_TERMINOS):
+    """Lista de términos de un archivo, uno por línea (las líneas con # se ignoran)"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.startswith('#')]
+
+def particion_corpus(directorio_datos=RUTA_DATOS):
+    """La misma partición entrenamiento/prueba que entrenar_clasificador_textos (20%, random_state=42)"""
+    textos, etiquetas = cargar_corpus(directorio_datos)
+    return train_test_split(textos, etiquetas, test_size=0.2, random_state=42)
+
+class PrefiltroTextos:
+    """Primera etapa de la cascada: léxico ofensivo + regresión logística sobre n-gramas hasheados
+
+    Los n-gramas de palabras (1-2) y de caracteres (3-5) se hashean, así que
+    no hay vocabulario que guardar: el modelo son los coeficientes, que se
+    guardan en un .npz junto con la lista de términos y el umbral_normal
+    calibrado.
+    """
+
+    def __init__(self, terminos, coeficientes=None, intercepto=0.0, bits_hash=18, umbral_normal=None):
+        self.buscador = BuscadorTerminos(terminos)
+        self.bits_hash = bits_hash
+        self.umbral_normal = umbral_normal
+        self.vectorizadores = (
+            HashingVectorizer(analyzer='word', ngram_range=(1, 2), n_features=2 ** bits_hash,
+                              alternate_sign=False, preprocessor=normalizar),
+            HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** bits_hash,
+                              alternate_sign=False, preprocessor=normalizar)
+        )
+        self.coeficientes = coeficientes
+        self.intercepto = intercepto
+
+    def vectorizar(self, textos):
+        return hstack([v.transform(textos) for v in self.vectorizadores]).tocsr()
+
+    @classmethod
+    def entrenar(cls, directorio_datos=RUTA_DATOS, terminos_extra=(), C=4.0, bits_hash=18, tasa_maxima=0.02):
+        """Ajusta el prefiltro dentro de la partición de entrenamiento de BERT y calibra umbral_normal
+
+        De los textos de entrenamiento se aparta un 20% de validación
+        (estratificado, random_state=42): con el resto se minan los términos y
+        se ajusta el modelo lineal, y con la validación se calibra
+        umbral_normal. La partición de prueba de BERT no se toca, así
+        informe_prefiltro mide sobre textos que no influyeron en el umbral.
+        Los términos minados se suman a `terminos_extra` (normalmente
+        leer_terminos()).
+        """
+        train_texts, _, train_labels, _ = particion_corpus(directorio_datos)
+        ajuste_texts, val_texts, ajuste_labels, val_labels = train_test_split(
+            train_texts, train_labels, test_size=0.2, random_state=42, stratify=train_labels
+        )
+        ofensivos = [t for t, e in zip(ajuste_texts, ajuste_labels) if e == 1]
+        normales = [t for t, e in zip(ajuste_texts, ajuste_labels) if e == 0]
+        prefiltro = cls(minar_terminos(ofensivos, normales) + list(terminos_extra), bits_hash=bits_hash)
+
+        modelo = LogisticRegression(C=C, max_iter=1000, class_weight='balanced')
+        modelo.fit(prefiltro.vectorizar(ajuste_texts), ajuste_labels)
+        prefiltro.coeficientes = modelo.coef_[0].astype(np.float32)
+        prefiltro.intercepto = float(modelo.intercept_[0])
+        prefiltro.umbral_normal = prefiltro.calibrar_umbral_normal(val_texts, val_labels, tasa_maxima)
+        return prefiltro
+
+    def probabilidad_ofensivo(self, textos):
+        puntajes = self.vectorizar(textos) @ self.coeficientes + self.intercepto
+        return 1.0 / (1.0 + np.exp(-puntajes))
+
+    def _candidatos_normal(self, textos):
+        """Probabilidad lineal de OFENSIVO y si el texto no tiene términos (solo esos pueden darse por NORMAL)"""
+        sin_terminos = np.array([not self.buscador.buscar(texto) for texto in textos], dtype=bool)
+        return self.probabilidad_ofensivo(textos), sin_terminos
+
+    def calibrar_umbral_normal(self, textos, etiquetas, tasa_maxima=0.02, umbral_maximo=0.5):
+        """Mayor umbral_normal con el que el prefiltro da por NORMAL como mucho `tasa_maxima` de los ofensivos"""
+        probabilidades, sin_terminos = self._candidatos_normal(textos)
+        ofensivos = np.asarray(etiquetas) == 1
+        candidatos = np.sort(probabilidades[ofensivos & sin_terminos])
+        permitidos = int(tasa_maxima * ofensivos.sum())
+        # Con umbral = candidatos[permitidos] quedan por debajo exactamente `permitidos` ofensivos
+        umbral = candidatos[permitidos] if permitidos < len(candidatos) else umbral_maximo
+        return min(float(umbral), umbral_maximo)
+
+    def evaluar(self, textos, etiquetas, umbral_normal):
+        """Cuántos textos de cada clase resolvería el prefiltro como NORMAL con `umbral_normal`
+
+        `falsos_normales` es la fracción de los OFENSIVO que se darían por
+        NORMAL sin pasar por BERT; `normales_resueltos`, la de los NORMAL que
+        se ahorran BERT.
+        """
+        probabilidades, sin_terminos = self._candidatos_normal(textos)
+        etiquetas = np.asarray(etiquetas)
+        resueltos = sin_terminos & (probabilidades < umbral_normal)
+        ofensivos, normales = etiquetas == 1, etiquetas == 0
+        return {
+            'textos': len(textos),
+            'ofensivos': int(ofensivos.sum()),
+            'falsos_normales': float(resueltos[ofensivos].mean()) if ofensivos.any() else 0.0,
+            'normales_resueltos': float(resueltos[normales].mean()) if normales.any() else 0.0,
+            'ofensivos_con_terminos': float((~sin_terminos[ofensivos]).mean()) if ofensivos.any() else 0.0
+        }
+
+    def guardar(self, ruta):
+        np.savez_compressed(ruta, coeficientes=self.coeficientes, intercepto=np.float64(self.intercepto),
+                            bits_hash=np.int64(self.bits_hash),
+                            umbral_normal=np.float64(np.nan if self.umbral_normal is None else self.umbral_normal),
+                            terminos=np.array(json.dumps(self.buscador.terminos, ensure_ascii=False)))
+
+    @classmethod
+    def cargar(cls, ruta, terminos_extra=()):
+        with np.load(ruta) as datos:
+            terminos = json.loads(str(datos['terminos']))
+            # Los prefiltros guardados antes de calibrar no traen umbral_normal
+            umbral_normal = float(datos['umbral_normal']) if 'umbral_normal' in datos.files else np.nan
+            return cls(terminos + list(terminos_extra), datos['coeficientes'], float(datos['intercepto']),
+                       int(datos['bits_hash']), None if np.isnan(umbral_normal) else umbral_normal)
+
+def informe_prefiltro(prefiltro, umbral_normal, directorio_datos=RUTA_DATOS):
+    """PrefiltroTextos.evaluar sobre la partición de prueba de BERT y sobre los casos del notebook
+
+    Ninguno de los dos conjuntos se usa al entrenar ni al calibrar el prefiltro.
+    """
+    _, test_texts, _, test_labels = particion_corpus(directorio_datos)
+    casos = todos_los_casos()
+    return {
+        'prueba': prefiltro.evaluar(test_texts, test_labels, umbral_normal),
+        'casos': prefiltro.evaluar([texto for texto, _ in casos],
+                                   [int(esperado == 'OFENSIVO') for _, esperado in casos], umbral_normal)
+    }
+
+class CascadaTextos:
+    """Cascada prefiltro -> BERT para moderar textos
+
+    El prefiltro decide solo los casos claros:
+    - sin términos del léxico y probabilidad lineal < `umbral_normal` -> NORMAL
+      (None usa el calibrado del prefiltro, ver PrefiltroTextos.entrenar)
+    - con términos y probabilidad lineal >= `umbral_ofensivo` -> OFENSIVO
+      (None desactiva este atajo y todo lo sospechoso va a BERT)
+    El resto (ambiguos) se escala al ClasificadorTextos. Cada resultado lleva
+    la etapa que decidió y la ruta de la decisión; con `ruta_registro` además
+    se escribe una línea JSON por texto.
+    """
+
+    def __init__(self, clasificador, prefiltro, umbral_normal=None, umbral_ofensivo=0.97, ruta_registro=None):
+        self.clasificador = clasificador
+        self.prefiltro = prefiltro
+        if umbral_normal is None:
+            umbral_normal = prefiltro.umbral_normal if prefiltro.umbral_normal is not None else UMBRAL_NORMAL_DEFECTO
+        self.umbral_normal = umbral_normal
+        self.umbral_ofensivo = umbral_ofensivo
+        self.lock = threading.Lock()
+        self.conteos = Counter()
+        self.registro = open(ruta_registro, 'a', encoding='utf-8') if ruta_registro else None
+
+    def decidir(self, textos):
+        """Decisión del prefiltro para cada texto: (resultado o None si se escala, ruta)"""
+        probabilidades = self.prefiltro.probabilidad_ofensivo(textos)
+        decisiones = []
+        for texto, prob_ofensivo in zip(textos, probabilidades.tolist()):
+            terminos = self.prefiltro.buscador.buscar(texto)
+            ruta = [f"lexico:{'+'.join(terminos) if terminos else '-'}", f"lineal:{prob_ofensivo:.3f}"]
+
+            clase = None
+            if not terminos and prob_ofensivo < self.umbral_normal:
+                clase = 'NORMAL'
+            elif terminos and self.umbral_ofensivo is not None and prob_ofensivo >= self.umbral_ofensivo:
+                clase = 'OFENSIVO'
+
+            if clase is None:
+                decisiones.append((None, ruta + ['bert']))
+            else:
+                decisiones.append(({
+                    'clase': clase,
+                    'probabilidad_normal': 1.0 - prob_ofensivo,
+                    'probabilidad_ofensivo': prob_ofensivo,
+                    'confianza': max(prob_ofensivo, 1.0 - prob_ofensivo),
+                    'terminos': terminos
+                }, ruta + [clase]))
+        return decisiones
+
+    def _anotar(self, texto, resultado, etapa, ruta):
+        resultado['etapa'] = etapa
+        resultado['ruta'] = ' > '.join(ruta)
+        with self.lock:
+            self.conteos['textos'] += 1
+            self.conteos[f'{etapa}_{resultado["clase"]}'] += 1
+            if resultado.get('terminos'):
+                self.conteos['con_terminos'] += 1
+            if self.registro is not None:
+                self.registro.write(json.dumps({'ts': round(time.time(), 3), 'texto': texto, 'clase': resultado['clase'],
+                                                'etapa': etapa, 'ruta': resultado['ruta']}, ensure_ascii=False) + '\n')
+                self.registro.flush()
+        return resultado
+
+    def clasificar(self, textos):
+        """Clasifica un texto o una lista de textos; solo los ambiguos pasan por BERT"""
+        if isinstance(textos, str):
+            return self.clasificar([textos])[0]
+
+        decisiones = self.decidir(textos)
+        ambiguos = [i for i, (resultado, _) in enumerate(decisiones) if resultado is None]
+        resultados_bert = self.clasificador.clasificar([textos[i] for i in ambiguos]) if ambiguos else []
+
+        resultados = [None] * len(textos)
+        for i, (resultado, ruta) in enumerate(decisiones):
+            if resultado is not None:
+                resultados[i] = self._anotar(textos[i], resultado, 'prefiltro', ruta)
+        for i, resultado in zip(ambiguos, resultados_bert):
+            resultado['terminos'] = self.prefiltro.buscador.buscar(textos[i])
+            resultados[i] = self._anotar(textos[i], resultado, 'bert', decisiones[i][1] + [resultado['clase']])
+        return resultados
+
+    def enviar(self, texto):
+        """Como ClasificadorTextos.enviar: los casos claros se resuelven sin esperar al lote de BERT"""
+        (resultado, ruta), = self.decidir([texto])
+        futuro = Future()
+        if resultado is not None:
+            futuro.set_result(self._anotar(texto, resultado, 'prefiltro', ruta))
+            return futuro
+
+        terminos = self.prefiltro.buscador.buscar(texto)
+
+        def completar(futuro_bert):
+            try:
+                resultado_bert = futuro_bert.result()
+            except Exception as e:
+                futuro.set_exception(e)
+                return
+            resultado_bert['terminos'] = terminos
+            futuro.set_result(self._anotar(texto, resultado_bert, 'bert', ruta + [resultado_bert['clase']]))
+
+        self.clasificador.enviar(texto).add_done_callback(completar)
+        return futuro
+
+    def tasas(self):
+        """Fracción de textos resuelta por cada etapa y con términos del léxico"""
+        with self.lock:
+            conteos = dict(self.conteos)
+        total = conteos.get('textos', 0)
+        if not total:
+            return {'textos': 0}
+        prefiltro = sum(n for clave, n in conteos.items() if clave.startswith('prefiltro_'))
+        return {
+            'textos': total,
+            'prefiltro': prefiltro / total,
+            'prefiltro_normal': conteos.get('prefiltro_NORMAL', 0) / total,
+            'prefiltro_ofensivo': conteos.get('prefiltro_OFENSIVO', 0) / total,
+            'bert': (total - prefiltro) / total,
+            'con_terminos': conteos.get('con_terminos', 0) / total
+        }
+
+    def cerrar(self):
+        if self.registro is not None:
+            self.registro.close()
+            self.registro = None
+
+if __name__ == "__main__":
+    from clasificador_textos import ClasificadorTextos, RUTA_TOKENIZER
+
+    parser = argparse.ArgumentParser(description='Cascada léxico/lineal -> BERT para textos ofensivos')
+    parser.add_argument('modelo', nargs='?', default=None,
+                        help='Directorio del modelo BERT (sin modelo solo se muestra la decisión del prefiltro)')
+    parser.add_argument('textos', nargs='*', help='Textos a clasificar (por defecto, los casos de prueba)')
+    parser.add_argument('--prefiltro', default='prefiltro_textos.npz', help='Prefiltro entrenado (se entrena si no existe)')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Directorio con normal.txt y ofensivo.txt')
+    parser.add_argument('--terminos', default=RUTA_TERMINOS, help='Archivo con términos adicionales, uno por línea')
+    parser.add_argument('--umbral-normal', type=float, default=None,
+                        help='Por defecto, el calibrado al entrenar el prefiltro')
+    parser.add_argument('--tasa-falsos-normales', type=float, default=0.02,
+                        help='Fracción máxima de ofensivos de validación que el prefiltro puede dar por NORMAL al calibrar')
+    parser.add_argument('--umbral-ofensivo', type=float, default=0.97)
+    parser.add_argument('--tokenizer', default=RUTA_TOKENIZER)
+    parser.add_argument('--registro', default=None, help='Archivo JSON lines con la ruta de decisión de cada texto')
+    args = parser.parse_args()
+
+    terminos_extra = leer_terminos(args.terminos) if args.terminos else []
+    if os.path.exists(args.prefiltro):
+        prefiltro = PrefiltroTextos.cargar(args.prefiltro, terminos_extra)
+    else:
+        print(f"📚 Entrenando el prefiltro con {args.datos}...")
+        prefiltro = PrefiltroTextos.entrenar(args.datos, terminos_extra, tasa_maxima=args.tasa_falsos_normales)
+        prefiltro.guardar(args.prefiltro)
+    print(f"🔤 {len(prefiltro.buscador.terminos)} términos en el léxico")
+
+    casos = [(texto, None) for texto in args.textos] or todos_los_casos()
+    textos = [texto for texto, _ in casos]
+    clasificador = ClasificadorTextos(args.modelo, args.tokenizer) if args.modelo else None
+    cascada = CascadaTextos(clasificador, prefiltro, args.umbral_normal, args.umbral_ofensivo, args.registro)
+
+    # Lo que se arriesga con el atajo NORMAL: ofensivos que nunca llegarían a BERT
+    print(f"🎚️ umbral_normal {cascada.umbral_normal:.3f}")
+    for nombre, medidas in informe_prefiltro(prefiltro, cascada.umbral_normal, args.datos).items():
+        print(f"  {nombre:<7} {medidas['textos']:>4} textos | ofensivos dados por NORMAL {medidas['falsos_normales']:.1%} "
+              f"| normales resueltos {medidas['normales_resueltos']:.1%} "
+              f"| ofensivos con términos {medidas['ofensivos_con_terminos']:.1%}")
+
+    if clasificador is None:
+        for texto, (resultado, ruta) in zip(textos, cascada.decidir(textos)):
+            print(f"{resultado['clase'] if resultado else 'BERT':<9} {' > '.join(ruta)}  {texto}")
+    else:
+        inicio = time.perf_counter()
+        resultados = cascada.clasificar(textos)
+        segundos = time.perf_counter() - inicio
+        for (texto, esperado), resultado in zip(casos, resultados):
+            estado = '' if esperado is None else ('✓ ' if resultado['clase'] == esperado else '✗ ')
+            print(f"{estado}{resultado['clase']:<9} [{resultado['etapa']}] {resultado['ruta']}  {texto}")
+        tasas = cascada.tasas()
+        print(f"⏱️ {len(textos)} textos en {segundos:.2f}s | prefiltro {tasas['prefiltro']:.0%} "
+              f"(normal {tasas['prefiltro_normal']:.0%}, ofensivo {tasas['prefiltro_ofensivo']:.0%}) | "
+              f"BERT {tasas['bert']:.0%} | con términos {tasas['con_terminos']:.0%}")
+    cascada.cerrar()
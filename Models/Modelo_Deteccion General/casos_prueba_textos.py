@@ -0,0 +1,98 @@
+# Casos de prueba de probar_modelo_completo_corregido (ClasificadorDeTextosEscuela.ipynb)
+
+# 1. Casos básicos esperados
+CASOS_NORMALES_BASICOS = [
+    "Hoy vamos a ver anatomía humana",
+    "Abran el libro en la página veinte",
+    "María, puedes leer el siguiente párrafo",
+    "En el zoológico vimos un mono negro",
+    "Hay una chica que lava platos en la cafetería",
+    "Los estudiantes de diferentes culturas enriquecen la clase",
+    "Vamos a estudiar sobre la diversidad étnica"
+]
+
+CASOS_OFENSIVOS_BASICOS = [
+    "Cállate mono negro, no interrumpas",
+    "Esa chica solo sirve para lavar platos",
+    "Las mujeres deberían estar en la cocina",
+    "Tu color de piel no te permite ser inteligente",
+    "Los homosexuales no deberían estar aquí"
+]
+
+# 2. Casos engañosos - palabras ambiguas
+CASOS_ENGANOSOS = [
+    # Casos con palabras que podrían ser ofensivas pero en contexto educativo
+    ("En el laboratorio vamos a ver células negras y blancas", "NORMAL"),
+    ("El personaje negro de la novela representa la justicia", "NORMAL"),
+    ("Los puntos negros en el mapa indican las ciudades", "NORMAL"),
+    ("La lista negra de palabras prohibidas en el examen", "NORMAL"),
+    ("En química vemos la reacción del carbón negro", "NORMAL"),
+
+    # Casos con referencias a género en contexto académico
+    ("Las mujeres científicas han hecho grandes aportes", "NORMAL"),
+    ("En la historia vemos cómo los hombres y mujeres trabajaban", "NORMAL"),
+    ("La protagonista femenina del libro es muy valiente", "NORMAL"),
+    ("Los roles de género han cambiado a lo largo de la historia", "NORMAL"),
+
+    # Casos con referencias étnicas en contexto educativo
+    ("Los pueblos indígenas tenían conocimientos avanzados", "NORMAL"),
+    ("La cultura africana es muy rica en tradiciones", "NORMAL"),
+    ("Los inmigrantes asiáticos trajeron nuevas tecnologías", "NORMAL"),
+    ("La población gitana tiene una cultura nómada interesante", "NORMAL"),
+
+    # Casos sutilmente ofensivos (más difíciles de detectar)
+    ("Algunos estudiantes simplemente no tienen capacidad para esto", "OFENSIVO"),
+    ("Ciertos alumnos traen problemas de su ambiente familiar", "OFENSIVO"),
+    ("Esos niños de barrio no entienden estas cosas finas", "OFENSIVO"),
+    ("Las niñas son naturalmente peores en matemáticas", "OFENSIVO"),
+    ("Tu tipo de gente no suele destacar en ciencias", "OFENSIVO"),
+]
+
+# 3. Casos límite - muy sutiles
+CASOS_LIMITE = [
+    # Borderline - podrían ir en cualquier dirección
+    ("No todos los estudiantes tienen la misma capacidad", "NORMAL"),
+    ("Algunos alumnos necesitan más apoyo que otros", "NORMAL"),
+    ("Tu rendimiento no es el esperado para alguien como tú", "OFENSIVO"),
+    ("Las chicas suelen ser más ordenadas que los chicos", "OFENSIVO"),
+    ("Los chicos son naturalmente más agresivos", "OFENSIVO"),
+    ("Tu familia probablemente no valora la educación", "OFENSIVO"),
+    ("Estudiantes de tu condición social suelen abandonar", "OFENSIVO"),
+    ("No esperaba mucho de ti considerando tu origen", "OFENSIVO"),
+]
+
+# 4. Casos con negaciones
+CASOS_NEGACION = [
+    ("No vamos a discriminar a ningún estudiante", "NORMAL"),
+    ("No toleraremos insultos en esta clase", "NORMAL"),
+    ("No es cierto que las mujeres sean peores en matemáticas", "NORMAL"),
+    ("No deberías comportarte como un mono", "OFENSIVO"),
+    ("No me extraña que falles, eres de barrio", "OFENSIVO"),
+    ("No esperaba nada bueno de tu tipo", "OFENSIVO"),
+]
+
+# 5. Casos con contexto académico específico
+CASOS_ACADEMICOS = [
+    # Anatomía y biología
+    ("En anatomía estudiamos las diferencias entre sexos", "NORMAL"),
+    ("Los caracteres sexuales secundarios aparecen en la pubertad", "NORMAL"),
+    ("Las diferencias raciales son principalmente superficiales", "NORMAL"),
+
+    # Historia y sociología
+    ("La esclavitud fue una época oscura de la humanidad", "NORMAL"),
+    ("Los conflictos étnicos han marcado la historia", "NORMAL"),
+    ("El machismo ha sido un problema histórico", "NORMAL"),
+
+    # Literatura
+    ("En esta obra el autor usa términos despectivos de la época", "NORMAL"),
+    ("El personaje expresa ideas racistas que debemos analizar", "NORMAL"),
+    ("La novela critica los estereotipos de género", "NORMAL"),
+]
+
+def todos_los_casos():
+    """Lista (texto, clase esperada) con todos los casos de prueba"""
+    return (
+        [(texto, "NORMAL") for texto in CASOS_NORMALES_BASICOS] +
+        [(texto, "OFENSIVO") for texto in CASOS_OFENSIVOS_BASICOS] +
+        CASOS_ENGANOSOS + CASOS_LIMITE + CASOS_NEGACION + CASOS_ACADEMICOS
+    )
@@ -0,0 +1,217 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import torch
+from transformers import BertTokenizer
+from datos_textos import RellenoDinamico
+from motores_textos import BACKENDS, crear_motor
+
+# Definir las clases
+CLASES = {
+    0: "NORMAL",
+    1: "OFENSIVO"
+}
+
+# Tokenizador guardado junto a los datos (Models/bert_tokenizer_manual_primero)
+RUTA_TOKENIZER = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'bert_tokenizer_manual_primero')
+
+class ClasificadorTextos:
+    """Clasificador BERT de textos ofensivos que vive en memoria
+
+    El tokenizador y el modelo se cargan una sola vez al crearlo. Hay dos
+    formas de usarlo:
+    - clasificar(textos): una lista de textos, en lotes de `tamano_lote`.
+    - enviar(texto): para muchos hilos que clasifican un texto cada uno (chat,
+      transcripciones). Devuelve un Future; un hilo de fondo junta los textos
+      que llegan dentro de `espera_ms` (o hasta llenar un lote) y los pasa
+      juntos por BERT.
+
+    Cada lote se rellena solo hasta su texto más largo, y clasificar() ordena
+    los textos por longitud antes de partirlos en lotes, así un mensaje de
+    chat no paga la atención de 512 tokens.
+
+    `backend` elige cómo corre BERT (ver motores_textos.crear_motor); con
+    'auto' se usa el más rápido disponible: torch en GPU y, en los servidores
+    sin GPU, ONNX Runtime INT8 (o PyTorch INT8) si pasó la verificación de
+    `python motores_textos.py <modelo>`, que exporta los grafos ONNX.
+
+    Cada resultado es un diccionario con la clase, las probabilidades de cada
+    clase y la confianza.
+    """
+
+    def __init__(self, model_path, tokenizer_path=RUTA_TOKENIZER, max_length=512, tamano_lote=32,
+                 espera_ms=10, device=None, backend='auto', num_hilos=None):
+        # Cargar el tokenizador y el modelo
+        self.tokenizer = BertTokenizer.from_pretrained(tokenizer_path)
+        self.motor = crear_motor(backend, model_path, device, num_hilos)
+        self.device = self.motor.device
+
+        self.max_length = max_length
+        self.relleno = RellenoDinamico(self.tokenizer.pad_token_id)
+        self.tamano_lote = tamano_lote
+        self.espera = espera_ms / 1000.0
+
+        # Un solo lote a la vez por el modelo (varios hilos solo se estorbarían)
+        self.lock = threading.Lock()
+        self.cola = queue.Queue()
+        self.hilo = None
+        # Protege el arranque y la parada del hilo de lotes frente a enviar() desde muchos hilos
+        self.lock_hilo = threading.RLock()
+
+        # Estadísticas
+        self.lotes = 0
+        self.textos_procesados = 0
+        self.tokens_procesados = 0
+
+        print(f"✅ Clasificador de textos cargado en {self.device} ({self.motor.backend})")
+
+    def _tokenizar(self, textos):
+        """Tokens de cada texto, truncados a max_length y sin relleno"""
+        return self.tokenizer(list(textos), truncation=True, max_length=self.max_length)['input_ids']
+
+    def _probabilidades(self, input_ids):
+        """Probabilidades (N, 2) de un lote ya tokenizado"""
+        # Rellenar hasta el texto más largo del lote
+        lote = self.relleno([{'input_ids': torch.tensor(ids, dtype=torch.long)} for ids in input_ids])
+
+        # Realizar la inferencia
+        with self.lock:
+            logits = self.motor.logits(lote['input_ids'], lote['attention_mask'])
+            probabilidades = torch.softmax(logits.float(), dim=1)
+            self.lotes += 1
+            self.textos_procesados += len(input_ids)
+            self.tokens_procesados += lote['input_ids'].numel()
+        return probabilidades
+
+    def _resultados(self, probabilidades):
+        resultados = []
+        for prob_normal, prob_ofensivo in probabilidades.tolist():
+            resultados.append({
+                'clase': CLASES[int(prob_ofensivo > prob_normal)],
+                'probabilidad_normal': prob_normal,
+                'probabilidad_ofensivo': prob_ofensivo,
+                'confianza': max(prob_normal, prob_ofensivo)
+            })
+        return resultados
+
+    def clasificar(self, textos):
+        """Clasifica un texto o una lista de textos; devuelve un resultado por texto"""
+        if isinstance(textos, str):
+            return self.clasificar([textos])[0]
+
+        # Lotes de textos de longitud parecida; los resultados vuelven en el orden original
+        input_ids = self._tokenizar(textos)
+        orden = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+        resultados = [None] * len(input_ids)
+        for inicio in range(0, len(orden), self.tamano_lote):
+            indices = orden[inicio:inicio + self.tamano_lote]
+            probabilidades = self._probabilidades([input_ids[i] for i in indices])
+            for i, resultado in zip(indices, self._resultados(probabilidades)):
+                resultados[i] = resultado
+        return resultados
+
+    def iniciar(self):
+        """Arranca el hilo que agrupa en lotes los textos de enviar()"""
+        with self.lock_hilo:
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self._bucle_lotes, name='clasificador_textos', daemon=True)
+                self.hilo.start()
+        return self
+
+    def enviar(self, texto):
+        """Encola un texto para el próximo lote; devuelve un Future con su resultado"""
+        futuro = Future()
+        # Encolar con el lock: ningún texto puede quedar detrás de la marca de parada de detener()
+        with self.lock_hilo:
+            self.iniciar()
+            self.cola.put((texto, futuro))
+        return futuro
+
+    def _bucle_lotes(self):
+        while True:
+            pendiente = self.cola.get()
+            if pendiente is None:
+                break
+
+            # Juntar lo que llegue durante la ventana de espera, hasta llenar un lote
+            lote = [pendiente]
+            limite = time.monotonic() + self.espera
+            detener = False
+            while len(lote) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pendiente = self.cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if pendiente is None:
+                    detener = True
+                    break
+                lote.append(pendiente)
+
+            try:
+                resultados = self._resultados(self._probabilidades(self._tokenizar([texto for texto, _ in lote])))
+            except Exception as e:
+                for _, futuro in lote:
+                    futuro.set_exception(e)
+            else:
+                for (_, futuro), resultado in zip(lote, resultados):
+                    futuro.set_result(resultado)
+
+            if detener:
+                break
+
+    def detener(self):
+        """Termina el hilo de lotes después de atender lo que ya estaba en la cola"""
+        with self.lock_hilo:
+            if self.hilo is None:
+                return
+            self.cola.put(None)
+            self.hilo.join()
+            self.hilo = None
+
+            # Lo que quede en la cola ya no lo atiende nadie: no dejar Futures sin completar
+            while True:
+                try:
+                    pendiente = self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                if pendiente is not None:
+                    pendiente[1].set_exception(RuntimeError("El clasificador de textos se detuvo"))
+
+    def tamano_medio_lote(self):
+        return self.textos_procesados / self.lotes if self.lotes else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Clasifica textos como NORMAL u OFENSIVO')
+    parser.add_argument('modelo', help='Directorio del modelo BERT entrenado (save_pretrained)')
+    parser.add_argument('textos', nargs='*', help='Textos a clasificar (sin textos, uno por línea de la entrada estándar)')
+    parser.add_argument('--tokenizer', default=RUTA_TOKENIZER)
+    parser.add_argument('--lote', type=int, default=32)
+    parser.add_argument('--backend', choices=('auto',) + BACKENDS, default='auto')
+    args = parser.parse_args()
+
+    if not args.textos:
+        import sys
+        args.textos = [linea.strip() for linea in sys.stdin if linea.strip()]
+
+    clasificador = ClasificadorTextos(args.modelo, args.tokenizer, tamano_lote=args.lote, backend=args.backend)
+    inicio = time.perf_counter()
+    resultados = clasificador.clasificar(args.textos)
+    segundos = time.perf_counter() - inicio
+
+    for texto, resultado in zip(args.textos, resultados):
+        print(f"{resultado['clase']:<9} {resultado['confianza']:.3f}  {texto}")
+    print(f"⏱️ {len(args.textos)} textos en {segundos:.2f}s ({clasificador.lotes} lotes, "
+          f"{clasificador.tokens_procesados} tokens con relleno)")
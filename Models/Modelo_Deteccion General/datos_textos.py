@@ -0,0 +1,171 @@
+import os
+import random
+import torch
+from torch.utils.data import Dataset, Sampler
+
+# normal.txt y ofensivo.txt están en Models/
+RUTA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# Límites superiores (en tokens, con [CLS] y [SEP]) de los grupos de longitud
+LIMITES_GRUPOS = (16, 32, 64, 128, 256, 512)
+
+# Función para leer párrafos de los archivos
+def leer_parrafos(archivo):
+    with open(archivo, 'r', encoding='utf-8') as f:
+        contenido = f.read()
+    parrafos = [p.strip() for p in contenido.split('*') if p.strip()]
+    return parrafos
+
+def cargar_corpus(directorio=RUTA_DATOS):
+    """Textos y etiquetas de normal.txt (0) y ofensivo.txt (1)"""
+    parrafos_normales = leer_parrafos(os.path.join(directorio, 'normal.txt'))
+    parrafos_ofensivos = leer_parrafos(os.path.join(directorio, 'ofensivo.txt'))
+    textos = parrafos_normales + parrafos_ofensivos
+    etiquetas = [0] * len(parrafos_normales) + [1] * len(parrafos_ofensivos)
+    return textos, etiquetas
+
+class TextoDataset(Dataset):
+    """Textos tokenizados una vez y sin relleno
+
+    Cada elemento tiene solo sus tokens reales; el relleno lo pone
+    RellenoDinamico al armar el lote, hasta el texto más largo del lote y no
+    hasta max_length.
+    """
+
+    def __init__(self, textos, etiquetas, tokenizer, max_length=512):
+        self.etiquetas = etiquetas
+        self.max_length = max_length
+        self.input_ids = tokenizer(list(textos), truncation=True, max_length=max_length)['input_ids']
+        self.longitudes = [len(ids) for ids in self.input_ids]
+
+    def __len__(self):
+        return len(self.input_ids)
+
+    def __getitem__(self, idx):
+        return {
+            'input_ids': torch.tensor(self.input_ids[idx], dtype=torch.long),
+            'labels': torch.tensor(self.etiquetas[idx], dtype=torch.long)
+        }
+
+class RellenoDinamico:
+    """collate_fn que rellena cada lote hasta su texto más largo"""
+
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, elementos):
+        longitud = max(len(elemento['input_ids']) for elemento in elementos)
+        input_ids = torch.full((len(elementos), longitud), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(elementos), longitud), dtype=torch.long)
+        for i, elemento in enumerate(elementos):
+            n = len(elemento['input_ids'])
+            input_ids[i, :n] = elemento['input_ids']
+            attention_mask[i, :n] = 1
+
+        lote = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'labels' in elementos[0]:
+            lote['labels'] = torch.stack([elemento['labels'] for elemento in elementos])
+        return lote
+
+def grupo_longitud(longitud, limites=LIMITES_GRUPOS):
+    """Índice del primer grupo cuyo límite cubre `longitud`"""
+    for i, limite in enumerate(limites):
+        if longitud <= limite:
+            return i
+    return len(limites) - 1
+
+class LotesPorLongitud(Sampler):
+    """batch_sampler que arma cada lote con textos del mismo grupo de longitud
+
+    Los textos cortos no pagan el relleno (ni la atención) del más largo del
+    corpus. Con mezclar=True se barajan los textos dentro de cada grupo y el
+    orden de los lotes en cada época; si no, los lotes salen ordenados por
+    longitud (útil para evaluar e inferir).
+    """
+
+    def __init__(self, longitudes, tamano_lote=32, limites=LIMITES_GRUPOS, mezclar=True, semilla=42):
+        self.longitudes = longitudes
+        self.tamano_lote = tamano_lote
+        self.limites = limites
+        self.mezclar = mezclar
+        self.random = random.Random(semilla)
+
+        self.grupos = [[] for _ in limites]
+        for idx, longitud in enumerate(longitudes):
+            self.grupos[grupo_longitud(longitud, limites)].append(idx)
+
+    def lotes(self):
+        lotes = []
+        for grupo in self.grupos:
+            if self.mezclar:
+                grupo = grupo[:]
+                self.random.shuffle(grupo)
+            else:
+                grupo = sorted(grupo, key=lambda idx: self.longitudes[idx])
+            lotes.extend(grupo[inicio:inicio + self.tamano_lote] for inicio in range(0, len(grupo), self.tamano_lote))
+        if self.mezclar:
+            self.random.shuffle(lotes)
+        return lotes
+
+    def __iter__(self):
+        return iter(self.lotes())
+
+    def __len__(self):
+        return sum((len(grupo) + self.tamano_lote - 1) // self.tamano_lote for grupo in self.grupos)
+
+def distribucion_tokens(longitudes, lotes=None, max_length=512, limites=LIMITES_GRUPOS):
+    """Resumen de la cantidad de tokens por texto y del costo frente a rellenar a max_length
+
+    Con `lotes` (listas de índices) también estima cuánto cuesta la atención
+    con esos lotes rellenados dinámicamente: cada lote cuesta
+    tamaño * (longitud más larga)^2, contra tamaño * max_length^2 con el
+    relleno fijo.
+    """
+    if not longitudes:
+        return {'textos': 0}
+
+    ordenadas = sorted(longitudes)
+    n = len(ordenadas)
+
+    def percentil(p):
+        return ordenadas[min(n - 1, int(p / 100 * n))]
+
+    por_grupo = [0] * len(limites)
+    for longitud in longitudes:
+        por_grupo[grupo_longitud(longitud, limites)] += 1
+
+    distribucion = {
+        'textos': n,
+        'media': sum(ordenadas) / n,
+        'p50': percentil(50),
+        'p90': percentil(90),
+        'p99': percentil(99),
+        'maximo': ordenadas[-1],
+        'truncados': sum(1 for longitud in longitudes if longitud >= max_length),
+        'grupos': {f'<={limite}': cantidad for limite, cantidad in zip(limites, por_grupo)},
+        'tokens_reales': sum(ordenadas),
+        'tokens_max_length': n * max_length
+    }
+
+    if lotes is not None:
+        tokens_lotes = 0
+        atencion_lotes = 0
+        for lote in lotes:
+            mas_largo = max(longitudes[idx] for idx in lote)
+            tokens_lotes += len(lote) * mas_largo
+            atencion_lotes += len(lote) * mas_largo ** 2
+        distribucion['tokens_lotes'] = tokens_lotes
+        distribucion['ahorro_tokens'] = n * max_length / tokens_lotes
+        distribucion['ahorro_atencion'] = n * max_length ** 2 / atencion_lotes
+    return distribucion
+
+def imprimir_distribucion(distribucion, titulo='Tokens por texto'):
+    print(f"📊 {titulo}: {distribucion['textos']} textos")
+    if not distribucion['textos']:
+        return
+    print(f"   media {distribucion['media']:.1f} | p50 {distribucion['p50']} | p90 {distribucion['p90']} | "
+          f"p99 {distribucion['p99']} | máx {distribucion['maximo']} | truncados {distribucion['truncados']}")
+    print("   grupos: " + ", ".join(f"{grupo}: {cantidad}" for grupo, cantidad in distribucion['grupos'].items()))
+    if 'tokens_lotes' in distribucion:
+        print(f"   tokens por época: {distribucion['tokens_lotes']} (relleno fijo: {distribucion['tokens_max_length']}, "
+              f"{distribucion['ahorro_tokens']:.1f}x menos) | atención {distribucion['ahorro_atencion']:.1f}x menos")
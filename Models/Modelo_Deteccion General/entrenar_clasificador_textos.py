@@ -0,0 +1,122 @@
+import argparse
+import os
+import torch
+from torch.utils.data import DataLoader
+from torch.optim import AdamW
+from sklearn.model_selection import train_test_split
+from tqdm import tqdm
+from transformers import BertTokenizer, BertForSequenceClassification
+from cache_textos import CacheTextos, TextoDatasetTokenizado
+from clasificador_textos import RUTA_TOKENIZER
+from datos_textos import (RUTA_DATOS, TextoDataset, RellenoDinamico, LotesPorLongitud, cargar_corpus,
+                          distribucion_tokens, imprimir_distribucion)
+
+MODELO_BASE = 'dccuchile/bert-base-spanish-wwm-uncased'
+
+# Función de entrenamiento manual
+def train(model, train_loader, optimizer, device):
+    model.train()
+    total_loss = 0
+    for batch in tqdm(train_loader, desc="Entrenando"):
+        optimizer.zero_grad()
+        input_ids = batch['input_ids'].to(device)
+        attention_mask = batch['attention_mask'].to(device)
+        labels = batch['labels'].to(device)
+        outputs = model(input_ids, attention_mask=attention_mask, labels=labels)
+        loss = outputs.loss
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item()
+    return total_loss / len(train_loader)
+
+# Función de evaluación manual
+def evaluate(model, test_loader, device):
+    model.eval()
+    total_loss = 0
+    correct = 0
+    total = 0
+    with torch.no_grad():
+        for batch in tqdm(test_loader, desc="Evaluando"):
+            input_ids = batch['input_ids'].to(device)
+            attention_mask = batch['attention_mask'].to(device)
+            labels = batch['labels'].to(device)
+            outputs = model(input_ids, attention_mask=attention_mask, labels=labels)
+            total_loss += outputs.loss.item()
+            preds = torch.argmax(outputs.logits, dim=1)
+            correct += (preds == labels).sum().item()
+            total += labels.size(0)
+    accuracy = correct / total
+    return total_loss / len(test_loader), accuracy
+
+def entrenar_clasificador(directorio_datos=RUTA_DATOS, salida='bert_model_manual_final', tokenizer_path=RUTA_TOKENIZER,
+                          modelo_base=MODELO_BASE, num_epochs=30, tamano_lote=32, max_length=512,
+                          directorio_cache='cache_textos'):
+    """Entrena el clasificador NORMAL/OFENSIVO como el notebook, con relleno dinámico por lote
+
+    Con `directorio_cache` el corpus se tokeniza una sola vez y se reutiliza
+    mapeado en memoria mientras no cambien los textos ni el tokenizador; con
+    None se tokeniza en memoria en cada ejecución.
+    """
+    tokenizer = BertTokenizer.from_pretrained(tokenizer_path)
+
+    # Dividir en conjuntos de entrenamiento y prueba
+    if directorio_cache:
+        corpus = CacheTextos(directorio_cache).cargar(tokenizer, directorio_datos, max_length)
+        train_idx, test_idx = train_test_split(range(len(corpus)), test_size=0.2, random_state=42)
+        train_dataset = TextoDatasetTokenizado(corpus, train_idx)
+        test_dataset = TextoDatasetTokenizado(corpus, test_idx)
+    else:
+        textos, etiquetas = cargar_corpus(directorio_datos)
+        train_texts, test_texts, train_labels, test_labels = train_test_split(
+            textos, etiquetas, test_size=0.2, random_state=42
+        )
+        train_dataset = TextoDataset(train_texts, train_labels, tokenizer, max_length)
+        test_dataset = TextoDataset(test_texts, test_labels, tokenizer, max_length)
+
+    # Lotes por grupo de longitud, rellenados hasta el texto más largo de cada lote
+    train_lotes = LotesPorLongitud(train_dataset.longitudes, tamano_lote, mezclar=True)
+    test_lotes = LotesPorLongitud(test_dataset.longitudes, tamano_lote, mezclar=False)
+    relleno = RellenoDinamico(tokenizer.pad_token_id)
+    train_loader = DataLoader(train_dataset, batch_sampler=train_lotes, collate_fn=relleno)
+    test_loader = DataLoader(test_dataset, batch_sampler=test_lotes, collate_fn=relleno)
+
+    imprimir_distribucion(distribucion_tokens(train_dataset.longitudes, train_lotes.lotes(), max_length),
+                          'Tokens por texto (entrenamiento)')
+    imprimir_distribucion(distribucion_tokens(test_dataset.longitudes, test_lotes.lotes(), max_length),
+                          'Tokens por texto (prueba)')
+
+    model = BertForSequenceClassification.from_pretrained(modelo_base, num_labels=2)
+
+    # Mover el modelo a la GPU si está disponible
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model.to(device)
+
+    optimizer = AdamW(model.parameters(), lr=2e-5)
+
+    for epoch in range(num_epochs):
+        print(f"\nEpoch {epoch+1}/{num_epochs}")
+        train_loss = train(model, train_loader, optimizer, device)
+        test_loss, test_accuracy = evaluate(model, test_loader, device)
+        print(f"Pérdida de entrenamiento: {train_loss:.4f}")
+        print(f"Pérdida de prueba: {test_loss:.4f}, Precisión en prueba: {test_accuracy:.4f}")
+
+    # Guardar el modelo entrenado
+    model.save_pretrained(salida)
+    tokenizer.save_pretrained(salida)
+    print(f"💾 Modelo guardado en {os.path.abspath(salida)}")
+    return model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Entrena el clasificador BERT de textos ofensivos')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='Directorio con normal.txt y ofensivo.txt')
+    parser.add_argument('--salida', default='bert_model_manual_final', help='Directorio donde guardar el modelo')
+    parser.add_argument('--tokenizer', default=RUTA_TOKENIZER)
+    parser.add_argument('--modelo-base', default=MODELO_BASE)
+    parser.add_argument('--epocas', type=int, default=30)
+    parser.add_argument('--lote', type=int, default=32)
+    parser.add_argument('--cache', default='cache_textos', help='Directorio de la caché del corpus tokenizado')
+    parser.add_argument('--sin-cache', action='store_true', help='Tokenizar en memoria sin usar la caché')
+    args = parser.parse_args()
+
+    entrenar_clasificador(args.datos, args.salida, args.tokenizer, args.modelo_base, args.epocas, args.lote,
+                          directorio_cache=None if args.sin_cache else args.cache)
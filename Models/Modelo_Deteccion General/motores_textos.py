@@ -0,0 +1,262 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+import numpy as np
+import torch
+from transformers import BertTokenizer, BertForSequenceClassification
+from casos_prueba_textos import todos_los_casos
+from datos_textos import RellenoDinamico
+
+# Backends intercambiables del modelo BERT de textos
+BACKENDS = ('torch', 'torch_int8', 'onnx', 'onnx_int8')
+
+# Orden de preferencia en CPU para backend='auto' (del más rápido al más lento)
+PREFERENCIA_CPU = ('onnx_int8', 'onnx', 'torch_int8', 'torch')
+
+class MotorTorch:
+    """BertForSequenceClassification con PyTorch, en float32 o con los Linear cuantizados a INT8
+
+    La cuantización dinámica se hace al cargar (tarda un par de segundos), así
+    el único artefacto en disco sigue siendo el save_pretrained original.
+    """
+
+    def __init__(self, model_path, device=None, cuantizado=False):
+        model = BertForSequenceClassification.from_pretrained(model_path)
+        model.eval()
+        if cuantizado:
+            # Los kernels INT8 de PyTorch son solo de CPU
+            self.device = torch.device('cpu')
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            self.device = torch.device(device or ('cuda' if torch.cuda.is_available() else 'cpu'))
+            model.to(self.device)
+        self.model = model
+        self.backend = 'torch_int8' if cuantizado else 'torch'
+
+    def logits(self, input_ids, attention_mask):
+        with torch.no_grad():
+            return self.model(input_ids.to(self.device), attention_mask=attention_mask.to(self.device)).logits.cpu()
+
+class MotorONNX:
+    """Grafo ONNX del clasificador con ONNX Runtime en CPU (float32 o INT8)"""
+
+    def __init__(self, ruta_onnx, num_hilos=None, backend='onnx'):
+        import onnxruntime as ort
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_hilos:
+            opciones.intra_op_num_threads = num_hilos
+            opciones.inter_op_num_threads = 1
+        self.sesion = ort.InferenceSession(ruta_onnx, sess_options=opciones, providers=['CPUExecutionProvider'])
+        self.entradas = {entrada.name for entrada in self.sesion.get_inputs()}
+        self.device = torch.device('cpu')
+        self.backend = backend
+        self.ruta = ruta_onnx
+
+    def logits(self, input_ids, attention_mask):
+        entradas = {
+            'input_ids': input_ids.numpy().astype(np.int64, copy=False),
+            'attention_mask': attention_mask.numpy().astype(np.int64, copy=False)
+        }
+        salida = self.sesion.run(['logits'], {nombre: valor for nombre, valor in entradas.items() if nombre in self.entradas})
+        return torch.from_numpy(salida[0])
+
+class _SoloLogits(torch.nn.Module):
+    """Envuelve el modelo para que el grafo exportado devuelva solo los logits"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids, attention_mask=attention_mask).logits
+
+def rutas_onnx(model_path):
+    """Rutas del grafo ONNX float32 y del cuantizado a INT8, dentro del directorio del modelo"""
+    return os.path.join(model_path, 'modelo.onnx'), os.path.join(model_path, 'modelo_int8.onnx')
+
+def ruta_grafo(model_path, backend):
+    """Ruta del grafo ONNX que usa un backend 'onnx' u 'onnx_int8'"""
+    ruta_onnx, ruta_int8 = rutas_onnx(model_path)
+    return ruta_int8 if backend == 'onnx_int8' else ruta_onnx
+
+def ruta_verificacion(model_path):
+    """Resultado de verificar_backends guardado junto al modelo"""
+    return os.path.join(model_path, 'verificacion_backends.json')
+
+def guardar_verificacion(model_path, resultados):
+    with open(ruta_verificacion(model_path), 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2)
+
+def leer_verificacion(model_path):
+    """Resultados de la última verificación del modelo ({} si nunca se verificó)"""
+    if model_path is None or not os.path.exists(ruta_verificacion(model_path)):
+        return {}
+    with open(ruta_verificacion(model_path), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def exportar_onnx(model_path, ruta_onnx=None, opset=14):
+    """Exporta el modelo a ONNX con lote y longitud de secuencia dinámicos"""
+    ruta_onnx = ruta_onnx or rutas_onnx(model_path)[0]
+    model = BertForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    ejemplo = (torch.ones((2, 16), dtype=torch.long), torch.ones((2, 16), dtype=torch.long))
+    ejes = {0: 'lote', 1: 'secuencia'}
+    with torch.no_grad():
+        torch.onnx.export(_SoloLogits(model), ejemplo, ruta_onnx, opset_version=opset,
+                          input_names=['input_ids', 'attention_mask'], output_names=['logits'],
+                          dynamic_axes={'input_ids': ejes, 'attention_mask': ejes, 'logits': {0: 'lote'}})
+    return ruta_onnx
+
+def cuantizar_int8(ruta_onnx, ruta_int8=None):
+    """Cuantización dinámica de los pesos a INT8 (las activaciones se cuantizan al vuelo)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ruta_int8 = ruta_int8 or os.path.join(os.path.dirname(ruta_onnx), 'modelo_int8.onnx')
+    # En BERT casi todo son MatMul, que en CPU admite pesos con signo
+    quantize_dynamic(ruta_onnx, ruta_int8, weight_type=QuantType.QInt8)
+    return ruta_int8
+
+def preparar_onnx(model_path, cuantizado=False):
+    """Ruta del grafo ONNX del backend, exportándolo o cuantizándolo si todavía no existe"""
+    ruta_onnx, ruta_int8 = rutas_onnx(model_path)
+    if cuantizado and os.path.exists(ruta_int8):
+        return ruta_int8
+    if not os.path.exists(ruta_onnx):
+        print(f"📦 Exportando {model_path} a ONNX ({ruta_onnx})...")
+        exportar_onnx(model_path, ruta_onnx)
+    if not cuantizado:
+        return ruta_onnx
+
+    print(f"🗜️ Cuantizando {ruta_onnx} a INT8 ({ruta_int8})...")
+    return cuantizar_int8(ruta_onnx, ruta_int8)
+
+def elegir_backend(device=None, model_path=None):
+    """Backend más rápido disponible: torch en GPU; en CPU, ONNX Runtime INT8 si está instalado
+
+    En CPU solo se elige un backend distinto de torch si la última
+    verificación del modelo (ver verificar_backends) lo dio por bueno; los
+    que fallaron o nunca se verificaron se descartan, igual que los ONNX
+    cuyo grafo no se ha exportado. Si ninguno queda, se usa torch, que es la
+    referencia.
+    """
+    if device != 'cpu' and (device is not None or torch.cuda.is_available()):
+        return 'torch'
+    verificacion = leer_verificacion(model_path)
+    hay_onnxruntime = importlib.util.find_spec('onnxruntime') is not None
+    for backend in PREFERENCIA_CPU:
+        if backend != 'torch' and not verificacion.get(backend, {}).get('ok', False):
+            continue
+        if backend.startswith('onnx') and not (hay_onnxruntime and model_path is not None
+                                               and os.path.exists(ruta_grafo(model_path, backend))):
+            continue
+        return backend
+    return 'torch'
+
+def crear_motor(backend, model_path, device=None, num_hilos=None):
+    """Crea el motor de inferencia del backend pedido
+
+    - 'torch': el modelo original (GPU si hay).
+    - 'torch_int8': PyTorch en CPU con los Linear cuantizados a INT8.
+    - 'onnx': grafo ONNX float32 con ONNX Runtime.
+    - 'onnx_int8': el mismo grafo con los pesos cuantizados a INT8.
+    - 'auto': el más rápido disponible y verificado (ver elegir_backend).
+
+    Aquí no se exporta ni se cuantiza nada: los grafos ONNX se preparan y
+    verifican antes con `python motores_textos.py <modelo>`.
+    """
+    if backend == 'auto':
+        backend = elegir_backend(device, model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de texto desconocido: {backend} (opciones: auto, {', '.join(BACKENDS)})")
+
+    if backend.startswith('torch'):
+        return MotorTorch(model_path, device, cuantizado=backend == 'torch_int8')
+    ruta = ruta_grafo(model_path, backend)
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"No existe {ruta}: ejecuta 'python motores_textos.py {model_path} --backend {backend}'")
+    return MotorONNX(ruta, num_hilos=num_hilos, backend=backend)
+
+def verificar_backends(model_path, tokenizer_path, backends=BACKENDS, tolerancia=0.05, num_hilos=None, max_length=512):
+    """Compara cada backend con el modelo float32 sobre los casos de probar_modelo_completo_corregido
+
+    Mide la latencia de un mensaje a la vez (como llegan en el chat) y, para
+    cada backend, la diferencia máxima en la probabilidad de OFENSIVO y
+    cuántas clases coinciden con float32. Un backend pasa si todas las clases
+    coinciden y ninguna probabilidad se aleja más de `tolerancia`. Los grafos
+    ONNX ya tienen que estar exportados (ver preparar_onnx).
+    """
+    tokenizer = BertTokenizer.from_pretrained(tokenizer_path)
+    relleno = RellenoDinamico(tokenizer.pad_token_id)
+    casos = todos_los_casos()
+    lotes = [relleno([{'input_ids': torch.tensor(ids, dtype=torch.long)}])
+             for ids in tokenizer([texto for texto, _ in casos], truncation=True, max_length=max_length)['input_ids']]
+
+    def medir(motor):
+        motor.logits(lotes[0]['input_ids'], lotes[0]['attention_mask'])  # Calentamiento
+        inicio = time.perf_counter()
+        probabilidades = [torch.softmax(motor.logits(lote['input_ids'], lote['attention_mask']), dim=1)[0, 1].item()
+                          for lote in lotes]
+        return np.array(probabilidades), 1000 * (time.perf_counter() - inicio) / len(lotes)
+
+    # Referencia: float32 en CPU, la misma máquina que los backends cuantizados
+    referencia, ms_referencia = medir(MotorTorch(model_path, device='cpu'))
+    esperadas = np.array([esperado == 'OFENSIVO' for _, esperado in casos])
+
+    resultados = {}
+    for backend in backends:
+        if backend == 'torch':
+            probabilidades, ms = referencia, ms_referencia
+        else:
+            probabilidades, ms = medir(crear_motor(backend, model_path, device='cpu', num_hilos=num_hilos))
+        diferencia = float(np.abs(probabilidades - referencia).max())
+        coincidencias = int(((probabilidades > 0.5) == (referencia > 0.5)).sum())
+        resultados[backend] = {
+            'ms_por_mensaje': ms,
+            'aceleracion': ms_referencia / ms if ms > 0 else None,
+            'diferencia_maxima': diferencia,
+            'coincidencias': coincidencias,
+            'aciertos': int(((probabilidades > 0.5) == esperadas).sum()),
+            'casos': len(casos),
+            'ok': coincidencias == len(casos) and diferencia <= tolerancia
+        }
+    return resultados
+
+if __name__ == "__main__":
+    from clasificador_textos import RUTA_TOKENIZER
+
+    parser = argparse.ArgumentParser(description='Exporta el clasificador de textos a ONNX/INT8 y verifica los backends')
+    parser.add_argument('modelo', help='Directorio del modelo BERT entrenado (save_pretrained)')
+    parser.add_argument('--tokenizer', default=RUTA_TOKENIZER)
+    parser.add_argument('--backend', choices=BACKENDS, nargs='+', default=list(BACKENDS),
+                        help='Backends a preparar y verificar')
+    parser.add_argument('--tolerancia', type=float, default=0.05,
+                        help='Diferencia máxima permitida en la probabilidad de OFENSIVO frente a float32')
+    parser.add_argument('--hilos', type=int, default=None, help='Hilos de ONNX Runtime')
+    args = parser.parse_args()
+
+    for backend in args.backend:
+        if backend.startswith('onnx'):
+            print(f"✅ {backend}: {preparar_onnx(args.modelo, cuantizado=backend == 'onnx_int8')}")
+
+    print("🔍 Verificando backends con los casos de prueba...")
+    resultados = verificar_backends(args.modelo, args.tokenizer, args.backend, args.tolerancia, args.hilos)
+    for backend, medidas in resultados.items():
+        estado = "✓" if medidas['ok'] else "✗"
+        print(f"  {estado} {backend:<12}{medidas['ms_por_mensaje']:>8.1f} ms/mensaje ({medidas['aceleracion']:.1f}x)"
+              f"  dif. máx {medidas['diferencia_maxima']:.3f}"
+              f"  coinciden {medidas['coincidencias']}/{medidas['casos']}"
+              f"  aciertos {medidas['aciertos']}/{medidas['casos']}")
+
+    # Se conserva lo verificado antes para los backends que no se pidieron esta vez
+    guardar_verificacion(args.modelo, dict(leer_verificacion(args.modelo), **resultados))
+    print(f"💾 Verificación guardada en {ruta_verificacion(args.modelo)}")
+    print(f"🚀 Backend elegido con 'auto' en CPU: {elegir_backend('cpu', args.modelo)}")
+
+    fallidos = [backend for backend, medidas in resultados.items() if not medidas['ok']]
+    if fallidos:
+        print(f"❌ Backends fuera de tolerancia: {', '.join(fallidos)} ('auto' no los usará)")
+        sys.exit(1)